@@ -18,7 +18,7 @@ def create_app(config_class=Config):
     if os.environ.get('FLASK_ENV') == 'testing':
         app.config.from_object(TestConfig)
     else:
-        app.config.from_object(Config)
+        app.config.from_object(config_class)
 
     db.init_app(app)
     migrate.init_app(app, db)
@@ -43,6 +43,7 @@ def create_app(config_class=Config):
     from app.routes.comments import comments_ns
     from app.routes.tags import tags_ns
     from app.routes.activities import activities_ns
+    from app.routes.search import search_ns
 
     api.add_namespace(user_ns, path='/api/user')
     api.add_namespace(task_ns, path='/api/tasks')
@@ -50,8 +51,41 @@ def create_app(config_class=Config):
     api.add_namespace(comments_ns, path='/api/comments')
     api.add_namespace(tags_ns, path='/api/tags')
     api.add_namespace(activities_ns, path='/api/activities')
+    api.add_namespace(search_ns, path='/api/search')
 
     from app import models
+    from app.activity_sink import ActivitySink
+    from app.counters import ProjectCounters
+    from app.events import EventBroadcaster
+    from app.keyring import KeyRing
+    from app.maintenance import ActivityRetention, ProjectSnapshots, SessionReaper
+    from app.passwords import PasswordHasher
+    from app.search import SearchIndex
+    from app.session import SessionCache, SessionRenewer, create_session_store
+    from app.summaries import ProjectSummaryCache
+    from app.tokens import RevocationList
+
+    # Each app gets its own instances, which modules reach through `current_app.extensions`
+    # (see `app.utils.extensions.extension`). They are registered before `init_app`, which may
+    # start a background thread that uses them.
+    app.extensions['session_store'] = create_session_store(app)
+    for name, extension in (
+        ('key_ring', KeyRing()),
+        ('password_hasher', PasswordHasher()),
+        ('session_cache', SessionCache()),
+        ('session_renewer', SessionRenewer()),
+        ('revocation_list', RevocationList()),
+        ('session_reaper', SessionReaper()),
+        ('activity_sink', ActivitySink()),
+        ('activity_retention', ActivityRetention()),
+        ('project_snapshots', ProjectSnapshots()),
+        ('event_broadcaster', EventBroadcaster()),
+        ('search_index', SearchIndex()),
+        ('project_counters', ProjectCounters()),
+        ('summary_cache', ProjectSummaryCache()),
+    ):
+        app.extensions[name] = extension
+        extension.init_app(app)
 
     # Configure CORS
     CORS(app, resources={r"/api/*": {
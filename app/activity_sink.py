@@ -0,0 +1,155 @@
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from app import db
+from app.models import Activities
+from app.utils.extensions import extension
+
+logger = logging.getLogger(__name__)
+
+
+class ActivitySink:
+    """
+    Collects `Activities` rows produced by the `log_activity` aspect and writes them in batches.
+
+    In `buffered` mode rows are queued in memory and a background thread writes them with one
+    multi-row INSERT once `ACTIVITY_BATCH_SIZE` rows are waiting or every
+    `ACTIVITY_FLUSH_INTERVAL` seconds, on its own connection, so the request that produced
+    them never waits for the insert. At most `ACTIVITY_QUEUE_LIMIT` rows are held; further
+    rows are dropped and counted. Pending rows are flushed when the process exits.
+
+    In `sync` mode (used by the tests) every row is inserted immediately.
+
+    In `outbox` mode rows are added to the caller's `db.session` and committed together with
+    the business change by the `log_activity` unit of work.
+    """
+
+    SYNC = 'sync'
+    BUFFERED = 'buffered'
+    OUTBOX = 'outbox'
+
+    def __init__(self):
+        self.mode = self.SYNC
+        self.batch_size = 100
+        self.flush_interval = 2
+        self.queue_limit = 10000
+        self._app = None
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._flush_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.mode = app.config.get('ACTIVITY_SINK_MODE', self.SYNC)
+        self.batch_size = app.config.get('ACTIVITY_BATCH_SIZE', 100)
+        self.flush_interval = app.config.get('ACTIVITY_FLUSH_INTERVAL', 2)
+        self.queue_limit = app.config.get('ACTIVITY_QUEUE_LIMIT', 10000)
+        if self.mode == self.BUFFERED:
+            atexit.register(self._flush_on_exit)
+
+    def record(self, **values):
+        """
+        Queues one activity row. Takes the `Activities` column values as keyword arguments.
+        """
+        self.record_many([values])
+
+    def record_many(self, rows):
+        """
+        Queues several activity rows, given as dicts of `Activities` column values. They are
+        written with multi-row INSERTs of at most `ACTIVITY_BATCH_SIZE` rows rather than one
+        INSERT each.
+        """
+        now = datetime.now(timezone.utc)
+        for values in rows:
+            values.setdefault('created_at', now)
+
+        if self.mode == self.OUTBOX:
+            if rows:
+                db.session.execute(insert(Activities), rows)
+            return
+
+        if self.mode != self.BUFFERED:
+            for start in range(0, len(rows), self.batch_size):
+                self._write(rows[start:start + self.batch_size])
+            return
+
+        with self._condition:
+            room = max(0, self.queue_limit - len(self._queue))
+            if len(rows) > room:
+                self.dropped += len(rows) - room
+                logger.warning(f"Activity queue is full, dropping {len(rows) - room} activities")
+            self._queue.extend(rows[:room])
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify()
+        self._ensure_flusher()
+
+    def _write(self, rows):
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(insert(Activities.__table__).values(rows))
+            self.written += len(rows)
+            self.flushes += 1
+        except Exception:
+            self.failed += len(rows)
+            logger.error(f"Error writing {len(rows)} activities", exc_info=True)
+
+    def flush(self):
+        """
+        Writes every queued row, `ACTIVITY_BATCH_SIZE` rows per INSERT.
+
+        Returns:
+            int: The number of rows taken off the queue.
+        """
+        taken = 0
+        with self._flush_lock:
+            while True:
+                with self._condition:
+                    size = min(self.batch_size, len(self._queue))
+                    batch = [self._queue.popleft() for _ in range(size)]
+                if not batch:
+                    return taken
+                self._write(batch)
+                taken += len(batch)
+
+    def stats(self):
+        return {
+            'queue_depth': len(self._queue),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'flushes': self.flushes
+        }
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='activity-sink', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._queue) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+            with self._app.app_context():
+                self.flush()
+
+    def _flush_on_exit(self):
+        if self._app is not None:
+            with self._app.app_context():
+                self.flush()
+
+
+activity_sink = extension('activity_sink')
@@ -1,11 +1,108 @@
-import json
 import logging
-from app import db
+from contextlib import contextmanager
+from functools import wraps
 
-from app.models import Activities
+from app import db
+from app.activity_sink import activity_sink
 
 logger = logging.getLogger(__name__)
 
+_UNIT_OF_WORK = 'activity_unit_of_work'
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Groups everything written to `db.session` inside the block into a single transaction.
+
+    Services call `commit()` instead of `db.session.commit()`; inside a unit of work that only
+    flushes, and the block commits once when it exits, or rolls back if it raises. Nested
+    units of work join the outermost one.
+    """
+    depth = db.session.info.get(_UNIT_OF_WORK, 0)
+    db.session.info[_UNIT_OF_WORK] = depth + 1
+    try:
+        yield
+        if depth == 0:
+            db.session.commit()
+    except Exception:
+        if depth == 0:
+            db.session.rollback()
+        raise
+    finally:
+        db.session.info[_UNIT_OF_WORK] = depth
+
+
+def commit():
+    """
+    Commits `db.session`, or only flushes it while a `unit_of_work` is open.
+    """
+    if db.session.info.get(_UNIT_OF_WORK):
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def _project_id(target_type, target):
+    if target_type == 'project':
+        return getattr(target, 'id', None)
+    if hasattr(target, 'project_id'):
+        return target.project_id
+    return getattr(getattr(target, 'task', None), 'project_id', None)
+
+
+def activity_values(action_type, target_type, target, current_user):
+    """
+    Returns the `Activities` column values recording an action on a target. The target is
+    any object with the model's attributes, e.g. a model instance or a result row.
+    """
+    return {
+        'user_id': current_user.id,
+        'action_type': action_type,
+        'target_type': target_type,
+        'target_id': target.id if hasattr(target, 'id') else None,
+        'details': {
+            'actor': current_user.username,
+            'action': action_type,
+            'target': target_type,
+            'task_title': target.title if hasattr(target, 'title') else None,
+            'project_id': _project_id(target_type, target)
+        }
+    }
+
+
+@contextmanager
+def activity_batch(action_type, target_type, current_user):
+    """
+    Runs a batch of changes in one `unit_of_work` and logs an activity for every target added
+    to the list the block receives, with a single bulk write to the `activity_sink`.
+
+    As with `log_activity`, in outbox mode the activities are committed in the same
+    transaction as the changes; otherwise they are handed to the sink after the commit, and
+    a failure to log them is reported without affecting the batch.
+
+    Example:
+        with activity_batch('create', 'task', current_user) as logged:
+            logged.extend(rows)
+    """
+    targets = []
+    if activity_sink.mode == activity_sink.OUTBOX:
+        with unit_of_work():
+            yield targets
+            activity_sink.record_many([
+                activity_values(action_type, target_type, target, current_user)
+                for target in targets
+            ])
+        return
+
+    with unit_of_work():
+        yield targets
+    try:
+        activity_sink.record_many([activity_values(action_type, target_type, target, current_user)
+                                   for target in targets])
+    except Exception as e:
+        logger.error(f"Error logging activities: {str(e)}")
+
 
 def log_activity(action_type, target_type):
     """
@@ -13,7 +110,19 @@ def log_activity(action_type, target_type):
 
     This decorator logs the activity of a function by creating an entry in the Activities table.
     It captures the user ID, action type, target type, and optionally the target ID if the result
-    of the function has an 'id' attribute.
+    of the function has an 'id' attribute. A dict result is searched for the target under the
+    `target_type` key, and a None result is not logged. The details include the target's
+    project, which is what the activity event stream is filtered on.
+
+    Entries are handed to the `activity_sink`, which either inserts them immediately or, with
+    `ACTIVITY_SINK_MODE = 'buffered'`, writes them in batches off the request path. In both
+    modes a failure to log is reported but does not affect the result.
+
+    With `ACTIVITY_SINK_MODE = 'outbox'` the function runs inside a `unit_of_work`: its
+    `commit()` calls only flush, the activity row is added to the same session, and both are
+    committed together. Either both are stored or, if anything raises, neither is.
+
+    The wrapped function is called exactly once; its exceptions are re-raised, never retried.
 
     Args:
         action_type (str): The type of action being logged (e.g., 'create', 'update').
@@ -23,6 +132,14 @@ def log_activity(action_type, target_type):
         function: A wrapped function that logs the activity when called.
     """
 
+    def record(result, current_user):
+        target = result.get(target_type, result) if isinstance(result, dict) else result
+        values = activity_values(action_type, target_type, target, current_user)
+
+        logger.debug(f"Activity details: {values['details']}")
+
+        activity_sink.record(**values)
+
     def decorator(func):
         """
         Inner decorator function that wraps the original function.
@@ -34,6 +151,7 @@ def log_activity(action_type, target_type):
             function: The wrapped function with logging capability.
         """
 
+        @wraps(func)
         def wrapper(*args, **kwargs):
             """
             Wrapper function that executes the original function and logs the activity.
@@ -45,36 +163,22 @@ def log_activity(action_type, target_type):
             Returns:
                 Any: The result of the original function execution.
             """
-            try:
-                result = func(*args, **kwargs)
-
-                current_user = kwargs.get('current_user')
-
-                if current_user:
-                    details = {
-                        'actor': current_user.username,
-                        'action': action_type,
-                        'target': target_type,
-                        'task_title': result.title if hasattr(result, 'title') else None
-                    }
-
-                    logger.debug(f"Details object before JSON conversion: {details}")
-                    json_details = json.dumps(details)
-                    logger.debug(f"JSON-encoded details: {json_details}")
-
-                    activity = Activities(
-                        user_id=current_user.id,
-                        action_type=action_type,
-                        target_type=target_type,
-                        target_id=result.id if hasattr(result, 'id') else None,
-                        details=json.dumps(details)
-                    )
-                    db.session.add(activity)
-                    db.session.commit()
-                    return result
-            except Exception as e:
-                print(f"Error logging activity: {str(e)}")
-                return func(*args, **kwargs)
+            current_user = kwargs.get('current_user')
+
+            if activity_sink.mode == activity_sink.OUTBOX:
+                with unit_of_work():
+                    result = func(*args, **kwargs)
+                    if current_user and result is not None:
+                        record(result, current_user)
+                return result
+
+            result = func(*args, **kwargs)
+            if current_user and result is not None:
+                try:
+                    record(result, current_user)
+                except Exception as e:
+                    logger.error(f"Error logging activity: {str(e)}")
+            return result
 
         return wrapper
 
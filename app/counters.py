@@ -0,0 +1,147 @@
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, bindparam, event, func, inspect, update
+
+from app import db
+from app.models import Project, Task
+from app.utils.extensions import extension
+
+projects = Project.__table__
+
+
+class ProjectCounters:
+    """
+    Keeps `projects.total_task_count`, `completed_task_count` and `remaining_estimated_time`
+    in step with the tasks of each project, so that a project's progress is read from its own
+    row.
+
+    Every flush of the ORM session that creates or deletes a task, moves it to another project,
+    completes or reopens it or changes its estimate adds the difference to the counters of the
+    projects concerned, on the same connection and in the same transaction, with one
+    executemany `UPDATE`. The counters are incremented in SQL rather than recomputed, so
+    concurrent writers do not undo each other's counts. Writes that bypass the ORM, such as the
+    bulk task endpoints, call `adjust` themselves.
+
+    Projects left with fewer tasks, because some were deleted or moved elsewhere, also get
+    their `tasks_removed_at` set.
+
+    The counters are not part of a project's version: counting a task does not bump it.
+    """
+
+    def init_app(self, app):
+        for name in COUNTED:
+            attribute = getattr(Task, name)
+            if not event.contains(attribute, 'set', load_counted_value):
+                event.listen(attribute, 'set', load_counted_value, active_history=True)
+        if not event.contains(db.session, 'before_flush', record_task_projects):
+            event.listen(db.session, 'before_flush', record_task_projects)
+        if not event.contains(db.session, 'after_flush', count_flushed_tasks):
+            event.listen(db.session, 'after_flush', count_flushed_tasks)
+
+    def adjust(self, added=(), removed=(), connection=None):
+        """
+        Counts tasks in, or out of, the counters of their projects.
+
+        Args:
+            added (iterable): The `(project_id, is_completed, estimated_time)` of each task
+                counted in.
+            removed (iterable): The same of each task counted out.
+            connection: The connection or session to write with; defaults to `db.session`.
+
+        Returns:
+            set: The IDs of the projects whose counters changed.
+        """
+        totals, completed, remaining = Counter(), Counter(), Counter()
+        for sign, tasks in ((1, added), (-1, removed)):
+            for project_id, is_completed, estimated_time in tasks:
+                if project_id is not None:
+                    totals[project_id] += sign
+                    completed[project_id] += sign * int(bool(is_completed))
+                    if not is_completed:
+                        remaining[project_id] += sign * (estimated_time or 0)
+        now = datetime.now(timezone.utc)
+        params = [{'project_id': project_id, 'total': totals[project_id],
+                   'completed': completed[project_id], 'remaining': remaining[project_id],
+                   'removed_at': now if totals[project_id] < 0 else None}
+                  for project_id in totals
+                  if totals[project_id] or completed[project_id] or remaining[project_id]]
+        if params:
+            (connection or db.session).execute(
+                update(projects).where(projects.c.id == bindparam('project_id')).values(
+                    total_task_count=projects.c.total_task_count + bindparam('total'),
+                    completed_task_count=projects.c.completed_task_count + bindparam('completed'),
+                    remaining_estimated_time=(projects.c.remaining_estimated_time
+                                              + bindparam('remaining')),
+                    tasks_removed_at=func.coalesce(bindparam('removed_at', type_=DateTime),
+                                                   projects.c.tasks_removed_at),
+                ),
+                params
+            )
+        return {param['project_id'] for param in params}
+
+
+COUNTED = ('project_id', 'is_completed', 'estimated_time')
+
+
+def counted_state(task):
+    """Returns the `COUNTED` values a persistent task was loaded with."""
+    attrs = inspect(task).attrs
+    values = []
+    for name in COUNTED:
+        history = attrs[name].load_history()
+        values.append((history.deleted or history.unchanged or [None])[0])
+    return tuple(values)
+
+
+def load_counted_value(task, value, oldvalue, initiator):
+    """
+    Listens to `set` on the `COUNTED` attributes with `active_history`, so that setting one on a
+    task expired by a commit first loads the value it replaces, for `counted_state` to find.
+    """
+
+
+def record_task_projects(session, flush_context, instances):
+    """
+    Notes the project, completion and estimate each changed or deleted task had before the flush.
+    Listens to `before_flush`, while the rows still hold them.
+    """
+    session.info['counted_tasks'] = {
+        task: counted_state(task) for task in (*session.dirty, *session.deleted)
+        if isinstance(task, Task) and inspect(task).persistent
+    }
+
+
+def count_flushed_tasks(session, flush_context):
+    """
+    Adjusts the counters for the tasks a flush added, deleted, moved, completed, reopened or
+    re-estimated. Listens to `after_flush`, once new tasks and projects have IDs.
+    """
+    before = session.info.pop('counted_tasks', {})
+    added, removed = [], []
+    for task in session.new:
+        if isinstance(task, Task):
+            added.append(tuple(getattr(task, name) for name in COUNTED))
+    for task in session.deleted:
+        if task in before:
+            removed.append(before[task])
+    for task in session.dirty:
+        if task in before:
+            after = tuple(getattr(task, name) for name in COUNTED)
+            if after != before[task]:
+                removed.append(before[task])
+                added.append(after)
+
+    if not (added or removed):
+        return
+    changed = project_counters.adjust(added, removed, session.connection())
+    # Projects in the session would otherwise keep the counts they were loaded with.
+    for project_id in changed:
+        key = inspect(Project).identity_key_from_primary_key((project_id,))
+        project = session.identity_map.get(key)
+        if project is not None:
+            session.expire(project, ['total_task_count', 'completed_task_count',
+                                     'remaining_estimated_time'])
+
+
+project_counters = extension('project_counters')
@@ -0,0 +1,278 @@
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Integer, cast, func, or_, select
+
+from app import db
+from app.models import Activities
+from app.scoping import project_ids_query
+from app.utils.extensions import extension
+
+logger = logging.getLogger(__name__)
+
+
+def activity_event(activity):
+    """
+    Returns the event published for an activity: task changes as `task`, everything else as
+    `activity`.
+    """
+    details = activity.details or {}
+    return {
+        'id': activity.id,
+        'event': 'task' if activity.target_type == 'task' else 'activity',
+        'user_id': activity.user_id,
+        'project_id': details.get('project_id'),
+        'data': {
+            'id': activity.id,
+            'user_id': activity.user_id,
+            'action_type': activity.action_type,
+            'target_type': activity.target_type,
+            'target_id': activity.target_id,
+            'details': details,
+            'created_at': activity.created_at.isoformat() if activity.created_at else None
+        }
+    }
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def project_ids_for(user_id):
+    """
+    Returns the IDs of the projects a user takes part in.
+    """
+    return set(db.session.scalars(project_ids_query(user_id)))
+
+
+class Subscription:
+    """
+    One client's view of the event stream: its filter and a bounded queue of pending events.
+    """
+
+    def __init__(self, user_id, project_ids, maxsize, since=0, newest=0):
+        self.user_id = user_id
+        self.project_ids = project_ids
+        # The broadcaster's cursor when the client subscribed, after which events are pushed to
+        # it, and the newest activity then, after which a client that does not resume starts.
+        self.since = since
+        self.newest = newest
+        self.events = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def matches(self, event):
+        return event['user_id'] == self.user_id or event['project_id'] in self.project_ids
+
+    def publish(self, event):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            # The client is too slow; it is disconnected and resumes with Last-Event-ID.
+            self.overflowed = True
+
+
+class EventBroadcaster:
+    """
+    Pushes new activities to the subscribers of this worker.
+
+    The `activities` id sequence is the event log. One background thread per worker reads the
+    rows added since its last poll every `EVENT_POLL_INTERVAL` seconds, a single primary key
+    range scan no matter how many clients are connected, and hands every event to the queues
+    of the subscribers it concerns. The thread only runs while there are subscribers.
+
+    Ids are allocated before the rows commit, so with several writers, or the buffered and
+    outbox activity sinks, a row can become visible after one with a higher id. The cursor
+    therefore only moves over consecutive ids: at a missing id the broadcaster stops and reads
+    again from there on the next poll, until the row commits or `EVENT_GAP_TIMEOUT` seconds
+    have passed (its transaction rolled back, or ran longer than that and is not streamed).
+    Every event sent thus has a lower id than any event still to come, and its id is a safe
+    `Last-Event-ID`.
+
+    Clients that reconnect with `Last-Event-ID` are first replayed what they missed (at most
+    `EVENT_REPLAY_LIMIT` events) from the database, up to the cursor at which they subscribed.
+    A subscriber whose queue holds `EVENT_SUBSCRIBER_QUEUE` undelivered events is disconnected
+    and expected to resume.
+    """
+
+    def __init__(self):
+        self.poll_interval = 1
+        self.heartbeat = 15
+        self.queue_size = 1000
+        self.replay_limit = 1000
+        self.batch_size = 500
+        self.gap_timeout = 10
+        self._app = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_id = None
+        # The missing id the cursor is held at, and when it was first found missing.
+        self._gap = None
+
+    def init_app(self, app):
+        self._app = app
+        self.poll_interval = app.config.get('EVENT_POLL_INTERVAL', 1)
+        self.heartbeat = app.config.get('EVENT_HEARTBEAT', 15)
+        self.queue_size = app.config.get('EVENT_SUBSCRIBER_QUEUE', 1000)
+        self.replay_limit = app.config.get('EVENT_REPLAY_LIMIT', 1000)
+        self.gap_timeout = app.config.get('EVENT_GAP_TIMEOUT', 10)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def _settled_id(self):
+        """
+        Returns the id of the newest activity older than `EVENT_GAP_TIMEOUT`, from which the
+        cursor starts: the rows after it may still be joined by rows that have not committed.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.gap_timeout)
+        return db.session.scalar(
+            select(Activities.id).where(Activities.created_at <= cutoff)
+            .order_by(Activities.id.desc()).limit(1)
+        ) or 0
+
+    def subscribe(self, user_id, project_ids):
+        with self._lock:
+            if self._last_id is None:
+                self._last_id = self._settled_id()
+                self._gap = None
+            newest = db.session.scalar(select(func.max(Activities.id))) or 0
+            subscription = Subscription(user_id, project_ids, self.queue_size,
+                                        since=self._last_id, newest=newest)
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._wakeup.clear()
+                self._thread = threading.Thread(target=self._run, name='event-broadcaster',
+                                                daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if not self._subscribers:
+                # Nobody is listening; the next subscriber starts from the current end of the log.
+                self._last_id = None
+                self._wakeup.set()
+
+    def replay(self, subscription, last_event_id):
+        """
+        Returns the events after `last_event_id` that a subscriber missed, oldest first, up
+        to the cursor it subscribed at.
+        """
+        query = (
+            select(Activities)
+            .where(Activities.id > last_event_id, Activities.id <= subscription.since)
+            .where(or_(
+                Activities.user_id == subscription.user_id,
+                cast(Activities.detail('project_id'), Integer).in_(subscription.project_ids)
+            ))
+            .order_by(Activities.id)
+            .limit(self.replay_limit)
+        )
+        return [activity_event(activity) for activity in db.session.scalars(query)]
+
+    def poll(self, now=None):
+        """
+        Reads the activities added since the last poll and publishes those that follow the
+        cursor without a gap, see the class docstring.
+
+        Returns:
+            int: The number of events read.
+        """
+        last_id = self._last_id
+        if last_id is None:
+            return 0
+
+        activities = db.session.scalars(
+            select(Activities)
+            .where(Activities.id > last_id)
+            .order_by(Activities.id)
+            .limit(self.batch_size)
+        ).all()
+        db.session.commit()
+        now = time.monotonic() if now is None else now
+
+        settled = []
+        for activity in activities:
+            expected = (settled[-1].id if settled else last_id) + 1
+            if activity.id != expected:
+                if self._gap is None or self._gap[0] != expected:
+                    self._gap = (expected, now)
+                if now - self._gap[1] < self.gap_timeout:
+                    break
+                logger.warning(f"Activities {expected} to {activity.id - 1} did not commit within "
+                               f"{self.gap_timeout} s and are not streamed")
+            settled.append(activity)
+        if not settled:
+            return 0
+
+        events = [activity_event(activity) for activity in settled]
+        # Publishing under the lock means a client that subscribes during the read still gets
+        # these events.
+        with self._lock:
+            if self._last_id != last_id:
+                return 0
+            for subscription in self._subscribers:
+                for event in events:
+                    if subscription.matches(event):
+                        subscription.publish(event)
+            self._last_id = events[-1]['id']
+            if self._gap is not None and self._gap[0] <= self._last_id:
+                self._gap = None
+        return len(events)
+
+    def _run(self):
+        while True:
+            if self._wakeup.wait(self.poll_interval):
+                with self._lock:
+                    if not self._subscribers:
+                        self._thread = None
+                        return
+                    self._wakeup.clear()
+            with self._app.app_context():
+                try:
+                    while self.poll() == self.batch_size:
+                        pass
+                except Exception:
+                    db.session.rollback()
+                    logger.error("Error polling activities for subscribers", exc_info=True)
+                finally:
+                    db.session.remove()
+
+    def stream(self, subscription, last_event_id=None, replayed=()):
+        """
+        Yields the Server-Sent Events for a subscription until the client disconnects: those
+        after `last_event_id` for a client that resumes, starting with the `replayed` ones, or
+        those after `subscription.newest` for a new client.
+
+        If the replay was cut off at `EVENT_REPLAY_LIMIT` the stream ends after it, and the
+        client reconnects with the last replayed id to fetch the rest.
+        """
+        try:
+            yield f"retry: {int(self.poll_interval * 1000) + 1000}\n\n"
+            last_id = subscription.newest if last_event_id is None else last_event_id
+            for event in replayed:
+                last_id = event['id']
+                yield format_event(event)
+            if len(replayed) >= self.replay_limit:
+                return
+
+            while not subscription.overflowed:
+                try:
+                    event = subscription.events.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event['id'] > last_id:
+                    yield format_event(event)
+        finally:
+            self.unsubscribe(subscription)
+
+
+event_broadcaster = extension('event_broadcaster')
@@ -0,0 +1,66 @@
+from cryptography.fernet import Fernet, MultiFernet
+
+from app.utils.cache import TTLCache
+from app.utils.extensions import extension
+
+
+class KeyRing:
+    """
+    The Fernet keys used to encrypt session ID cookies, built once per application.
+
+    Keys come from `FERNET_KEYS` (comma separated, newest first) with `FERNET_KEY` as the
+    single-key fallback. New cookies are always encrypted with the first key while every
+    key in the ring can still decrypt, so a key can be rotated by prepending the new one
+    and dropping the old one after the cookie lifetime has passed.
+
+    Decrypted cookies are remembered in a small LRU keyed by the ciphertext, so repeated
+    requests carrying the same cookie skip the AES and HMAC work.
+    """
+
+    def __init__(self):
+        self._fernet = None
+        self._cache = TTLCache(maxsize=4096, ttl=300)
+
+    def init_app(self, app):
+        keys = app.config.get('FERNET_KEYS') or []
+        if isinstance(keys, str):
+            keys = [key.strip() for key in keys.split(',') if key.strip()]
+        if not keys and app.config.get('FERNET_KEY'):
+            keys = [app.config['FERNET_KEY']]
+
+        self._fernet = MultiFernet([Fernet(key) for key in keys]) if keys else None
+        self._cache.configure(
+            maxsize=app.config.get('FERNET_CACHE_SIZE', 4096),
+            ttl=app.config.get('FERNET_CACHE_TTL', 300)
+        )
+
+    @property
+    def fernet(self):
+        if self._fernet is None:
+            raise RuntimeError("FERNET_KEY is not configured")
+        return self._fernet
+
+    def encrypt(self, value):
+        return self.fernet.encrypt(value.encode('ascii')).decode('utf-8')
+
+    def decrypt(self, token):
+        """
+        Decrypts a cookie value with any key in the ring.
+
+        Raises:
+            cryptography.fernet.InvalidToken: If no key in the ring can decrypt the token.
+        """
+        value = self._cache.get(token)
+        if value is None:
+            value = self.fernet.decrypt(token.encode('ascii')).decode('utf-8')
+            self._cache.set(token, value)
+        return value
+
+    def forget(self, token):
+        self._cache.delete(token)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+key_ring = extension('key_ring')
@@ -0,0 +1,444 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, delete, func, select, union
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models import (
+    Activities, ActivityRollup, Project, ProjectSnapshot, RefreshToken, RevokedSession, Session,
+    Task
+)
+from app.session import SessionManager, session_renewer
+from app.utils.extensions import extension
+
+logger = logging.getLogger(__name__)
+
+sessions_cli = AppGroup('sessions', help='Session maintenance commands.')
+activities_cli = AppGroup('activities', help='Activity maintenance commands.')
+projects_cli = AppGroup('projects', help='Project maintenance commands.')
+
+
+class SessionReaper:
+    """
+    Deletes expired rows from `sessions`, `refresh_tokens` and `revoked_sessions`.
+
+    Rows are removed in batches of `SESSION_REAPER_BATCH_SIZE`, each in its own short
+    transaction, so a large backlog never holds long locks. Sessions are only removed
+    `SESSION_REAPER_GRACE` seconds after they expired, which leaves room for renewals that
+    other workers have not written yet.
+
+    The reaper runs from the `flask sessions reap` command, or in-process on a background
+    thread every `SESSION_REAPER_INTERVAL` seconds when that setting is greater than 0.
+    """
+
+    MODELS = (Session, RefreshToken, RevokedSession)
+
+    def __init__(self):
+        self.batch_size = 1000
+        self.grace = timedelta(seconds=60)
+        self.interval = 0
+        self._app = None
+        self._thread = None
+
+    def init_app(self, app):
+        self._app = app
+        self.batch_size = app.config.get('SESSION_REAPER_BATCH_SIZE', 1000)
+        self.grace = timedelta(seconds=app.config.get('SESSION_REAPER_GRACE', 60))
+        self.interval = app.config.get('SESSION_REAPER_INTERVAL', 0)
+        app.cli.add_command(sessions_cli)
+        if self.interval > 0:
+            self.start()
+
+    @staticmethod
+    def delete_expired(model, cutoff, batch_size):
+        """
+        Deletes the rows of `model` that expired before `cutoff`, one batch at a time.
+
+        Returns:
+            int: The number of rows deleted.
+        """
+        total = 0
+        while True:
+            batch = (
+                select(model.id)
+                .where(model.expires_at < cutoff)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            result = db.session.execute(
+                delete(model)
+                .where(model.id.in_(batch))
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            total += result.rowcount
+            if result.rowcount < batch_size:
+                return total
+
+    def reap(self, batch_size=None):
+        """
+        Runs one reaping pass over every session table.
+
+        Returns:
+            dict: The number of rows reclaimed per table.
+        """
+        batch_size = batch_size or self.batch_size
+        session_renewer.flush()
+
+        cutoff = datetime.now(timezone.utc) - self.grace
+        reclaimed = {
+            model.__tablename__: self.delete_expired(model, cutoff, batch_size)
+            for model in self.MODELS
+        }
+        logger.info(f"Reclaimed expired session rows: {reclaimed}")
+        return reclaimed
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='session-reaper', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._app.app_context():
+                try:
+                    self.reap()
+                except Exception:
+                    db.session.rollback()
+                    logger.error("Error reaping expired sessions", exc_info=True)
+
+
+session_reaper = extension('session_reaper')
+
+
+@sessions_cli.command('reap')
+@click.option('--batch-size', type=int, default=None, help='Rows deleted per transaction.')
+def reap_command(batch_size):
+    """Delete expired sessions, refresh tokens and revocations."""
+    for table, count in session_reaper.reap(batch_size).items():
+        click.echo(f'{table}: {count} rows reclaimed')
+
+
+@sessions_cli.command('revoke-user')
+@click.argument('user_id', type=int)
+def revoke_user_command(user_id):
+    """Revoke every session and refresh token of a user."""
+    for table, count in SessionManager.invalidate_user_sessions(user_id).items():
+        click.echo(f'{table}: {count} rows revoked')
+
+
+class ActivityRetention:
+    """
+    Compacts activities older than `ACTIVITY_RETENTION_DAYS` whole days.
+
+    Old rows are counted into `activity_rollups` (one row per day, user and action) and then
+    removed from `activities`, `ACTIVITY_RETENTION_BATCH_SIZE` rows per transaction. The
+    rollup upsert and the delete share that transaction, so every activity is counted either
+    in `activities` or in `activity_rollups`, never both.
+
+    With `ACTIVITY_ARCHIVE_DIR` set, each batch is first appended to gzip-compressed NDJSON
+    files in that directory, one file per day (`activities-YYYY-MM-DD.ndjson.gz`). The
+    archive is written before the database transaction, so a failed batch may be archived
+    twice but is never lost. Without it the rows are only deleted.
+    """
+
+    def __init__(self):
+        self.days = 90
+        self.batch_size = 1000
+        self.archive_dir = None
+
+    def init_app(self, app):
+        self.days = app.config.get('ACTIVITY_RETENTION_DAYS', 90)
+        self.batch_size = app.config.get('ACTIVITY_RETENTION_BATCH_SIZE', 1000)
+        self.archive_dir = app.config.get('ACTIVITY_ARCHIVE_DIR')
+        app.cli.add_command(activities_cli)
+
+    def cutoff(self, days=None, now=None):
+        """
+        Returns the start (UTC midnight) of the oldest day that is kept raw.
+        """
+        now = now or datetime.now(timezone.utc)
+        today = now.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - timedelta(days=self.days if days is None else days)
+
+    @staticmethod
+    def _day(created_at):
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc)
+        return created_at.date()
+
+    def _archive(self, rows, archive_dir):
+        by_day = defaultdict(list)
+        for row in rows:
+            by_day[self._day(row.created_at)].append(row)
+
+        os.makedirs(archive_dir, exist_ok=True)
+        for day, day_rows in by_day.items():
+            path = os.path.join(archive_dir, f'activities-{day.isoformat()}.ndjson.gz')
+            # Each batch is appended as its own gzip member; readers see one continuous stream.
+            with open(path, 'ab') as file:
+                with gzip.GzipFile(fileobj=file, mode='wb') as archive:
+                    for row in day_rows:
+                        archive.write((json.dumps({
+                            'id': row.id,
+                            'user_id': row.user_id,
+                            'action_type': row.action_type,
+                            'target_type': row.target_type,
+                            'target_id': row.target_id,
+                            'details': row.details,
+                            'created_at': row.created_at.isoformat()
+                        }) + '\n').encode('utf-8'))
+                file.flush()
+                os.fsync(file.fileno())
+
+    @staticmethod
+    def _add_to_rollups(counts):
+        rows = [
+            {'day': day, 'user_id': user_id, 'action_type': action_type, 'count': count}
+            for (day, user_id, action_type), count in counts.items()
+        ]
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            statement = insert(ActivityRollup.__table__)
+            statement = statement.on_conflict_do_update(
+                index_elements=['day', 'user_id', 'action_type'],
+                set_={'count': ActivityRollup.__table__.c.count + statement.excluded['count']}
+            )
+            db.session.execute(statement, rows)
+            return
+
+        for row in rows:
+            rollup = db.session.scalar(select(ActivityRollup).filter_by(
+                day=row['day'], user_id=row['user_id'], action_type=row['action_type']
+            ))
+            if rollup is None:
+                db.session.add(ActivityRollup(**row))
+            else:
+                rollup.count += row['count']
+        db.session.flush()
+
+    def compact(self, days=None, batch_size=None, archive_dir=None, now=None):
+        """
+        Rolls up, archives and deletes every activity created before the retention cutoff.
+
+        Returns:
+            dict: The number of activities compacted and archived, and the rollup rows touched.
+        """
+        batch_size = batch_size or self.batch_size
+        archive_dir = archive_dir or self.archive_dir
+        cutoff = self.cutoff(days, now)
+        if db.engine.dialect.name == 'sqlite':
+            # SQLite stores naive UTC timestamps.
+            cutoff = cutoff.replace(tzinfo=None)
+
+        result = {'compacted': 0, 'archived': 0, 'rollups': 0}
+        while True:
+            rows = db.session.execute(
+                select(Activities.__table__)
+                .where(Activities.created_at < cutoff)
+                .order_by(Activities.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            if archive_dir:
+                self._archive(rows, archive_dir)
+                result['archived'] += len(rows)
+
+            counts = Counter((self._day(row.created_at), row.user_id, row.action_type)
+                             for row in rows)
+            try:
+                self._add_to_rollups(counts)
+                db.session.execute(
+                    delete(Activities)
+                    .where(Activities.id.in_([row.id for row in rows]))
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            result['compacted'] += len(rows)
+            result['rollups'] += len(counts)
+            if len(rows) < batch_size:
+                break
+
+        logger.info(f"Compacted activities older than {cutoff}: {result}")
+        return result
+
+
+activity_retention = extension('activity_retention')
+
+
+@activities_cli.command('compact')
+@click.option('--days', type=int, default=None, help='Whole days of activities to keep raw.')
+@click.option('--batch-size', type=int, default=None, help='Activities compacted per transaction.')
+@click.option('--archive-dir', type=click.Path(file_okay=False), default=None,
+              help='Directory for the compressed NDJSON archive; rows are only deleted if omitted.')
+def compact_command(days, batch_size, archive_dir):
+    """Roll up old activities into daily counts and archive or delete them."""
+    result = activity_retention.compact(days, batch_size, archive_dir)
+    click.echo(f"{result['compacted']} activities compacted into {result['rollups']} rollup rows, "
+               f"{result['archived']} archived")
+
+
+class ProjectSnapshots:
+    """
+    Writes the daily `project_snapshots` that burndown and velocity series are read from.
+
+    A run compares the task counters of each project, which `app.counters` keeps exact on every
+    task write, with the project's latest snapshot, and writes a row for today only where they
+    differ. After the first run, only projects that may have changed since the previous one are
+    compared: those with a task written since (`tasks.updated_at`, which completing a task
+    also moves) and those a task was deleted from or moved out of (`projects.tasks_removed_at`).
+    Both are index range scans, so a run follows the churn since the previous one rather than
+    the number of projects. Running again the same day updates that day's rows. Projects are
+    compared `PROJECT_SNAPSHOT_BATCH_SIZE` at a time, each batch in its own transaction.
+
+    The job runs from `flask projects snapshot`, typically once a day shortly before midnight
+    UTC; days it misses are carried over from the previous snapshot.
+    """
+
+    VALUES = ('open_count', 'completed_count', 'remaining_estimated_time')
+    # How far before the previous run writes are looked for, to catch the transactions that
+    # wrote a task before it but only committed after it.
+    OVERLAP = timedelta(minutes=5)
+
+    def __init__(self):
+        self.batch_size = 1000
+
+    def init_app(self, app):
+        self.batch_size = app.config.get('PROJECT_SNAPSHOT_BATCH_SIZE', 1000)
+        app.cli.add_command(projects_cli)
+
+    @staticmethod
+    def _write(rows):
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            statement = insert(ProjectSnapshot.__table__)
+            statement = statement.on_conflict_do_update(
+                index_elements=['project_id', 'day'],
+                set_={name: statement.excluded[name]
+                      for name in (*ProjectSnapshots.VALUES, 'taken_at')}
+            )
+            db.session.execute(statement, rows)
+            return
+
+        for row in rows:
+            snapshot = db.session.scalar(
+                select(ProjectSnapshot).filter_by(project_id=row['project_id'], day=row['day'])
+            )
+            if snapshot is None:
+                db.session.add(ProjectSnapshot(**row))
+            else:
+                for name in (*ProjectSnapshots.VALUES, 'taken_at'):
+                    setattr(snapshot, name, row[name])
+        db.session.flush()
+
+    @staticmethod
+    def _candidates():
+        """
+        Returns the condition selecting the projects that may have changed since the previous
+        run, or None before the first one.
+        """
+        since = db.session.scalar(select(func.max(ProjectSnapshot.taken_at)))
+        if since is None:
+            return None
+        # Task and project times are stored as naive UTC.
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        since -= ProjectSnapshots.OVERLAP
+        return Project.id.in_(union(
+            select(Task.project_id).where(Task.updated_at >= since, Task.project_id.isnot(None)),
+            select(Project.id).where(Project.tasks_removed_at >= since)
+        ))
+
+    def take(self, batch_size=None, now=None):
+        """
+        Snapshots every project whose task counters changed since its latest snapshot.
+
+        Returns:
+            dict: The number of projects compared and of snapshots written.
+        """
+        batch_size = batch_size or self.batch_size
+        now = now or datetime.now(timezone.utc)
+        day = now.astimezone(timezone.utc).date()
+        latest = aliased(ProjectSnapshot)
+        latest_day = (select(func.max(ProjectSnapshot.day))
+                      .where(ProjectSnapshot.project_id == Project.id)
+                      .correlate(Project).scalar_subquery())
+        candidates = self._candidates()
+
+        result = {'projects': 0, 'snapshots': 0}
+        last_id = 0
+        while True:
+            query = (
+                select(Project.id,
+                       (Project.total_task_count - Project.completed_task_count)
+                       .label('open_count'),
+                       Project.completed_task_count, Project.remaining_estimated_time,
+                       latest.open_count.label('last_open_count'),
+                       latest.completed_count.label('last_completed_count'),
+                       latest.remaining_estimated_time.label('last_remaining_estimated_time'))
+                .outerjoin(latest, and_(latest.project_id == Project.id, latest.day == latest_day))
+                .where(Project.id > last_id)
+                .order_by(Project.id)
+                .limit(batch_size)
+            )
+            if candidates is not None:
+                query = query.where(candidates)
+            rows = db.session.execute(query).all()
+            if not rows:
+                break
+
+            changed = [
+                {'project_id': row.id, 'day': day, 'open_count': row.open_count,
+                 'completed_count': row.completed_task_count,
+                 'remaining_estimated_time': row.remaining_estimated_time, 'taken_at': now}
+                for row in rows
+                if (row.open_count, row.completed_task_count, row.remaining_estimated_time)
+                != (row.last_open_count, row.last_completed_count,
+                    row.last_remaining_estimated_time)
+            ]
+            try:
+                if changed:
+                    self._write(changed)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            result['projects'] += len(rows)
+            result['snapshots'] += len(changed)
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1].id
+
+        logger.info(f"Snapshotted projects for {day}: {result}")
+        return result
+
+
+project_snapshots = extension('project_snapshots')
+
+
+@projects_cli.command('snapshot')
+@click.option('--batch-size', type=int, default=None, help='Projects compared per transaction.')
+def snapshot_command(batch_size):
+    """Snapshot the task counters of the projects that changed today."""
+    result = project_snapshots.take(batch_size)
+    click.echo(f"{result['snapshots']} of {result['projects']} projects snapshotted")
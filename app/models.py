@@ -1,13 +1,13 @@
-import json
 from datetime import datetime, timezone
 
 from flask_login import UserMixin
-from sqlalchemy import DateTime
+from sqlalchemy import DDL, DateTime, event, insert_sentinel
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, declarative_base
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from app import db
-from app.utils.db import UtcNow
+from app.passwords import password_hasher
+from app.utils.db import JsonText, UtcNow
 
 Base = declarative_base()
 
@@ -26,10 +26,13 @@ class User(UserMixin, db.Model):
     tasks = relationship('Task', back_populates='assignee')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
 
 class Task(db.Model):
@@ -38,18 +41,19 @@ class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(80), nullable=False)
     description = db.Column(db.Text)
-    created_at = db.Column(db.DateTime)
-    updated_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
     is_completed = db.Column(db.Boolean, default=False)
     due_date = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
-    status = db.Column(db.String(80))
+    status = db.Column(db.String(80), index=True)
     priority = db.Column(db.Integer)
 
-    assignee_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    assignee_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
     assignee = relationship('User', back_populates='tasks')
 
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'))
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), index=True)
     project = relationship('Project', back_populates='tasks')
 
     tags = relationship('Tag', secondary='task_tags', back_populates='tasks')
@@ -61,15 +65,35 @@ class Task(db.Model):
     is_recurring = db.Column(db.Boolean, default=False)
     recurrence_pattern = db.Column(db.String(80))  # e.g., "daily", "weekly", "monthly"
 
-    parent_task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'))
+    parent_task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), index=True)
     subtasks = db.relationship('Subtask', backref='task')
 
+    # Incremented by every ORM update, which only applies if the row still has the version it
+    # was read with; exposed as the task's ETag.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version}
+    # Numbers the rows of a multi-row INSERT, so that RETURNING with sort_by_parameter_order
+    # gives the ids in the order of the rows on every database, see `TaskService.bulk_create`.
+    sentinel = insert_sentinel('sentinel')
+
+    # Keyset pagination of the task list: one (sort key, id) index per sortable column.
+    __table_args__ = (
+        db.Index('ix_tasks_due_date_id', 'due_date', 'id'),
+        db.Index('ix_tasks_priority_id', 'priority', 'id'),
+        db.Index('ix_tasks_created_at_id', 'created_at', 'id'),
+        db.Index('ix_tasks_updated_at_id', 'updated_at', 'id'),
+        # Open tasks of a project by due date (overdue and upcoming counts); completed tasks,
+        # which pile up over time, are left out of the index.
+        db.Index('ix_tasks_open_project_id_due_date', 'project_id', 'due_date',
+                 sqlite_where=is_completed.is_(False), postgresql_where=is_completed.is_(False)),
+    )
+
 
 class Subtask(db.Model):
     __tablename__ = 'subtasks'
 
     id = db.Column(db.Integer, primary_key=True)
-    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'))
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), index=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
 
 
@@ -84,6 +108,19 @@ class Project(db.Model):
     status = db.Column(db.String(80), default="NOT STARTED")
     is_archived = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    # The user who created the project, who can see it whether or not a task is assigned to them.
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    # See Task.version
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version}
+    # The number of tasks of the project and of those completed, and the estimated minutes of
+    # those still open, kept up to date by `app.counters` and not part of the version.
+    total_task_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completed_task_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    remaining_estimated_time = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # When a task last left the project, deleted or moved to another one, also set by
+    # `app.counters`: such changes leave no task row behind for `ProjectSnapshots` to find.
+    tasks_removed_at = db.Column(db.DateTime, index=True)
 
     tasks = relationship('Task', back_populates='project')
 
@@ -93,16 +130,14 @@ class Project(db.Model):
         Calculate the progress of tasks as a percentage.
 
         This property computes the percentage of completed tasks out of the total
-        number of tasks. If there are no tasks, it returns 0.
+        number of tasks from the task counters. If there are no tasks, it returns 0.
 
         Returns:
             int: The percentage of completed tasks. Rounded to the nearest integer.
         """
-        list_of_tasks = list(self.tasks)
-        if not list_of_tasks:
+        if not self.total_task_count:
             return 0
-        completed_tasks = sum(1 for task in list_of_tasks if task.is_completed)
-        return round((completed_tasks / len(list_of_tasks)) * 100)
+        return round((self.completed_task_count / self.total_task_count) * 100)
 
 
 class Tag(db.Model):
@@ -121,26 +156,82 @@ class Comment(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False)
 
-    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False, index=True)
     task = relationship('Task', back_populates='comments')
 
 
+class SearchDocument(db.Model):
+    """
+    The searchable text of one task, comment, project or tag, kept up to date by `app.search`.
+
+    The text index over it is created with the table and depends on the database: an external
+    content FTS5 table kept in sync by triggers on SQLite, a generated `tsvector` column with a
+    GIN index on PostgreSQL.
+    """
+    __tablename__ = 'search_documents'
+
+    id = db.Column(db.Integer, primary_key=True)
+    target_type = db.Column(db.String(20), nullable=False)
+    target_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.Text, nullable=False, default='')
+    body = db.Column(db.Text, nullable=False, default='')
+
+    __table_args__ = (
+        db.UniqueConstraint('target_type', 'target_id',
+                            name='uq_search_documents_target_type_target_id'),
+    )
+
+
+SEARCH_INDEX_DDL = {
+    'sqlite': (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5("
+        "title, body, content='search_documents', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+        "INSERT INTO search_documents_fts (rowid, title, body) "
+        "VALUES (new.id, new.title, new.body); END",
+        "CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+        "INSERT INTO search_documents_fts (search_documents_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); END",
+        "CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN "
+        "INSERT INTO search_documents_fts (search_documents_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); "
+        "INSERT INTO search_documents_fts (rowid, title, body) "
+        "VALUES (new.id, new.title, new.body); END",
+    ),
+    'postgresql': (
+        "ALTER TABLE search_documents ADD COLUMN document tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', title), 'A') || "
+        "setweight(to_tsvector('english', body), 'B')) STORED",
+        "CREATE INDEX ix_search_documents_document ON search_documents USING gin (document)",
+    ),
+}
+
+for _dialect, _statements in SEARCH_INDEX_DDL.items():
+    for _statement in _statements:
+        event.listen(SearchDocument.__table__, 'after_create',
+                     DDL(_statement).execute_if(dialect=_dialect))
+event.listen(SearchDocument.__table__, 'after_drop',
+             DDL("DROP TABLE IF EXISTS search_documents_fts").execute_if(dialect='sqlite'))
+
+
 # Association table for Task and Tag
 task_tags = db.Table('task_tags',
                      db.Column('task_id', db.Integer, db.ForeignKey('tasks.id'), primary_key=True),
-                     db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), primary_key=True)
+                     db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), primary_key=True),
+                     # The primary key serves lookups by task; this one serves lookups by tag.
+                     db.Index('ix_task_tags_tag_id', 'tag_id')
                      )
 
 
-class RefreshToken(Base, db.Model):
+class RefreshToken(db.Model):
     __tablename__ = 'refresh_tokens'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     token = db.Column(db.String(255), unique=True, nullable=False)
     session_id = db.Column(db.String(255), unique=True, nullable=False)
     created_at = db.Column(DateTime(timezone=True), nullable=False, server_default=UtcNow())
-    expires_at = db.Column(DateTime(timezone=True), nullable=False)
+    expires_at = db.Column(DateTime(timezone=True), nullable=False, index=True)
     user = db.relationship('User', backref='refresh_tokens')
 
 
@@ -148,10 +239,10 @@ class Session(db.Model):
     __tablename__ = 'sessions'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     session_id = db.Column(db.String(64), unique=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
-    expires_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
 
     @staticmethod
     def create(user_id, session_id, expiration_delta):
@@ -166,6 +257,17 @@ class Session(db.Model):
         return f'<Session {self.session_id}>'
 
 
+class RevokedSession(db.Model):
+    __tablename__ = 'revoked_sessions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(64), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<RevokedSession {self.session_id}>'
+
+
 class Activities(db.Model):
     __tablename__ = 'activities'
 
@@ -174,14 +276,83 @@ class Activities(db.Model):
     action_type = db.Column(db.String(50), nullable=False)
     target_type = db.Column(db.String(50), nullable=False)
     target_id = db.Column(db.Integer, nullable=False)
-    details = db.Column(db.TEXT, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    details = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'), nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Detail fields that can be filtered on through an expression index.
+    INDEXED_DETAILS = ('actor', 'task_title')
+
+    # Newest-first feed pages, optionally filtered, are served by (<filter>, created_at, id) index
+    # scans.
+    __table_args__ = (
+        db.Index('ix_activities_created_at_id', 'created_at', 'id'),
+        db.Index('ix_activities_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_activities_action_type_created_at_id', 'action_type', 'created_at', 'id'),
+        db.Index('ix_activities_target_created_at_id',
+                 'target_type', 'target_id', 'created_at', 'id'),
+        db.Index('ix_activities_details_actor', JsonText(details, 'actor'), created_at, id),
+        db.Index('ix_activities_details_task_title', JsonText(details, 'task_title'),
+                 created_at, id),
+    )
+
+    @classmethod
+    def detail(cls, key):
+        """
+        Returns a SQL expression for the text value of a `details` field.
+        """
+        return JsonText(cls.details, key)
 
     @property
     def details_json(self):
-        return json.loads(self.details) if self.details else {}
+        return self.details or {}
 
     @details_json.setter
     def details_json(self, value):
-        self.details = json.dumps(value)
+        self.details = value
+
+
+class ActivityRollup(db.Model):
+    __tablename__ = 'activity_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    action_type = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
 
+    __table_args__ = (
+        db.UniqueConstraint('day', 'user_id', 'action_type',
+                            name='uq_activity_rollups_day_user_id_action_type'),
+        db.Index('ix_activity_rollups_user_id_day', 'user_id', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<ActivityRollup {self.day} {self.user_id} {self.action_type}: {self.count}>'
+
+
+class ProjectSnapshot(db.Model):
+    """
+    The task counters of a project at the end of a day (or as of the last run that day),
+    written by `flask projects snapshot` only for projects whose counters changed since their
+    previous snapshot; days without a row are unchanged.
+    """
+    __tablename__ = 'project_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'),
+                           nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    open_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    remaining_estimated_time = db.Column(db.Integer, nullable=False, default=0)  # in minutes
+    taken_at = db.Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # Also serves the series of a project over a range of days.
+        db.UniqueConstraint('project_id', 'day', name='uq_project_snapshots_project_id_day'),
+        # The time of the latest run, see `ProjectSnapshots.take`.
+        db.Index('ix_project_snapshots_taken_at', 'taken_at'),
+    )
+
+    def __repr__(self):
+        return f'<ProjectSnapshot {self.project_id} {self.day}: {self.open_count} open>'
@@ -0,0 +1,94 @@
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.utils.extensions import extension
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool already has `PASSWORD_HASH_QUEUE_LIMIT` jobs in flight."""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification on a bounded process pool.
+
+    PBKDF2/scrypt are deliberately slow, so hashing on the request thread holds a worker
+    for the whole computation. With `PASSWORD_HASH_WORKERS` > 0 the work is sent to that
+    many processes instead; at most `PASSWORD_HASH_QUEUE_LIMIT` jobs may be running or
+    queued at once and further requests fail fast with `PasswordHasherBusy`. With 0
+    workers (or outside an application) everything runs inline.
+
+    `PASSWORD_HASH_METHOD` is passed to werkzeug's `generate_password_hash`, for example
+    `pbkdf2:sha256:600000` or `scrypt:32768:8:1`. Hashes created with other parameters are
+    reported by `needs_rehash` so they can be upgraded at the next successful login.
+    """
+
+    def __init__(self):
+        self.method = None
+        self.workers = 0
+        self.queue_limit = 0
+        self._executor = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._method_prefix = None
+
+    def init_app(self, app):
+        self.shutdown()
+        self.method = app.config.get('PASSWORD_HASH_METHOD')
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 0)
+        self.queue_limit = app.config.get('PASSWORD_HASH_QUEUE_LIMIT', self.workers * 4)
+        self._method_prefix = None
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+
+        with self._lock:
+            if self.queue_limit and self._in_flight >= self.queue_limit:
+                raise PasswordHasherBusy("Password hashing queue is full")
+            self._in_flight += 1
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            executor = self._executor
+
+        try:
+            return executor.submit(func, *args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def hash(self, password):
+        if self.method:
+            return self._run(generate_password_hash, password, self.method)
+        return self._run(generate_password_hash, password)
+
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        Returns True when a stored hash was not created with the configured method and cost.
+        """
+        if not self.method or not password_hash:
+            return False
+
+        if self._method_prefix is None:
+            # werkzeug fills in default costs, so derive the full prefix it writes once.
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._method_prefix
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+password_hasher = extension('password_hasher', PasswordHasher())
@@ -1,34 +1,76 @@
 import logging
-from flask_restx import Namespace, Resource, fields
+from flask import Response, request
+from flask_restx import Namespace, Resource, fields, inputs
 from sqlalchemy.exc import SQLAlchemyError
 from app import db
+from app.events import event_broadcaster, project_ids_for
 from app.models import Activities
+from app.routes.users import session_required
+from app.services.activity import ActivityService
+from app.utils.cursor import InvalidCursor
 from http import HTTPStatus
 
 logger = logging.getLogger(__name__)
 activities_ns = Namespace('Activities', description='Activities operations')
 parser = activities_ns.parser()
 parser.add_argument('limit', type=int, default=10, help="Number of activities to fetch")
+parser.add_argument('cursor', type=str, help="The X-Next-Cursor header of the previous page")
+parser.add_argument('user_id', type=int)
+parser.add_argument('action_type', type=str)
+parser.add_argument('target_type', type=str)
+parser.add_argument('target_id', type=int)
+parser.add_argument('actor', type=str, help="Username recorded in the activity details")
+parser.add_argument('task_title', type=str, help="Task title recorded in the activity details")
+
+counts_parser = activities_ns.parser()
+counts_parser.add_argument('start', type=inputs.date_from_iso8601, required=True,
+                           help="First day, YYYY-MM-DD")
+counts_parser.add_argument('end', type=inputs.date_from_iso8601, required=True,
+                           help="Last day, YYYY-MM-DD")
+counts_parser.add_argument('user_id', type=int)
+counts_parser.add_argument('action_type', type=str)
+
+daily_count_model = activities_ns.model('DailyActivityCount', {
+    'day': fields.Date,
+    'user_id': fields.Integer,
+    'action_type': fields.String,
+    'count': fields.Integer
+})
 
 activities_model = activities_ns.model('Activity', {
+    'id': fields.Integer(readonly=True),
     'user_id': fields.Integer(required=True),
     'action_type': fields.String(required=True),
     'target_type': fields.String(required=True),
     'target_id': fields.String(required=True),
-    'target': fields.Raw(required=False)
+    'target': fields.Raw(required=False),
+    'created_at': fields.DateTime(readonly=True)
 })
 
 
 @activities_ns.route('/recent-activities')
 class ActivitiesResource(Resource):
 
+    @activities_ns.expect(parser)
     @activities_ns.marshal_with(activities_model)
-    def get(self):
+    @session_required
+    def get(self, current_user):
+        """
+        Returns the most recent activities of the caller and of their projects, newest first.
+
+        The cursor for the next page is returned in the `X-Next-Cursor` header and is
+        absent on the last page.
+        """
         try:
             args = parser.parse_args()
-            limit = args.get('limit', 10)
-            activities = Activities.query.order_by(Activities.created_at).limit(limit).all()
-            return activities, HTTPStatus.OK
+            filters = {name: args.get(name)
+                       for name in ActivityService.FILTERS + Activities.INDEXED_DETAILS}
+            activities, next_cursor = ActivityService.feed(args.get('limit'), args.get('cursor'),
+                                                           current_user=current_user, **filters)
+            headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+            return activities, HTTPStatus.OK, headers
+        except InvalidCursor as e:
+            activities_ns.abort(HTTPStatus.BAD_REQUEST, str(e))
         except SQLAlchemyError as e:
             logger.error(
                 "Database error while retrieving recent activities",
@@ -79,3 +121,68 @@ class ActivitiesResource(Resource):
                 'success': False,
                 'error': str(e)
             }, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@activities_ns.route('/daily-counts')
+class DailyActivityCounts(Resource):
+
+    @activities_ns.expect(counts_parser)
+    @activities_ns.marshal_list_with(daily_count_model)
+    @session_required
+    def get(self, current_user):
+        """
+        Returns the caller's activity counts per day and action for a date range.
+        """
+        try:
+            args = counts_parser.parse_args()
+            if args['end'] < args['start']:
+                activities_ns.abort(HTTPStatus.BAD_REQUEST, "end must not be before start")
+            return ActivityService.daily_counts(
+                args['start'], args['end'], args.get('user_id'), args.get('action_type'),
+                current_user=current_user
+            ), HTTPStatus.OK
+        except SQLAlchemyError as e:
+            logger.error(
+                "Database error while counting activities",
+                exc_info=e
+            )
+            activities_ns.abort(HTTPStatus.INTERNAL_SERVER_ERROR, "Error counting activities")
+
+
+@activities_ns.route('/stream')
+class ActivityStream(Resource):
+
+    @activities_ns.response(HTTPStatus.OK, 'A text/event-stream of activity and task events')
+    @activities_ns.response(HTTPStatus.BAD_REQUEST, 'Invalid Last-Event-ID')
+    @session_required
+    def get(self, current_user):
+        """
+        Streams new activities and task changes of the caller's projects as Server-Sent Events.
+
+        Each event's id is the activity id, and events are sent in id order even when the
+        activities commit out of order. Reconnecting clients send it back in the
+        `Last-Event-ID` header (or the `last_event_id` query argument) and receive what
+        they missed before the live events.
+        """
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            activities_ns.abort(HTTPStatus.BAD_REQUEST, "Last-Event-ID must be an activity id")
+
+        subscription = event_broadcaster.subscribe(current_user.id,
+                                                   project_ids_for(current_user.id))
+        try:
+            replayed = []
+            if last_event_id is not None:
+                replayed = event_broadcaster.replay(subscription, last_event_id)
+        except SQLAlchemyError as e:
+            event_broadcaster.unsubscribe(subscription)
+            logger.error("Database error while replaying activities", exc_info=e)
+            activities_ns.abort(HTTPStatus.INTERNAL_SERVER_ERROR, "Error replaying activities")
+
+        return Response(
+            event_broadcaster.stream(subscription, last_event_id, replayed),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
@@ -1,8 +1,11 @@
 from flask import request
 from flask_restx import Namespace, Resource, fields
 from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import NotFound
 from app import db
 from app.models import Comment
+from app.routes.users import session_required
+from app.scoping import comment_scope
 from http import HTTPStatus
 
 comments_ns = Namespace('comments', description='Comment operations')
@@ -20,9 +23,11 @@ comment_model = comments_ns.model('Comment', {
 class CommentList(Resource):
     @comments_ns.doc('list_comments')
     @comments_ns.marshal_list_with(comment_model)
-    def get(self):
+    @session_required
+    def get(self, current_user):
+        """Lists the comments on the tasks the current user can see."""
         try:
-            comments = Comment.query.all()
+            comments = Comment.query.filter(comment_scope(current_user.id)).all()
             return comments
         except SQLAlchemyError as e:
             comments_ns.abort(
@@ -42,10 +47,15 @@ class CommentList(Resource):
 class CommentResource(Resource):
     @comments_ns.doc('get_comment')
     @comments_ns.marshal_with(comment_model)
-    def get(self,comment_id):
+    @session_required
+    def get(self, comment_id, current_user):
         try:
-            comment = Comment.query.get_or_404(comment_id)
+            comment = Comment.query.filter(
+                Comment.id == comment_id, comment_scope(current_user.id)
+            ).first_or_404()
             return comment
+        except NotFound:
+            raise
         except SQLAlchemyError as e:
             comments_ns.abort(
                 HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -1,12 +1,17 @@
 import logging
 from http import HTTPStatus
 
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, marshal
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
 
 from app import db
 from app.models import Project
+from app.routes.users import session_required
+from app.scoping import project_scope
 from app.services.project import ProjectService
+from app.utils.etags import not_modified, version_etag, version_precondition_failed
+from app.utils.fieldsets import parse_fields
 
 project_ns = Namespace('projects', description='Project operations')
 logger = logging.getLogger(__name__)
@@ -19,21 +24,108 @@ project_model = project_ns.model('Project', {
     'deadline': fields.Integer(description='The project deadline'),
     'status': fields.String(description='The project status'),
     'created_at': fields.DateTime(descripton='The project creation time'),
-    'progress': fields.Integer(description='The percentage of project completion')
+    'progress': fields.Integer(description='The percentage of project completion'),
+    'version': fields.Integer(readonly=True,
+                              description='Incremented by every change to the project')
 })
 
+summary_totals = {
+    'total': fields.Integer(description='Tasks'),
+    'completed': fields.Integer(description='Completed tasks'),
+    'overdue': fields.Integer(description='Open tasks past their due date'),
+    'due_this_week': fields.Integer(description='Open tasks due in the next seven days'),
+    'estimated_time': fields.Integer(description='Estimated time of the tasks, in minutes'),
+    'actual_time': fields.Integer(description='Time spent on the tasks, in minutes'),
+}
+
+summary_model = project_ns.model('ProjectSummary', {
+    'project_id': fields.Integer(description='The project unique identifier'),
+    **summary_totals,
+    'open': fields.Integer(description='Tasks not completed'),
+    'by_status': fields.List(fields.Nested(project_ns.model('StatusCount', {
+        'status': fields.String, 'count': fields.Integer
+    })), description='Tasks per status, largest first'),
+    'by_priority': fields.List(fields.Nested(project_ns.model('PriorityCount', {
+        'priority': fields.Integer, 'count': fields.Integer
+    })), description='Tasks per priority, largest first'),
+    'by_assignee': fields.List(fields.Nested(project_ns.model('AssigneeSummary', {
+        'assignee_id': fields.Integer, 'username': fields.String, **summary_totals
+    })), description='The totals per assignee, largest first'),
+    'generated_at': fields.DateTime(description='When the summary was computed; it is cached '
+                                                'until a task changes'),
+})
+
+history_model = project_ns.model('ProjectHistory', {
+    'project_id': fields.Integer(description='The project unique identifier'),
+    'start': fields.Date(description='The first day of the series'),
+    'end': fields.Date(description='The last day of the series, at the latest today'),
+    'burndown': fields.List(fields.Nested(project_ns.model('BurndownPoint', {
+        'date': fields.Date,
+        'open': fields.Integer(description='Tasks still open at the end of the day'),
+        'completed': fields.Integer(description='Tasks completed by the end of the day'),
+        'remaining_estimated_time': fields.Integer(
+            description='Estimated minutes of the open tasks'
+        ),
+    })), description='One point per day; null before the first snapshot of the project'),
+    'velocity': fields.List(fields.Nested(project_ns.model('VelocityPoint', {
+        'date': fields.Date,
+        'completed': fields.Integer(
+            description='Tasks completed that day, net of those reopened or removed'
+        ),
+    })), description='One point per day; null before the first snapshot of the project'),
+})
+
+history_parser = project_ns.parser()
+history_parser.add_argument('start', type=str,
+                            help='The first day, YYYY-MM-DD; defaults to 30 days before the end')
+history_parser.add_argument('end', type=str, help='The last day, YYYY-MM-DD; defaults to today')
+
+project_parser = project_ns.parser()
+project_parser.add_argument('fields', type=str,
+                            help="Project fields to return, e.g. name,status; "
+                                 "the id is always returned")
+
+
+def project_etag(state, names):
+    """
+    Returns the ETag of a project in the given `ProjectService.state`, marshalled with `names`.
+    """
+    variant = names if tuple(names) != tuple(project_model) else ()
+    return version_etag(*map(str, state), *variant)
+
+
+def project_fields():
+    """
+    Returns the project fields named in the `fields` argument (all of them by default).
+
+    Raises:
+        HTTPException: BAD_REQUEST if a field is unknown.
+    """
+    try:
+        return parse_fields(project_parser.parse_args().get('fields'), project_model)
+    except ValueError as e:
+        project_ns.abort(HTTPStatus.BAD_REQUEST, str(e))
+
 
 @project_ns.route('')
 class ProjectList(Resource):
     @project_ns.doc('list_projects')
-    @project_ns.marshal_list_with(project_model)
-    def get(self):
+    @project_ns.expect(project_parser)
+    @project_ns.response(HTTPStatus.OK, 'Success', [project_model])
+    @project_ns.response(HTTPStatus.BAD_REQUEST, 'Unknown field')
+    @session_required
+    def get(self, current_user):
+        """Lists the projects the current user created or has a task assigned in."""
+        names = project_fields()
         try:
-            projects = Project.query.all()
+            projects = (Project.query.options(*ProjectService.loader_options(names))
+                        .filter(project_scope(current_user.id)).all())
+            if 'progress' in names:
+                ProjectService.load_progress(projects)
 
             if not projects:
                 project_ns.abort(HTTPStatus.NOT_FOUND, "Projects not found")
-            return projects
+            return marshal(projects, {name: project_model[name] for name in names})
         except SQLAlchemyError as e:
             project_ns.abort(
                 HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -69,13 +161,33 @@ class ProjectList(Resource):
 @project_ns.param('project_id', 'The project identifier')
 class ProjectItem(Resource):
     @project_ns.doc('get_project')
-    @project_ns.marshal_with(project_model)
-    def get(self, project_id):
+    @project_ns.expect(project_parser)
+    @project_ns.response(HTTPStatus.OK, 'Success', project_model)
+    @project_ns.response(HTTPStatus.NOT_MODIFIED, 'The project still matches If-None-Match')
+    @project_ns.response(HTTPStatus.BAD_REQUEST, 'Unknown field')
+    @session_required
+    def get(self, project_id, current_user):
+        """
+        Returns a project with a strong ETag. A request whose `If-None-Match` still matches it
+        gets 304 Not Modified after a single lookup.
+        """
+        names = project_fields()
+        with_progress = 'progress' in names
         try:
-            project = Project.query.get(project_id)
+            state = ProjectService.state(project_id, with_progress, current_user)
+            if state is None:
+                project_ns.abort(HTTPStatus.NOT_FOUND, "Project not found")
+            if not_modified(project_etag(state, names)):
+                return '', HTTPStatus.NOT_MODIFIED, {'ETag': project_etag(state, names)}
+
+            project = ProjectService.get_project(project_id, current_user, names)
             if project is None:
                 project_ns.abort(HTTPStatus.NOT_FOUND, "Project not found")
-            return project
+            if with_progress:
+                ProjectService.load_progress([project])
+            etag = project_etag(ProjectService.state_of(project, with_progress), names)
+            selected = {name: project_model[name] for name in names}
+            return marshal(project, selected), HTTPStatus.OK, {'ETag': etag}
         except SQLAlchemyError as e:
             project_ns.abort(
                 HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -84,19 +196,34 @@ class ProjectItem(Resource):
 
     @project_ns.doc('update_project')
     @project_ns.expect(project_model)
+    @project_ns.response(HTTPStatus.PRECONDITION_FAILED, 'The project no longer matches If-Match')
     @project_ns.marshal_with(project_model)
-    def put(self, project_id):
+    @session_required
+    def put(self, project_id, current_user):
+        """
+        Updates a project. With `If-Match`, the update only applies if the project has not
+        been updated since that ETag was issued; otherwise, or if another update commits first,
+        it fails with 412. Changes to its tasks, which only move its progress, do not count.
+        """
         try:
-            project = Project.query.get(project_id)
+            project = ProjectService.get_project(project_id, current_user)
             if project is None:
                 project_ns.abort(HTTPStatus.NOT_FOUND, "Project not found")
 
+            if version_precondition_failed(project.version):
+                project_ns.abort(HTTPStatus.PRECONDITION_FAILED, "The project has changed")
+
             data = project_ns.payload
             project.name = data['name']
             project.description = data.get('description')
 
             db.session.commit()
-            return project
+            ProjectService.load_progress([project])
+            etag = project_etag(ProjectService.state_of(project), project_model)
+            return project, HTTPStatus.OK, {'ETag': etag}
+        except StaleDataError:
+            db.session.rollback()
+            project_ns.abort(HTTPStatus.PRECONDITION_FAILED, "The project has changed")
         except SQLAlchemyError as e:
             db.session.rollback()
             project_ns.abort(
@@ -106,9 +233,11 @@ class ProjectItem(Resource):
 
     @project_ns.doc('delete_project')
     @project_ns.response(HTTPStatus.NO_CONTENT, 'Project deleted')
-    def delete(self, project_id):
+    @project_ns.response(HTTPStatus.NOT_FOUND, 'Project not found')
+    @session_required
+    def delete(self, project_id, current_user):
         try:
-            project = Project.query.get(project_id)
+            project = ProjectService.get_project(project_id, current_user)
             if project is None:
                 project_ns.abort(HTTPStatus.NOT_FOUND, "Project not found")
 
@@ -123,6 +252,63 @@ class ProjectItem(Resource):
             )
 
 
+@project_ns.route('/<int:project_id>/summary')
+@project_ns.param('project_id', 'The project identifier')
+class ProjectSummary(Resource):
+    @project_ns.doc('get_project_summary')
+    @project_ns.response(HTTPStatus.OK, 'Success', summary_model)
+    @project_ns.response(HTTPStatus.NOT_FOUND, 'Project not found')
+    @session_required
+    def get(self, project_id, current_user):
+        """
+        Returns the dashboard summary of a project: its tasks counted by status, priority and
+        assignee, overdue and due this week, and their estimated and actual time.
+        """
+        try:
+            summary = ProjectService.summary(project_id, current_user)
+            if summary is None:
+                project_ns.abort(HTTPStatus.NOT_FOUND, "Project not found")
+            return marshal(summary, summary_model)
+        except SQLAlchemyError:
+            logger.error(f"Error summarizing project {project_id}", exc_info=True)
+            project_ns.abort(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                "An error occurred while summarizing the project"
+            )
+
+
+@project_ns.route('/<int:project_id>/burndown')
+@project_ns.param('project_id', 'The project identifier')
+class ProjectBurndown(Resource):
+    @project_ns.doc('get_project_burndown')
+    @project_ns.expect(history_parser)
+    @project_ns.response(HTTPStatus.OK, 'Success', history_model)
+    @project_ns.response(HTTPStatus.BAD_REQUEST, 'Invalid date range')
+    @project_ns.response(HTTPStatus.NOT_FOUND, 'Project not found')
+    @session_required
+    def get(self, project_id, current_user):
+        """
+        Returns the daily burndown and velocity of a project over a date range, read from the
+        snapshots `flask projects snapshot` takes.
+        """
+        args = history_parser.parse_args()
+        try:
+            start, end = ProjectService.parse_range(args.get('start'), args.get('end'))
+        except ValueError as e:
+            project_ns.abort(HTTPStatus.BAD_REQUEST, str(e))
+        try:
+            history = ProjectService.history(project_id, current_user, start, end)
+            if history is None:
+                project_ns.abort(HTTPStatus.NOT_FOUND, "Project not found")
+            return marshal(history, history_model)
+        except SQLAlchemyError:
+            logger.error(f"Error reading the history of project {project_id}", exc_info=True)
+            project_ns.abort(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                "An error occurred while reading the project history"
+            )
+
+
 @project_ns.route('/<int:project_id>/archive')
 class ArchiveProject(Resource):
     @project_ns.doc('archive_project')
@@ -0,0 +1,66 @@
+import logging
+from http import HTTPStatus
+
+from flask_restx import Namespace, Resource, fields
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.routes.users import session_required
+from app.services.search import SearchService
+from app.utils.cursor import InvalidCursor
+
+logger = logging.getLogger(__name__)
+search_ns = Namespace('search', description='Full-text search')
+
+search_parser = search_ns.parser()
+search_parser.add_argument('q', type=str, required=True, help="The words to search for")
+search_parser.add_argument('types', type=str,
+                           help="Any of task, comment, project and tag; defaults to all of them")
+search_parser.add_argument('limit', type=int,
+                           help="Number of results per page (default 20, at most 100)")
+search_parser.add_argument('cursor', type=str, help="The X-Next-Cursor header of the previous page")
+
+search_result_model = search_ns.model('SearchResult', {
+    'type': fields.String(description='task, comment, project or tag'),
+    'id': fields.Integer(description='The identifier of the task, comment, project or tag'),
+    'title': fields.String(description='The title or name, HTML-escaped, with the matched words '
+                                       'highlighted'),
+    'snippet': fields.String(description='An excerpt of the description or content around the '
+                                         'matched words'),
+    'score': fields.Float(description='The relevance of the result; higher is better')
+})
+
+search_response = search_ns.model('SearchResponse', {
+    'results': fields.List(fields.Nested(search_result_model),
+                           description='The results, best match first')
+})
+
+
+@search_ns.route('')
+class Search(Resource):
+    @search_ns.response(HTTPStatus.OK, 'Ok', search_response)
+    @search_ns.response(HTTPStatus.BAD_REQUEST, 'Missing query, unknown type or invalid cursor')
+    @search_ns.expect(search_parser)
+    @search_ns.marshal_with(search_response)
+    @session_required
+    def get(self, current_user):
+        """
+        Searches the tasks, comments, projects and tags the current user can see.
+
+        Every word of `q` must appear in a result. The title and snippet are HTML-escaped, and
+        matched words are wrapped in `<mark>` tags. The cursor for the next page is returned in the
+        `X-Next-Cursor` header.
+        """
+        try:
+            args = search_parser.parse_args()
+            types = SearchService.parse_types(args.get('types'))
+            results, next_cursor = SearchService.search(
+                current_user, args.get('q'), types, args.get('limit'), args.get('cursor')
+            )
+            headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+            return {'results': results}, HTTPStatus.OK, headers
+        except (ValueError, InvalidCursor) as e:
+            search_ns.abort(HTTPStatus.BAD_REQUEST, str(e))
+        except SQLAlchemyError:
+            logger.error("Database error while searching", exc_info=True)
+            search_ns.abort(HTTPStatus.INTERNAL_SERVER_ERROR,
+                            "Database error occurred. Please try again later.")
@@ -2,9 +2,12 @@ from http import HTTPStatus
 
 from flask_restx import Namespace, Resource, fields
 from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import NotFound
 
 from app import db
 from app.models import Tag
+from app.routes.users import session_required
+from app.scoping import tag_scope
 
 tags_ns = Namespace('tags', description='Tag operations')
 
@@ -18,9 +21,11 @@ tag_model = tags_ns.model('Tag', {
 class TagList(Resource):
     @tags_ns.doc('list_tags')
     @tags_ns.marshal_list_with(tag_model)
-    def get(self):
+    @session_required
+    def get(self, current_user):
+        """Lists the tags used on the tasks the current user can see."""
         try:
-            return Tag.query.all()
+            return Tag.query.filter(tag_scope(current_user.id)).all()
         except SQLAlchemyError as e:
             tags_ns.abort(
                 HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -60,10 +65,13 @@ class TagList(Resource):
 class TagItem(Resource):
     @tags_ns.doc('get_tag')
     @tags_ns.marshal_with(tag_model)
-    def get(self, comment_id):
+    @session_required
+    def get(self, comment_id, current_user):
         try:
-            tag = Tag.query.get_or_404(comment_id)
+            tag = Tag.query.filter(Tag.id == comment_id, tag_scope(current_user.id)).first_or_404()
             return tag
+        except NotFound:
+            raise
         except SQLAlchemyError as e:
             tags_ns.abort(
                 HTTPStatus.INTERNAL_SERVER_ERROR,
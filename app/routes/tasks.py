@@ -2,14 +2,20 @@ import logging
 from datetime import datetime, timezone
 from http import HTTPStatus
 
-from flask import request, jsonify
-from flask_restx import Namespace, Resource, fields
+from flask import current_app, request
+from flask_restx import Namespace, Resource, fields, marshal
 from sqlalchemy.exc import SQLAlchemyError
-from werkzeug.exceptions import NotFound
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import HTTPException, NotFound
 
 from app import db
 from app.models import Comment, Project, Task, User, Tag
+from app.routes.users import session_required
+from app.scoping import project_scope
 from app.services.task import TaskService
+from app.utils.cursor import InvalidCursor
+from app.utils.etags import not_modified, precondition_failed, version_etag
+from app.utils.fieldsets import parse_fields
 
 ns = Namespace('task', description='Task related operations')
 logger = logging.getLogger(__name__)
@@ -21,13 +27,35 @@ task_model = ns.model('Task', {
     'due_date': fields.DateTime(description='The due date of the task'),
     'completed_at': fields.DateTime(description='The completion date of the task'),
     'status': fields.String(description='The status of the task'),
-    'priority': fields.String(description='The priority of the task')
+    'priority': fields.String(description='The priority of the task'),
+    'version': fields.Integer(readonly=True,
+                              description='Incremented by every change; the ETag of the task')
 })
 
-task_list_response = ns.model('TaskListResponse', {
-    'success': fields.Boolean(description='Indicates if the request was successful'),
-    'tasks': fields.List(fields.Nested(task_model), description='List of tasks')
-})
+task_list_parser = ns.parser()
+task_list_parser.add_argument('limit', type=int,
+                              help="Number of tasks per page (default 50, at most 500)")
+task_list_parser.add_argument('cursor', type=str,
+                              help="The X-Next-Cursor header of the previous page")
+task_list_parser.add_argument('sort', type=str, default='id',
+                              help="due_date, priority, created_at, updated_at or id; "
+                                   "prefix with - to sort descending")
+task_list_parser.add_argument('count', type=str, choices=('exact', 'estimated'),
+                              help="Return the total number of tasks in a header")
+task_list_parser.add_argument('status', type=str, help="Only return tasks with this status")
+task_list_parser.add_argument('include', type=str,
+                              help="Relations to embed, any of tags, subtasks, comments, project "
+                                   "and assignee")
+task_list_parser.add_argument('fields', type=str,
+                              help="Task fields to return, e.g. title,status; "
+                                   "the id is always returned")
+
+task_parser = ns.parser()
+task_parser.add_argument('include', type=str,
+                         help="Relations to embed, any of tags, subtasks, comments, project "
+                              "and assignee")
+task_parser.add_argument('fields', type=str,
+                         help="Task fields to return, e.g. title,status; the id is always returned")
 
 task_create_response = ns.model('TaskCreateResponse', {
     'success': fields.Boolean(description='Indicates if the request was successful'),
@@ -80,21 +108,160 @@ task_assign_user_model = ns.model('TaskAssignToUser', {
     'user_id': fields.Integer(required=True, description='The ID of the user to assign the task to')
 })
 
+task_tag_model = ns.model('TaskTag', {
+    'id': fields.Integer(description='The unique identifier of the tag'),
+    'name': fields.String(description='The tag name')
+})
+
+task_subtask_model = ns.model('TaskSubtask', {
+    'id': fields.Integer(description='The unique identifier of the subtask'),
+    'name': fields.String(description='The subtask name')
+})
+
+task_project_model = ns.model('TaskProject', {
+    'id': fields.Integer(description='The unique identifier of the project'),
+    'name': fields.String(description='The project name'),
+    'status': fields.String(description='The project status'),
+    'deadline': fields.DateTime(description='The project deadline')
+})
+
+task_assignee_model = ns.model('TaskAssignee', {
+    'id': fields.Integer(description='The unique identifier of the user'),
+    'username': fields.String(description='The username'),
+    'first_name': fields.String(description='The first name of the user'),
+    'last_name': fields.String(description='The last name of the user')
+})
+
+# Embedded with ?include=; every other relation is left out of the response and never loaded.
+task_relation_fields = {
+    'tags': fields.List(fields.Nested(task_tag_model), description='The tags of the task'),
+    'subtasks': fields.List(fields.Nested(task_subtask_model),
+                            description='The subtasks of the task'),
+    'comments': fields.List(fields.Nested(task_comment_model),
+                            description='The comments on the task'),
+    'project': fields.Nested(task_project_model, allow_null=True,
+                             description='The project of the task'),
+    'assignee': fields.Nested(task_assignee_model, allow_null=True,
+                              description='The user assigned to the task')
+}
+
+task_with_relations_model = ns.inherit('TaskWithRelations', task_model, task_relation_fields)
+
+task_list_response = ns.model('TaskListResponse', {
+    'success': fields.Boolean(description='Indicates if the request was successful'),
+    'tasks': fields.List(fields.Nested(task_with_relations_model), description='List of tasks')
+})
+
+task_detail_response = ns.model('TaskDetailResponse', {
+    'success': fields.Boolean(description='Indicates if the request was successful'),
+    'task': fields.Nested(task_with_relations_model, description='The task')
+})
+
+
+task_bulk_create_model = ns.model('TaskBulkCreate', {
+    'tasks': fields.List(fields.Nested(task_model), required=True,
+                         description='The tasks to create')
+})
+
+task_bulk_update_item = ns.inherit('TaskBulkUpdateItem', task_update_model, {
+    'id': fields.Integer(required=True, description='The ID of the task to update'),
+    'version': fields.Integer(description='Only update the task if it is still at this version')
+})
+
+task_bulk_update_model = ns.model('TaskBulkUpdate', {
+    'tasks': fields.List(fields.Nested(task_bulk_update_item), required=True,
+                         description='The changes, each naming its task by id')
+})
+
+task_bulk_delete_model = ns.model('TaskBulkDelete', {
+    'ids': fields.List(fields.Integer, required=True, description='The IDs of the tasks to delete')
+})
+
+task_bulk_result = ns.model('TaskBulkResult', {
+    'index': fields.Integer(description='The position of the item in the request'),
+    'id': fields.Integer(description='The ID of the task'),
+    'status': fields.Integer(description='The HTTP status of the item'),
+    'version': fields.Integer(description='The version of the task after the update, or its '
+                                          'current version on conflict'),
+    'error': fields.String(description='Why the item failed')
+})
+
+task_bulk_response = ns.model('TaskBulkResponse', {
+    'success': fields.Boolean(description='Indicates if the request was successful'),
+    'results': fields.List(fields.Nested(task_bulk_result),
+                           description='One result per item, in order')
+})
+
+
+def bulk_items(key):
+    """
+    Returns the list under `key` in the request body.
+
+    Raises:
+        HTTPException: BAD_REQUEST if it is missing, not a list, empty or longer than
+            `TASK_BULK_LIMIT`.
+    """
+    items = (request.get_json(silent=True) or {}).get(key)
+    limit = current_app.config.get('TASK_BULK_LIMIT', 1000)
+    if not isinstance(items, list) or not items:
+        ns.abort(HTTPStatus.BAD_REQUEST, f"'{key}' must be a non-empty list")
+    if len(items) > limit:
+        ns.abort(HTTPStatus.BAD_REQUEST, f"At most {limit} tasks can be sent at once")
+    return items
+
+
+def task_etag(version, names=None):
+    """Returns the ETag of a task at `version` marshalled with the given fields."""
+    return version_etag(version, *names) if names else version_etag(version)
+
+
+def task_fields(include, names=None):
+    """
+    Returns the marshalling fields of a task restricted to `names`, with the given relations
+    embedded.
+    """
+    selected = {name: task_model[name] for name in names or task_model}
+    return dict(selected, **{name: task_relation_fields[name] for name in include})
+
 
 @ns.route('/')
 class TaskList(Resource):
-    @ns.marshal_with(task_list_response)  # Response is automatically serialized according to the
-    # defined model.
     @ns.response(HTTPStatus.OK, 'Ok', task_list_response)
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Invalid sort, cursor, include or fields')
     @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error')
-    def get(self):
+    @ns.expect(task_list_parser)
+    @session_required
+    def get(self, current_user):
+        """
+        Returns one page of the tasks assigned to the current user or in their projects.
+
+        The cursor for the next page is returned in the `X-Next-Cursor` header. With
+        `count=exact` or `count=estimated` the total is returned in `X-Total-Count` or
+        `X-Estimated-Total-Count`. Relations named in `include` are embedded in each task and
+        loaded in a fixed number of queries; `fields` limits the columns selected and returned.
+        """
         try:
-            tasks = Task.query.all()
+            args = task_list_parser.parse_args()
+            include = TaskService.parse_include(args.get('include'))
+            names = parse_fields(args.get('fields'), task_model) if args.get('fields') else None
+            tasks, next_cursor, total = TaskService.list_tasks(
+                current_user, args.get('limit'), args.get('cursor'), args.get('sort'),
+                args.get('count'), args.get('status'), include, names
+            )
+
+            headers = {}
+            if next_cursor:
+                headers['X-Next-Cursor'] = next_cursor
+            if total is not None:
+                count, estimated = total
+                headers['X-Estimated-Total-Count' if estimated else 'X-Total-Count'] = str(count)
 
             return {
                 'success': True,
-                'tasks': tasks
-            }, HTTPStatus.OK
+                'tasks': marshal(tasks, task_fields(include, names))
+            }, HTTPStatus.OK, headers
+        except (ValueError, InvalidCursor) as e:
+            ns.abort(HTTPStatus.BAD_REQUEST, str(e))
         except SQLAlchemyError as e:
             logger.error("Database error while fetching tasks", exc_info=True)
             return {
@@ -136,42 +303,160 @@ class TaskList(Resource):
             }, HTTPStatus.INTERNAL_SERVER_ERROR
 
 
+@ns.route('/bulk')
+class TaskBulk(Resource):
+    """
+    Creates, updates or deletes up to `TASK_BULK_LIMIT` tasks per request, each batch in a
+    single transaction. Every item gets its own result; invalid or unknown items do not stop
+    the others.
+    """
+
+    @ns.expect(task_bulk_create_model)
+    @ns.response(HTTPStatus.OK, 'Ok', task_bulk_response)
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Missing, empty or too many tasks')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error')
+    @session_required
+    def post(self, current_user):
+        items = bulk_items('tasks')
+        return self._run(TaskService.bulk_create, items, current_user)
+
+    @ns.expect(task_bulk_update_model)
+    @ns.response(HTTPStatus.OK, 'Ok', task_bulk_response)
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Missing, empty or too many tasks')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error')
+    @session_required
+    def patch(self, current_user):
+        items = bulk_items('tasks')
+        return self._run(TaskService.bulk_update, items, current_user)
+
+    @ns.expect(task_bulk_delete_model)
+    @ns.response(HTTPStatus.OK, 'Ok', task_bulk_response)
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Missing, empty or too many IDs')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error')
+    @session_required
+    def delete(self, current_user):
+        items = bulk_items('ids')
+        return self._run(TaskService.bulk_delete, items, current_user)
+
+    @staticmethod
+    def _run(operation, items, current_user):
+        try:
+            results = operation(items, current_user)
+            return {
+                'success': True,
+                'results': results
+            }, HTTPStatus.OK
+        except StaleDataError:
+            db.session.rollback()
+            ns.abort(HTTPStatus.PRECONDITION_FAILED,
+                     "Tasks changed while the batch was applied; retry it")
+        except SQLAlchemyError:
+            db.session.rollback()
+            logger.error(f"Database error in bulk {operation.__name__}", exc_info=True)
+            return {
+                'success': False,
+                'error': "Database error occurred. Please try again later."
+            }, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@ns.route('/<int:task_id>')
+@ns.param('task_id', 'The task identifier')
+class TaskItem(Resource):
+    @ns.response(HTTPStatus.OK, 'Ok', task_detail_response)
+    @ns.response(HTTPStatus.NOT_MODIFIED, 'The task still matches If-None-Match')
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Invalid include or fields')
+    @ns.response(HTTPStatus.NOT_FOUND, 'Not found')
+    @ns.expect(task_parser)
+    @session_required
+    def get(self, task_id, current_user):
+        """
+        Returns a task assigned to the current user or in one of their projects, with the
+        relations named in `include` embedded and only the columns named in `fields`.
+
+        Without `include`, the response carries the task's version as a strong ETag, and a
+        request whose `If-None-Match` still matches it gets 304 Not Modified after a single
+        lookup of the version. Embedded relations change without changing the task's version,
+        so responses with `include` have no ETag.
+        """
+        try:
+            args = task_parser.parse_args()
+            include = TaskService.parse_include(args.get('include'))
+            names = parse_fields(args.get('fields'), task_model) if args.get('fields') else None
+
+            if not include:
+                version = TaskService.get_version(task_id, current_user)
+                if version is not None and not_modified(task_etag(version, names)):
+                    return '', HTTPStatus.NOT_MODIFIED, {'ETag': task_etag(version, names)}
+
+            task = TaskService.get_task(task_id, current_user, include, names)
+        except ValueError as e:
+            ns.abort(HTTPStatus.BAD_REQUEST, str(e))
+        except SQLAlchemyError:
+            logger.error(f"Database error while fetching task {task_id}", exc_info=True)
+            ns.abort(HTTPStatus.INTERNAL_SERVER_ERROR,
+                     "Database error occurred. Please try again later.")
+
+        if task is None:
+            ns.abort(HTTPStatus.NOT_FOUND, f"Task with id {task_id} not found")
+
+        headers = {} if include else {'ETag': task_etag(task.version, names)}
+        return {
+            'success': True,
+            'task': marshal(task, task_fields(include, names))
+        }, HTTPStatus.OK, headers
+
+
 @ns.route('/update/<int:task_id>')
 class TaskUpdate(Resource):
     @ns.marshal_with(task_update_response)
     @ns.expect(task_update_model)
     @ns.response(HTTPStatus.OK, 'Ok')
     @ns.response(HTTPStatus.NOT_FOUND, 'Not found')
+    @ns.response(HTTPStatus.PRECONDITION_FAILED, 'The task no longer matches If-Match')
     @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error')
-    def put(self, task_id):
+    @session_required
+    def put(self, task_id, current_user):
+        """
+        Updates a task. With `If-Match`, the update only applies if the task is still at that
+        ETag; otherwise, or if another update commits first, it fails with 412 and the task's
+        current ETag.
+        """
         try:
-            task = Task.query.get(task_id)
+            # Tasks the user cannot see are not found, whatever the If-Match.
+            task = TaskService.get_task(task_id, current_user)
 
             if task is None:
-                return jsonify(
-                    {
-                        'success': False,
-                        'message': 'Not found'
-                    }), HTTPStatus.NOT_FOUND
+                return {
+                    'success': False,
+                    'message': 'Not found'
+                }, HTTPStatus.NOT_FOUND
 
-            data = request.get_json()
+            if precondition_failed(task_etag(task.version)):
+                return {
+                    'success': False,
+                    'message': 'The task has changed'
+                }, HTTPStatus.PRECONDITION_FAILED, {'ETag': task_etag(task.version)}
 
-            for field in ['title', 'description', 'due_date', 'completed_at', 'status', 'priority']:
-                if field in data:
-                    setattr(task, field, data[field])
+            data = request.get_json()
 
-            if not task.title:
+            if 'title' in data and not data['title']:
                 return {
                     'success': False,
                     'message': 'Title cannot be empty'
                 }, HTTPStatus.BAD_REQUEST
 
-            db.session.commit()
+            task = TaskService.update_task(task, data, current_user=current_user)
             return {
                 'success': True,
                 'message': 'Task updated successfully',
                 'task': task
-            }, HTTPStatus.OK
+            }, HTTPStatus.OK, {'ETag': task_etag(task.version)}
+        except StaleDataError:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': 'The task has changed'
+            }, HTTPStatus.PRECONDITION_FAILED
         except SQLAlchemyError as e:
             db.session.rollback()
             logger.error("Database error while updating task", exc_info=True)
@@ -191,12 +476,14 @@ class TaskResource(Resource):
     @ns.response(HTTPStatus.NO_CONTENT, 'No Content')
     @ns.response(HTTPStatus.NOT_FOUND, 'Not found')
     @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error')
-    def delete(self, task_id):
+    @session_required
+    def delete(self, task_id, current_user):
         try:
-            task = Task.query.get_or_404(task_id)
+            task = TaskService.get_task(task_id, current_user)
+            if task is None:
+                raise NotFound()
 
-            db.session.delete(task)
-            db.session.commit()
+            TaskService.delete_task(task, current_user=current_user)
 
             return '', HTTPStatus.NO_CONTENT
 
@@ -222,7 +509,8 @@ class TaskTags(Resource):
     @ns.response(HTTPStatus.NOT_FOUND, 'Task not found')
     @ns.response(HTTPStatus.BAD_REQUEST, 'Invalid request')
     @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error')
-    def post(self, task_id):
+    @session_required
+    def post(self, task_id, current_user):
         try:
             data = ns.payload
             tag_ids = data.get('tag_ids', [])
@@ -233,7 +521,9 @@ class TaskTags(Resource):
                     'tag_ids must be a list of integers'
                 )
 
-            task = Task.query.get_or_404(task_id)
+            task = TaskService.get_task(task_id, current_user)
+            if task is None:
+                raise NotFound()
 
             tags = Tag.query.filter(Tag.id.in_(tag_ids)).all()
 
@@ -250,6 +540,8 @@ class TaskTags(Resource):
             return {
                 'message': 'Tags updated successfully'
             }, HTTPStatus.OK
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error assigning tags to task: {str(e)}", exc_info=True)
             ns.abort(
@@ -266,7 +558,8 @@ class TaskAssignToProject(Resource):
     @ns.response(HTTPStatus.NOT_FOUND, 'Task or Project not found')
     @ns.response(HTTPStatus.BAD_REQUEST, 'Invalid input')
     @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error')
-    def post(self, task_id):
+    @session_required
+    def post(self, task_id, current_user):
         try:
             data = ns.payload
             project_id = data.get('project_id')
@@ -277,14 +570,16 @@ class TaskAssignToProject(Resource):
                     'message': 'Project ID is required'
                 }, HTTPStatus.BAD_REQUEST
 
-            task = Task.query.get(task_id)
+            task = TaskService.get_task(task_id, current_user)
             if not task:
                 return {
                     'success': False,
                     'message': 'Task not found'
                 }, HTTPStatus.NOT_FOUND
 
-            project = Project.query.get(project_id)
+            # Tasks only move into projects the user can see.
+            project = Project.query.filter(Project.id == project_id,
+                                           project_scope(current_user.id)).first()
             if not project:
                 return {
                     'success': False,
@@ -324,7 +619,8 @@ class TaskComments(Resource):
     @ns.response(HTTPStatus.BAD_REQUEST, 'Bad Request')
     @ns.response(HTTPStatus.NOT_FOUND, 'Not found')
     @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error')
-    def post(self, task_id):
+    @session_required
+    def post(self, task_id, current_user):
         try:
             data = ns.payload
             content = data.get('content')
@@ -335,14 +631,15 @@ class TaskComments(Resource):
                     'message': 'Comment content cannot be empty'
                 }, HTTPStatus.BAD_REQUEST
 
-            task = Task.query.get(task_id)
+            task = TaskService.get_task(task_id, current_user)
             if not task:
                 return {
                     'success': False,
                     'message': 'Task not found'
-                }, HTTPStatus.BAD_REQUEST
+                }, HTTPStatus.NOT_FOUND
 
-            new_comment = Comment(content=content, task=task)
+            new_comment = Comment(content=content, task=task,
+                                  created_at=datetime.now(timezone.utc))
             db.session.add(new_comment)
             db.session.commit()
 
@@ -374,7 +671,8 @@ class TaskAssignUser(Resource):
     @ns.response(HTTPStatus.NOT_FOUND, 'Task or User not found')
     @ns.response(HTTPStatus.BAD_REQUEST, 'Invalid input')
     @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error')
-    def post(self, task_id):
+    @session_required
+    def post(self, task_id, current_user):
         try:
             data = ns.payload
             user_id = data.get('user_id')
@@ -385,21 +683,21 @@ class TaskAssignUser(Resource):
                     'message': 'User ID is required'
                 }, HTTPStatus.BAD_REQUEST
 
-            task = Task.query.get(task_id)
+            task = TaskService.get_task(task_id, current_user)
             if not task:
                 return {
                     'success': False,
                     'message': 'Task not found'
                 }, HTTPStatus.NOT_FOUND
 
-            user = User.query.get(user_id)
+            user = db.session.get(User, user_id)
             if not user:
                 return {
                     'success': False,
                     'message': 'User not found'
                 }, HTTPStatus.NOT_FOUND
 
-            task.user = user
+            task.assignee = user
             db.session.commit()
 
             return {
@@ -408,7 +706,7 @@ class TaskAssignUser(Resource):
                 'data': {
                     'task_id': task.id,
                     'user_id': user.id,
-                    'user_name': user.full_name
+                    'user_name': user.username
                 }
             }, HTTPStatus.OK
 
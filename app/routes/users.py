@@ -4,16 +4,18 @@ from datetime import timedelta
 from functools import wraps
 from http import HTTPStatus
 
-from cryptography.fernet import Fernet
-from flask import Blueprint, request, jsonify, current_app, make_response
+from flask import Blueprint, request, jsonify, current_app, make_response, after_this_request
 from flask_login import login_required
-from flask_restx import Namespace, Resource, fields, abort
+from flask_restx import Namespace, Resource, fields, abort, marshal
 from sqlalchemy.exc import SQLAlchemyError
-from werkzeug.exceptions import BadRequest
-from werkzeug.security import generate_password_hash
-
-from app.models import User, Session
-from app.session import SessionManager
+from werkzeug.exceptions import BadRequest, HTTPException
+
+from app.models import User
+from app.keyring import key_ring
+from app.passwords import PasswordHasherBusy
+from app.session import SessionManager, session_cache
+from app.tokens import StatelessSessionManager
+from app.utils.fieldsets import parse_fields
 from app import db
 
 logger = logging.getLogger(__name__)
@@ -58,6 +60,11 @@ user_model = ns.model('User', {
     'username': fields.String
 })
 
+user_info_parser = ns.parser()
+user_info_parser.add_argument('fields', type=str,
+                              help="User fields to return, e.g. first_name,last_name; "
+                                   "the id is always returned")
+
 
 def session_required(f):
     """
@@ -67,6 +74,14 @@ def session_required(f):
     validates the session, and attaches the current user to the request context.
     If the session is invalid or expired, it aborts the request with an UNAUTHORIZED status.
 
+    Validated sessions are kept in the per-worker `session_cache`, so repeated requests
+    with the same session are authenticated without any database queries until the
+    cache entry expires (`SESSION_CACHE_TTL` seconds). The sliding expiry is renewed on
+    every request, but only written according to the `SessionRenewer` policy.
+
+    With `SESSION_MODE = 'stateless'` the cookie is a signed token instead, validated by
+    `StatelessSessionManager` without reading the `sessions` table.
+
     Args:
         f (function): The view function to be decorated.
 
@@ -80,34 +95,50 @@ def session_required(f):
     def decorated(*args, **kwargs):
         encrypted_session_id = request.cookies.get('session_id')
 
-        print(encrypted_session_id)
-
         if not encrypted_session_id:
             abort(HTTPStatus.UNAUTHORIZED, 'Session ID is missing!')
 
         try:
-            # Decrypt the session ID
-            fernet_key = Fernet(current_app.config['FERNET_KEY'].encode())
-            session_id = fernet_key.decrypt(encrypted_session_id.encode('ascii')).decode('utf-8')
-
-            print(f'Decrypted SessionId: {session_id}')
+            if StatelessSessionManager.is_enabled():
+                resolved = StatelessSessionManager.resolve_session(encrypted_session_id)
+                if resolved is None:
+                    abort(HTTPStatus.UNAUTHORIZED, 'Invalid or expired session')
 
-            if not SessionManager.is_session_valid(session_id):
-                abort(HTTPStatus.UNAUTHORIZED, 'Invalid or expired session')
+                current_user, renewed_token = resolved
+                if renewed_token:
+                    @after_this_request
+                    def renew_cookie(response):
+                        set_session_cookie(response, renewed_token)
+                        return response
 
-            SessionManager.renew_session(session_id)
+                return f(*args, current_user=current_user, **kwargs)
 
-            session = Session.query.filter_by(session_id=session_id).first()
-
-            print(f'SESSION: {session}')
-            current_user = User.query.get(session.user_id)
+            # Decrypt the session ID
+            session_id = key_ring.decrypt(encrypted_session_id)
+
+            # Hot path: a recently validated session authenticates without touching the database
+            cached = session_cache.get(session_id)
+            if cached is not None:
+                expires_at = SessionManager.renew_session(session_id, cached['expires_at'])
+                if expires_at is None:
+                    session_cache.evict(session_id)
+                    abort(HTTPStatus.UNAUTHORIZED, 'Invalid or expired session')
+
+                cached['expires_at'] = expires_at
+                current_user = session_cache.attach_user(cached)
+            else:
+                resolved = SessionManager.resolve_session(session_id)
+                if resolved is None:
+                    abort(HTTPStatus.UNAUTHORIZED, 'Invalid or expired session')
 
-            print(f'CURRENT USER: {current_user}')
-            if not current_user:
-                abort(HTTPStatus.UNAUTHORIZED, 'User not found')
+                current_user, expires_at = resolved
+                session_cache.put(session_id, expires_at, current_user)
 
             return f(*args, current_user=current_user, **kwargs)
 
+        except HTTPException:
+            # Aborts from the session checks above or from the view itself
+            raise
         except Exception as e:
             abort(HTTPStatus.UNAUTHORIZED, str(e))
 
@@ -119,6 +150,17 @@ SESSION_DURATION = timedelta(days=14)
 COOKIE_NAME_SESSION_ID = 'session_id'
 
 
+def set_session_cookie(response, value):
+    response.set_cookie(
+        COOKIE_NAME_SESSION_ID,
+        value,
+        httponly=True,
+        secure=True,
+        samesite='Lax',
+        max_age=int(SESSION_DURATION.total_seconds())
+    )
+
+
 @ns.route('/login')
 class UserLogin(Resource):
     @ns.expect(user_login_model)
@@ -148,28 +190,32 @@ class UserLogin(Resource):
                     'message': 'Incorrect password. Please try again.'
                 }, HTTPStatus.UNAUTHORIZED
 
-            session_id = secrets.token_urlsafe(32)
+            # Upgrade hashes created with an outdated method or work factor
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
 
-            SessionManager.create_session(user.id, session_id)
+            session_id = secrets.token_urlsafe(32)
 
-            fernet_key = Fernet(current_app.config['FERNET_KEY'])
-            encrypted_session_id = fernet_key.encrypt(session_id.encode('ascii')).decode('utf-8')
+            if StatelessSessionManager.is_enabled():
+                encrypted_session_id = StatelessSessionManager.create_session(user.id, session_id)
+            else:
+                SessionManager.create_session(user.id, session_id)
+                encrypted_session_id = key_ring.encrypt(session_id)
 
             response = make_response({
                 'success': True,
                 'message': 'Successfully logged in.'
             })
 
-            response.set_cookie(
-                COOKIE_NAME_SESSION_ID,
-                encrypted_session_id,
-                httponly=True,
-                secure=True,
-                samesite='Lax',
-                max_age=int(SESSION_DURATION.total_seconds())
-            )
+            set_session_cookie(response, encrypted_session_id)
 
             return response
+        except PasswordHasherBusy:
+            return {
+                'success': False,
+                'message': 'The server is busy. Please try again shortly.'
+            }, HTTPStatus.SERVICE_UNAVAILABLE
         except Exception as e:
             current_app.logger.error(f"Login error: {str(e)}")
             return {
@@ -226,6 +272,12 @@ class UserRegister(Resource):
                 'message': 'Registered successfully!'
             }, HTTPStatus.CREATED
 
+        except PasswordHasherBusy:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': 'The server is busy. Please try again shortly.'
+            }, HTTPStatus.SERVICE_UNAVAILABLE
         except SQLAlchemyError as e:
             db.session.rollback()
             current_app.logger.error(f"Database error while registering user: {str(e)}", exc_info=True)
@@ -255,19 +307,25 @@ class RefreshSession(Resource):
             if not encrypted_session_id:
                 return {'message': 'No session ID provided'}, HTTPStatus.UNAUTHORIZED
 
-            # Decrypt the session ID
-            fernet_key = Fernet(current_app.config['FERNET_KEY'])
-            session_id = fernet_key.decrypt(encrypted_session_id.encode('ascii')).decode('utf-8')
+            if StatelessSessionManager.is_enabled():
+                new_token = StatelessSessionManager.update_session_id(
+                    encrypted_session_id, secrets.token_urlsafe(32)
+                )
+                if new_token is None:
+                    return {'message': 'Invalid or expired session'}, HTTPStatus.UNAUTHORIZED
 
-            # Use the SessionManager to validate and refresh the session
-            if SessionManager.is_session_valid(session_id):
-                # Renew the session
-                SessionManager.renew_session(session_id)
+                response = make_response({
+                    'success': True,
+                    'message': 'Session refreshed successfully'
+                })
+                set_session_cookie(response, new_token)
+                return response
 
-                # Get the user associated with this session
-                session = Session.query.filter_by(session_id=session_id).first()
-                user = User.query.get(session.user_id)
+            # Decrypt the session ID
+            session_id = key_ring.decrypt(encrypted_session_id)
 
+            # Use the SessionManager to validate the session; rotating it below restarts the expiry
+            if SessionManager.resolve_session(session_id) is not None:
                 response = make_response({
                     'success': True,
                     'message': 'Session refreshed successfully'
@@ -277,15 +335,10 @@ class RefreshSession(Resource):
                 new_session_id = secrets.token_urlsafe(32)
                 SessionManager.update_session_id(session_id, new_session_id)
 
-                encrypted_new_session_id = fernet_key.encrypt(new_session_id.encode('ascii')).decode('utf-8')
+                key_ring.forget(encrypted_session_id)
+                encrypted_new_session_id = key_ring.encrypt(new_session_id)
 
-                response.set_cookie('session_id',
-                                    encrypted_new_session_id,
-                                    httponly=True,
-                                    secure=True,
-                                    samesite='Lax',
-                                    max_age=int(SESSION_DURATION.total_seconds())
-                                    )
+                set_session_cookie(response, encrypted_new_session_id)
 
                 return response
 
@@ -337,7 +390,7 @@ class UpdateUser(Resource):
                 user.email = email
 
             if password:
-                user.password_hash = generate_password_hash(password)
+                user.set_password(password)
 
             db.session.commit()
             return {
@@ -349,6 +402,12 @@ class UpdateUser(Resource):
                 'success': False,
                 'message': 'Invalid request: {}'.format(e)
             }, 400
+        except PasswordHasherBusy:
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': 'The server is busy. Please try again shortly.'
+            }, HTTPStatus.SERVICE_UNAVAILABLE
         except SQLAlchemyError as e:
             db.session.rollback()
             return {
@@ -373,8 +432,13 @@ class UserLogout(Resource):
     def post(self, current_user):
         try:
             encrypted_session_id = request.cookies.get('session_id')
-            fernet_key = Fernet(current_app.config['FERNET_KEY'].encode())
-            session_id = fernet_key.decrypt(encrypted_session_id.encode('ascii')).decode('utf-8')
+            if StatelessSessionManager.is_enabled():
+                if StatelessSessionManager.invalidate_session(encrypted_session_id):
+                    return {'message': 'Logged out successfully!'}, 200
+                return {'message': 'Invalid session!'}, 400
+
+            session_id = key_ring.decrypt(encrypted_session_id)
+            key_ring.forget(encrypted_session_id)
 
             if SessionManager.invalidate_session(session_id):
                 return {'message': 'Logged out successfully!'}, 200
@@ -387,12 +451,17 @@ class UserLogout(Resource):
 @ns.route('/info')
 class UserInfo(Resource):
     @session_required
-    @ns.response(HTTPStatus.OK, 'Success')
+    @ns.expect(user_info_parser)
+    @ns.response(HTTPStatus.OK, 'Success', user_model)
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Unknown field')
     @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized')
-    @ns.marshal_with(user_model)
     def get(self, **kwargs):
         user = kwargs.get('current_user')
-        return user, HTTPStatus.OK
+        try:
+            names = parse_fields(user_info_parser.parse_args().get('fields'), user_model)
+        except ValueError as e:
+            ns.abort(HTTPStatus.BAD_REQUEST, str(e))
+        return marshal(user, {name: user_model[name] for name in names}), HTTPStatus.OK
 
 
 @ns.route('/check-auth')
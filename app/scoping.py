@@ -0,0 +1,55 @@
+from sqlalchemy import Integer, cast, or_, select, union
+
+from app.models import Activities, Comment, Project, Tag, Task, task_tags
+
+
+def project_ids_query(user_id):
+    """
+    Returns a select of the IDs of the projects a user takes part in, i.e. the projects they
+    created and those with a task assigned to them. Served by the `projects.created_by` and
+    `tasks.assignee_id` indexes.
+    """
+    return union(
+        select(Project.id).where(Project.created_by == user_id),
+        select(Task.project_id).where(Task.assignee_id == user_id, Task.project_id.isnot(None))
+    )
+
+
+def task_scope(user_id):
+    """
+    Returns the condition selecting the tasks a user can see: the tasks assigned to them and
+    every task of their projects.
+    """
+    return or_(Task.assignee_id == user_id, Task.project_id.in_(project_ids_query(user_id)))
+
+
+def task_ids_query(user_id):
+    return select(Task.id).where(task_scope(user_id))
+
+
+def project_scope(user_id):
+    return Project.id.in_(project_ids_query(user_id))
+
+
+def comment_scope(user_id):
+    return Comment.task_id.in_(task_ids_query(user_id))
+
+
+def tag_scope(user_id):
+    """
+    Returns the condition selecting the tags used on the tasks a user can see.
+    """
+    return Tag.id.in_(
+        select(task_tags.c.tag_id).where(task_tags.c.task_id.in_(task_ids_query(user_id)))
+    )
+
+
+def activity_scope(user_id):
+    """
+    Returns the condition selecting the activities a user can see: their own and those of
+    their projects, as streamed to them (see `app.events.Subscription.matches`).
+    """
+    return or_(
+        Activities.user_id == user_id,
+        cast(Activities.detail('project_id'), Integer).in_(project_ids_query(user_id))
+    )
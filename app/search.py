@@ -0,0 +1,173 @@
+import logging
+from collections import defaultdict
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, delete, event, func, insert, inspect, literal, select, text
+
+from app import db
+from app.models import Comment, Project, SearchDocument, Tag, Task
+from app.utils.extensions import extension
+
+logger = logging.getLogger(__name__)
+
+search_cli = AppGroup('search', help='Search index commands.')
+
+documents = SearchDocument.__table__
+
+
+class SearchIndex:
+    """
+    Keeps `search_documents` in step with the tasks, comments, projects and tags it is built from.
+
+    Every flush of the ORM session that adds or deletes one of those rows, or changes its
+    indexed text, re-indexes it on the same connection and in the same transaction, with one
+    `DELETE` and one `INSERT ... SELECT` per type. Writes that bypass the ORM, such as the bulk
+    task endpoints, call `add`, `refresh` and `remove` themselves.
+
+    `flask search rebuild` re-indexes everything, `SEARCH_REBUILD_BATCH_SIZE` rows per
+    transaction, so search keeps working while it runs.
+    """
+
+    # The model and the attributes indexed as the title and the body of each type of document.
+    SOURCES = {
+        'task': (Task, 'title', 'description'),
+        'comment': (Comment, None, 'content'),
+        'project': (Project, 'name', 'description'),
+        'tag': (Tag, 'name', None),
+    }
+    TYPES = {model: target_type for target_type, (model, _, _) in SOURCES.items()}
+
+    def __init__(self):
+        self.batch_size = 10000
+
+    def init_app(self, app):
+        self.batch_size = app.config.get('SEARCH_REBUILD_BATCH_SIZE', 10000)
+        app.cli.add_command(search_cli)
+        if not event.contains(db.session, 'after_flush', index_flushed_changes):
+            event.listen(db.session, 'after_flush', index_flushed_changes)
+
+    def _delete(self, connection, target_type, condition):
+        connection.execute(
+            delete(documents).where(documents.c.target_type == target_type,
+                                    condition(documents.c.target_id))
+        )
+
+    def _insert(self, connection, target_type, condition):
+        model, title, body = self.SOURCES[target_type]
+
+        def indexed(name):
+            return func.coalesce(getattr(model, name), '') if name else literal('')
+
+        connection.execute(insert(documents).from_select(
+            ['target_type', 'target_id', 'title', 'body'],
+            select(literal(target_type), model.id, indexed(title), indexed(body))
+            .where(condition(model.id))
+        ))
+
+    def add(self, target_type, ids, connection=None):
+        """
+        Indexes new rows.
+
+        Args:
+            target_type (str): One of `SOURCES`.
+            ids (list): The IDs of the rows.
+            connection: The connection or session to write with; defaults to `db.session`.
+        """
+        self._insert(connection or db.session, target_type, lambda column: column.in_(ids))
+
+    def remove(self, target_type, ids, connection=None):
+        """
+        Drops the documents of rows that are deleted. `ids` may also be a select of IDs.
+        """
+        self._delete(connection or db.session, target_type, lambda column: column.in_(ids))
+
+    def refresh(self, target_type, ids, connection=None):
+        """
+        Re-indexes changed rows. Rows that no longer exist are dropped from the index.
+        """
+        connection = connection or db.session
+        self._delete(connection, target_type, lambda column: column.in_(ids))
+        self._insert(connection, target_type, lambda column: column.in_(ids))
+
+    def rebuild(self, batch_size=None):
+        """
+        Re-indexes every row, one range of `batch_size` IDs per transaction.
+
+        Returns:
+            dict: The number of documents indexed per type.
+        """
+        batch_size = batch_size or self.batch_size
+        indexed = {}
+        for target_type, (model, _, _) in self.SOURCES.items():
+            indexed[target_type] = 0
+            last_id = 0
+            while True:
+                ids = db.session.scalars(
+                    select(model.id).where(model.id > last_id).order_by(model.id).limit(batch_size)
+                ).all()
+                if ids:
+                    def in_batch(column, low=last_id, high=ids[-1]):
+                        return and_(column > low, column <= high)
+                else:
+                    # Past the last row: drop what is left of rows deleted since the last rebuild.
+                    def in_batch(column, low=last_id):
+                        return column > low
+                self._delete(db.session, target_type, in_batch)
+                self._insert(db.session, target_type, in_batch)
+                db.session.commit()
+                indexed[target_type] += len(ids)
+                if len(ids) < batch_size:
+                    break
+                last_id = ids[-1]
+
+        if db.engine.dialect.name == 'sqlite':
+            # Merges the index segments written batch by batch into one b-tree.
+            db.session.execute(text(
+                "INSERT INTO search_documents_fts (search_documents_fts) VALUES ('optimize')"
+            ))
+            db.session.commit()
+        logger.info(f"Rebuilt the search index: {indexed}")
+        return indexed
+
+
+def index_flushed_changes(session, flush_context):
+    """
+    Re-indexes the rows a flush added, deleted or changed the indexed text of. Listens to
+    `after_flush`, where the session still lists what was flushed.
+    """
+    added, removed, changed = defaultdict(set), defaultdict(set), defaultdict(set)
+    for obj in session.new:
+        if type(obj) in SearchIndex.TYPES:
+            added[SearchIndex.TYPES[type(obj)]].add(obj.id)
+    for obj in session.deleted:
+        if type(obj) in SearchIndex.TYPES:
+            removed[SearchIndex.TYPES[type(obj)]].add(obj.id)
+    for obj in session.dirty:
+        if type(obj) in SearchIndex.TYPES:
+            target_type = SearchIndex.TYPES[type(obj)]
+            _, title, body = SearchIndex.SOURCES[target_type]
+            attrs = inspect(obj).attrs
+            if any(attrs[name].history.has_changes() for name in (title, body) if name):
+                changed[target_type].add(obj.id)
+
+    if not (added or removed or changed):
+        return
+    connection = session.connection()
+    for target_type, ids in added.items():
+        search_index.add(target_type, list(ids), connection)
+    for target_type, ids in changed.items():
+        search_index.refresh(target_type, list(ids), connection)
+    for target_type, ids in removed.items():
+        search_index.remove(target_type, list(ids), connection)
+
+
+search_index = extension('search_index')
+
+
+@search_cli.command('rebuild')
+@click.option('--batch-size', type=int, default=None, help='Rows indexed per transaction.')
+def rebuild_command(batch_size):
+    """Re-index every task, comment, project and tag."""
+    for target_type, count in search_index.rebuild(batch_size).items():
+        click.echo(f'{target_type}: {count} documents indexed')
@@ -0,0 +1,136 @@
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func, select, tuple_
+
+from app import db
+from app.models import Activities, ActivityRollup
+from app.scoping import activity_scope
+from app.utils.cursor import decode_cursor, encode_cursor
+
+
+class ActivityService:
+    FILTERS = ('user_id', 'action_type', 'target_type', 'target_id')
+    MAX_PAGE_SIZE = 100
+
+    @staticmethod
+    def feed(limit=10, cursor=None, current_user=None, **filters):
+        """
+        Returns one page of activities, newest first.
+
+        Pages are keyset-paginated on `(created_at, id)`: the cursor holds the sort key of the
+        last activity of the previous page and the next page starts strictly after it. With
+        the `(<filter>, created_at, id)` indexes this is an index range scan of `limit` rows no
+        matter how deep the page is or how large the table grows.
+
+        Args:
+            limit (int): The page size, capped at `MAX_PAGE_SIZE`.
+            cursor (str): The `next_cursor` of the previous page, or None for the first page.
+            current_user (User): Only return the activities this user can see, see
+                `app.scoping.activity_scope`; None returns all of them.
+            **filters: Equality filters on `user_id`, `action_type`, `target_type` and
+                `target_id`, or on the `actor` and `task_title` details. None values are ignored.
+
+        Returns:
+            tuple: The list of `Activities` and the cursor of the next page (None on the last page).
+
+        Raises:
+            InvalidCursor: If the cursor cannot be decoded.
+            ValueError: If an unknown filter is given.
+        """
+        limit = max(1, min(limit or 10, ActivityService.MAX_PAGE_SIZE))
+
+        query = select(Activities)
+        if current_user is not None:
+            query = query.where(activity_scope(current_user.id))
+        for name, value in filters.items():
+            if name in ActivityService.FILTERS:
+                column = getattr(Activities, name)
+            elif name in Activities.INDEXED_DETAILS:
+                column = Activities.detail(name)
+            else:
+                raise ValueError(f"Unknown filter: {name}")
+            if value is not None:
+                query = query.where(column == value)
+
+        if cursor:
+            created_at, activity_id = decode_cursor(cursor, datetime, int)
+            query = query.where(
+                tuple_(Activities.created_at, Activities.id) < tuple_(created_at, activity_id)
+            )
+
+        query = query.order_by(Activities.created_at.desc(), Activities.id.desc()).limit(limit + 1)
+        activities = db.session.scalars(query).all()
+
+        next_cursor = None
+        if len(activities) > limit:
+            activities = activities[:limit]
+            last = activities[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return activities, next_cursor
+
+    @staticmethod
+    def daily_counts(start, end, user_id=None, action_type=None, current_user=None):
+        """
+        Counts activities per day, user and action between two dates (inclusive).
+
+        Days that `flask activities compact` has rolled up are read from `activity_rollups`.
+        Raw `activities` rows are only aggregated from the oldest remaining raw row onwards,
+        which is normally just the retention window. An activity is always either raw or
+        rolled up, so the two sources are simply added together.
+
+        Args:
+            start (date): The first day to count.
+            end (date): The last day to count.
+            user_id (int): Only count this user's activities.
+            action_type (str): Only count this kind of activity.
+            current_user (User): Only count this user's own activities. Rollups do not keep
+                the project of an activity, so those of the user's projects cannot be counted
+                the same way before and after compaction.
+
+        Returns:
+            list: One dict per day, user and action with `day`, `user_id`, `action_type` and
+                `count`, ordered by day.
+        """
+        counts = Counter()
+
+        rollups = select(
+            ActivityRollup.day, ActivityRollup.user_id, ActivityRollup.action_type,
+            ActivityRollup.count
+        ).where(ActivityRollup.day.between(start, end))
+        if user_id is not None:
+            rollups = rollups.where(ActivityRollup.user_id == user_id)
+        if current_user is not None:
+            rollups = rollups.where(ActivityRollup.user_id == current_user.id)
+        if action_type is not None:
+            rollups = rollups.where(ActivityRollup.action_type == action_type)
+        for row in db.session.execute(rollups):
+            counts[(row.day, row.user_id, row.action_type)] += row.count
+
+        oldest = db.session.scalar(select(func.min(Activities.created_at)))
+        raw_start = datetime.combine(start, time.min)
+        raw_end = datetime.combine(end + timedelta(days=1), time.min)
+        if oldest is not None and oldest.replace(tzinfo=None) < raw_end:
+            day = func.date(Activities.created_at)
+            raw = (
+                select(day.label('day'), Activities.user_id, Activities.action_type,
+                       func.count().label('count'))
+                .where(Activities.created_at >= max(raw_start, oldest.replace(tzinfo=None)))
+                .where(Activities.created_at < raw_end)
+                .group_by(day, Activities.user_id, Activities.action_type)
+            )
+            if user_id is not None:
+                raw = raw.where(Activities.user_id == user_id)
+            if current_user is not None:
+                raw = raw.where(Activities.user_id == current_user.id)
+            if action_type is not None:
+                raw = raw.where(Activities.action_type == action_type)
+            for row in db.session.execute(raw):
+                # SQLite's date() returns a string.
+                row_day = row.day if isinstance(row.day, date) else date.fromisoformat(row.day)
+                counts[(row_day, row.user_id, row.action_type)] += row.count
+
+        return [
+            {'day': day, 'user_id': uid, 'action_type': action, 'count': count}
+            for (day, uid, action), count in sorted(counts.items())
+        ]
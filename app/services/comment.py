@@ -1,5 +1,5 @@
 from sqlalchemy.exc import SQLAlchemyError
-from app.aop import log_activity
+from app.aop import commit, log_activity
 from app.models import Comment
 from app.routes.users import session_required
 from app import db
@@ -34,7 +34,7 @@ class CommentService:
 
             comment = Comment(**data)
             db.session.add(comment)
-            db.session.commit()
+            commit()
             return comment
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -73,7 +73,7 @@ class CommentService:
             if 'content' in data:
                 data.content = data['content']
 
-            db.session.commit()
+            commit()
 
             return comment
         except SQLAlchemyError as e:
@@ -1,13 +1,292 @@
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlalchemy.orm.attributes import InstrumentedAttribute, set_committed_value
 
 from app import db
-from app.aop import log_activity
-from app.models import Project
+from app.aop import commit, log_activity
+from app.models import Project, ProjectSnapshot, Task, User
 from app.routes.users import session_required
+from app.scoping import project_scope
+from app.summaries import summary_cache
+from app.utils.fieldsets import column_loader
 
 
 class ProjectService:
+    COUNTERS = ('total_task_count', 'completed_task_count')
+    # Summed over the tasks of a project in its summary, and over those of each assignee.
+    SUMMARY_TOTALS = ('total', 'completed', 'overdue', 'due_this_week', 'estimated_time',
+                      'actual_time')
+    HISTORY_DAYS = 30
+    MAX_HISTORY_DAYS = 366
+
+    @staticmethod
+    def counts_tasks():
+        """
+        Whether `progress` is counted from the tasks with a GROUP BY rather than read from the
+        counters on each project, see `PROJECT_PROGRESS_SOURCE`.
+        """
+        return current_app.config.get('PROJECT_PROGRESS_SOURCE', 'counters') == 'aggregate'
+
+    @staticmethod
+    def loader_options(fields):
+        """
+        Returns the loader options for reading projects with the given fields: only their
+        columns are selected, with the task counters `progress` is computed from.
+        """
+        extra = ('version',)
+        if 'progress' in fields and not ProjectService.counts_tasks():
+            extra += ProjectService.COUNTERS
+        return [column_loader(Project, fields, *extra)]
+
+    @staticmethod
+    def get_project(project_id, current_user, fields=None):
+        """
+        Returns a project the user can see, or None if it does not exist or is not visible
+        to the user. With `fields`, only those columns are loaded, see `loader_options`.
+        """
+        query = select(Project).where(Project.id == project_id, project_scope(current_user.id))
+        if fields:
+            query = query.options(*ProjectService.loader_options(fields))
+        return db.session.scalars(query).first()
+
+    @staticmethod
+    def load_progress(projects):
+        """
+        Prepares loaded projects for `progress`. With `PROJECT_PROGRESS_SOURCE` set to
+        'aggregate', the tasks of all the projects are counted with one GROUP BY and the counts
+        set as their counters, without marking them changed; otherwise the counters were read
+        with the projects and this does nothing.
+
+        Returns:
+            list: The projects.
+        """
+        if not projects or not ProjectService.counts_tasks():
+            return projects
+        counts = {
+            project_id: (total, completed) for project_id, total, completed in db.session.execute(
+                select(Task.project_id, func.count(Task.id),
+                       func.count(Task.id).filter(Task.is_completed.is_(True)))
+                .where(Task.project_id.in_([project.id for project in projects]))
+                .group_by(Task.project_id)
+            )
+        }
+        for project in projects:
+            for name, count in zip(ProjectService.COUNTERS, counts.get(project.id, (0, 0))):
+                set_committed_value(project, name, count)
+        return projects
+
+    @staticmethod
+    def state(project_id, with_progress=True, current_user=None):
+        """
+        Returns what the ETag of a project is made of, in one query: its version and, as
+        `progress` changes with its tasks and not its version, with `with_progress` the number
+        of its tasks and of those completed.
+
+        Args:
+            project_id (int): The project ID.
+            with_progress (bool): Whether to count the tasks.
+            current_user (User): If given, only a project visible to this user is found.
+
+        Returns:
+            tuple: The version, then the task counts, or None if there is no such project.
+        """
+        if with_progress and ProjectService.counts_tasks():
+            query = (select(Project.version, func.count(Task.id),
+                            func.count(Task.id).filter(Task.is_completed.is_(True)))
+                     .outerjoin(Task, Task.project_id == Project.id).group_by(Project.id))
+        elif with_progress:
+            query = select(Project.version, Project.total_task_count, Project.completed_task_count)
+        else:
+            query = select(Project.version)
+        query = query.where(Project.id == project_id)
+        if current_user is not None:
+            query = query.where(project_scope(current_user.id))
+        row = db.session.execute(query).first()
+        return tuple(row) if row else None
+
+    @staticmethod
+    def state_of(project, with_progress=True):
+        """Returns `state` computed from a loaded project."""
+        if not with_progress:
+            return (project.version,)
+        return project.version, project.total_task_count, project.completed_task_count
+
+    @staticmethod
+    def _summarize(project_id, now):
+        """
+        Aggregates the tasks of a project in one pass, grouped by status, priority and
+        assignee; the totals of each breakdown are summed from those groups.
+        """
+        is_open = Task.is_completed.isnot(True)
+        week_ahead = now + timedelta(days=7)
+        rows = db.session.execute(
+            select(Task.status, Task.priority, Task.assignee_id, User.username,
+                   func.count(Task.id).label('total'),
+                   func.count(Task.id).filter(Task.is_completed.is_(True)).label('completed'),
+                   func.count(Task.id).filter(is_open, Task.due_date < now).label('overdue'),
+                   func.count(Task.id).filter(is_open, Task.due_date >= now,
+                                              Task.due_date < week_ahead).label('due_this_week'),
+                   func.coalesce(func.sum(Task.estimated_time), 0).label('estimated_time'),
+                   func.coalesce(func.sum(Task.actual_time), 0).label('actual_time'))
+            .outerjoin(User, User.id == Task.assignee_id)
+            .where(Task.project_id == project_id)
+            .group_by(Task.status, Task.priority, Task.assignee_id, User.username)
+        ).all()
+
+        totals = dict.fromkeys(ProjectService.SUMMARY_TOTALS, 0)
+        by_status, by_priority, by_assignee = Counter(), Counter(), {}
+        for row in rows:
+            for name in ProjectService.SUMMARY_TOTALS:
+                totals[name] += getattr(row, name)
+            by_status[row.status] += row.total
+            by_priority[row.priority] += row.total
+            assignee = by_assignee.setdefault(row.assignee_id, dict(
+                {'assignee_id': row.assignee_id, 'username': row.username},
+                **dict.fromkeys(ProjectService.SUMMARY_TOTALS, 0)
+            ))
+            for name in ProjectService.SUMMARY_TOTALS:
+                assignee[name] += getattr(row, name)
+
+        def ordered(counts):
+            # The largest groups first, then by value with None last.
+            return sorted(counts.items(),
+                          key=lambda item: (-item[1], item[0] is None, item[0] or 0))
+
+        return dict(
+            totals,
+            project_id=project_id,
+            open=totals['total'] - totals['completed'],
+            by_status=[{'status': status, 'count': count} for status, count in ordered(by_status)],
+            by_priority=[{'priority': priority, 'count': count}
+                         for priority, count in ordered(by_priority)],
+            by_assignee=sorted(by_assignee.values(), key=lambda assignee: (
+                -assignee['total'], assignee['assignee_id'] is None, assignee['assignee_id'] or 0
+            )),
+            generated_at=now,
+        )
+
+    @staticmethod
+    def summary(project_id, current_user):
+        """
+        Returns the dashboard summary of a project: its tasks counted in total, completed,
+        open, overdue and due in the next seven days, by status, by priority and by assignee,
+        with their estimated and actual time in minutes.
+
+        Summaries are computed with one grouped query over the project's tasks and cached per
+        project until a task of the project is written, see `app.summaries`.
+
+        Args:
+            project_id (int): The project ID.
+            current_user (User): The user asking; the project must be visible to them.
+
+        Returns:
+            dict: The summary, or None if there is no such project visible to the user.
+        """
+        visible = db.session.execute(
+            select(Project.id).where(Project.id == project_id, project_scope(current_user.id))
+        ).first()
+        if visible is None:
+            return None
+
+        summary = summary_cache.get(project_id)
+        if summary is None:
+            generation = summary_cache.generation()
+            summary = ProjectService._summarize(project_id, datetime.now(timezone.utc))
+            summary_cache.put(project_id, summary, generation)
+        return summary
+
+    @staticmethod
+    def parse_range(start=None, end=None, today=None):
+        """
+        Parses the `start` and `end` dates (YYYY-MM-DD, both included) of a history. `end`
+        defaults to today and is never later; `start` defaults to `HISTORY_DAYS` days before.
+
+        Raises:
+            ValueError: If a date is malformed, `start` is after `end` or the range is longer
+                than `MAX_HISTORY_DAYS`.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        try:
+            end = min(date.fromisoformat(end), today) if end else today
+            start = (date.fromisoformat(start) if start
+                     else end - timedelta(days=ProjectService.HISTORY_DAYS - 1))
+        except ValueError:
+            raise ValueError("Dates must be given as YYYY-MM-DD")
+        if start > end:
+            raise ValueError("The start date must not be after the end date or today")
+        if (end - start).days >= ProjectService.MAX_HISTORY_DAYS:
+            raise ValueError(f"The range must not exceed {ProjectService.MAX_HISTORY_DAYS} days")
+        return start, end
+
+    @staticmethod
+    def history(project_id, current_user, start, end, today=None):
+        """
+        Returns the burndown and velocity series of a project from its daily snapshots (see
+        `app.maintenance.ProjectSnapshots`), one point per day from `start` to `end`.
+
+        A day without a snapshot carries over the previous one, and today is read from the
+        project's live task counters. Days before the first snapshot have no values.
+        Velocity is the number of tasks completed on a day, net of those reopened or removed.
+
+        Args:
+            project_id (int): The project ID.
+            current_user (User): The user asking; the project must be visible to them.
+            start (date): The first day.
+            end (date): The last day, at the latest today.
+
+        Returns:
+            dict: The `burndown` points, with the open and completed tasks and the estimated
+                minutes left, and the `velocity` points; None if there is no such project
+                visible to the user.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        project = db.session.execute(
+            select(Project.total_task_count, Project.completed_task_count,
+                   Project.remaining_estimated_time)
+            .where(Project.id == project_id, project_scope(current_user.id))
+        ).first()
+        if project is None:
+            return None
+
+        # The snapshots of the range, and the last one before it to carry into its first day.
+        carried_from = (select(func.max(ProjectSnapshot.day))
+                        .where(ProjectSnapshot.project_id == project_id,
+                               ProjectSnapshot.day < start)
+                        .scalar_subquery())
+        snapshots = {
+            row.day: (row.open_count, row.completed_count, row.remaining_estimated_time)
+            for row in db.session.execute(
+                select(ProjectSnapshot.day, ProjectSnapshot.open_count,
+                       ProjectSnapshot.completed_count, ProjectSnapshot.remaining_estimated_time)
+                .where(ProjectSnapshot.project_id == project_id, ProjectSnapshot.day <= end,
+                       ProjectSnapshot.day >= func.coalesce(carried_from, start))
+                .order_by(ProjectSnapshot.day)
+            )
+        }
+        if end == today:
+            total, completed, remaining = project
+            snapshots[today] = (total - completed, completed, remaining)
+
+        burndown, velocity = [], []
+        current = previous = None
+        for day in sorted(day for day in snapshots if day < start):
+            previous = current = snapshots[day]
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            current = snapshots.get(day, current)
+            open_count, completed, remaining = current or (None, None, None)
+            burndown.append({'date': day, 'open': open_count, 'completed': completed,
+                             'remaining_estimated_time': remaining})
+            velocity.append({'date': day, 'completed': completed - previous[1]
+                             if current is not None and previous is not None else None})
+            previous = current
+        return {'project_id': project_id, 'start': start, 'end': end, 'burndown': burndown,
+                'velocity': velocity}
+
     @staticmethod
     @session_required
     @log_activity('create', 'project')
@@ -33,8 +312,9 @@ class ProjectService:
                 raise ValueError("Required values are missing")
 
             project = Project(**data)
+            project.created_by = current_user.id
             db.session.add(project)
-            db.session.commit()
+            commit()
             return project
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -82,7 +362,7 @@ class ProjectService:
                 else:
                     ignored_fields.append(field)
 
-            db.session.commit()
+            commit()
 
             result = {
                 'project': project,
@@ -107,7 +387,7 @@ class ProjectService:
                 raise ValueError("No matching project found")
 
             project.is_archived = True
-            db.session.commit()
+            commit()
             return project
         except SQLAlchemyError as e:
             db.session.rollback()
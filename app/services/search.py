@@ -0,0 +1,217 @@
+import html
+import re
+
+from sqlalchemy import and_, column, func, literal_column, or_, select, table
+
+from app import db
+from app.models import Comment, SearchDocument, task_tags
+from app.scoping import comment_scope, project_ids_query, task_ids_query
+from app.utils.cursor import InvalidCursor, decode_cursor, encode_cursor
+
+documents = SearchDocument.__table__
+# The FTS5 index of `search_documents` on SQLite, see `app.models.SEARCH_INDEX_DDL`.
+fts = table('search_documents_fts', column('rowid'))
+
+
+class SearchService:
+    TYPES = ('task', 'comment', 'project', 'tag')
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    # Put around the matched words in the returned title and snippet, which are HTML-escaped.
+    HIGHLIGHT = ('<mark>', '</mark>')
+    # What the database puts around the matched words, replaced by `HIGHLIGHT` once the text
+    # is escaped. Control characters, so that they cannot be mistaken for markup.
+    MARKERS = ('\x02', '\x03')
+    SNIPPET_WORDS = 24
+    # On SQLite, a match in the title outweighs this many matches in the body.
+    TITLE_WEIGHT = 10.0
+
+    @staticmethod
+    def parse_types(types):
+        """
+        Parses a `types` argument such as `task,comment`. Defaults to every type.
+
+        Raises:
+            ValueError: If a type is unknown.
+        """
+        if not types:
+            return SearchService.TYPES
+        names = tuple(dict.fromkeys(name.strip() for name in types.split(',') if name.strip()))
+        unknown = [name for name in names if name not in SearchService.TYPES]
+        if unknown:
+            raise ValueError(
+                f"Cannot search {', '.join(unknown)}; use any of {', '.join(SearchService.TYPES)}"
+            )
+        return names
+
+    @staticmethod
+    def terms(q):
+        """
+        Splits a query into the words to match, all of which a document must contain.
+        Operators and punctuation are ignored rather than passed to the text search syntax.
+
+        Raises:
+            ValueError: If the query has no words.
+        """
+        words = re.findall(r'\w+', (q or '').lower())
+        if not words:
+            raise ValueError("The search query must contain at least one word")
+        return words
+
+    @staticmethod
+    def visible(current_user, types, source=documents):
+        """
+        Returns the condition selecting the documents of `types` that a user can see, using
+        the same rules as the rest of the API (see `app.scoping`). `source` is
+        `search_documents` or an alias of it.
+        """
+        user_id = current_user.id
+        visible_ids = {
+            'task': lambda: task_ids_query(user_id),
+            'comment': lambda: select(Comment.id).where(comment_scope(user_id)),
+            'project': lambda: project_ids_query(user_id),
+            'tag': lambda: select(task_tags.c.tag_id).where(
+                task_tags.c.task_id.in_(task_ids_query(user_id))
+            ),
+        }
+        return or_(*(
+            and_(source.c.target_type == target_type,
+                 source.c.target_id.in_(visible_ids[target_type]()))
+            for target_type in types
+        ))
+
+    @staticmethod
+    def _sqlite(words):
+        match = ' '.join(f'"{word}"' for word in words)
+        condition = literal_column('search_documents_fts').op('MATCH')(match)
+        # bm25 is lower for better matches.
+        score = -func.bm25(literal_column('search_documents_fts'), SearchService.TITLE_WEIGHT, 1.0)
+        query = select(documents.c.id, documents.c.target_type, documents.c.target_id,
+                       score.label('score'))
+        query = query.select_from(fts.join(documents, documents.c.id == fts.c.rowid))
+        return query.where(condition), score
+
+    @staticmethod
+    def _sqlite_highlights(words, ids):
+        start, end = SearchService.MARKERS
+        match = ' '.join(f'"{word}"' for word in words)
+        index = literal_column('search_documents_fts')
+        return db.session.execute(
+            select(fts.c.rowid, func.highlight(index, 0, start, end),
+                   func.snippet(index, 1, start, end, '…', SearchService.SNIPPET_WORDS))
+            .where(index.op('MATCH')(match), fts.c.rowid.in_(ids))
+        ).all()
+
+    @staticmethod
+    def _postgresql(words):
+        tsquery = func.plainto_tsquery('english', ' '.join(words))
+        document = literal_column('search_documents.document')
+        score = func.ts_rank_cd(document, tsquery)
+        query = select(documents.c.id, documents.c.target_type, documents.c.target_id,
+                       score.label('score'))
+        return query.where(document.op('@@')(tsquery)), score
+
+    @staticmethod
+    def _postgresql_highlights(words, ids):
+        start, end = SearchService.MARKERS
+        tsquery = func.plainto_tsquery('english', ' '.join(words))
+        options = f'StartSel={start}, StopSel={end}'
+        return db.session.execute(
+            select(documents.c.id,
+                   func.ts_headline('english', documents.c.title, tsquery,
+                                    f'{options}, HighlightAll=true'),
+                   func.ts_headline('english', documents.c.body, tsquery,
+                                    f'{options}, MaxWords={SearchService.SNIPPET_WORDS}, '
+                                    'MinWords=8'))
+            .where(documents.c.id.in_(ids))
+        ).all()
+
+    @staticmethod
+    def mark(text):
+        """
+        HTML-escapes a title or snippet highlighted with `MARKERS`, then puts `HIGHLIGHT` around
+        the matched words. Markers typed into the text itself can at worst add a highlight.
+        """
+        if not text:
+            return None
+        start, end = SearchService.MARKERS
+        opening, closing = SearchService.HIGHLIGHT
+        parts = html.escape(text).split(start)
+        marked = [parts[0].replace(end, '')]
+        for part in parts[1:]:
+            word, _, rest = part.partition(end)
+            marked += [opening, word.replace(end, ''), closing, rest.replace(end, '')]
+        return ''.join(marked)
+
+    @staticmethod
+    def search(current_user, q, types=None, limit=None, cursor=None):
+        """
+        Returns one page of the tasks, comments, projects and tags a user can see that contain
+        every word of a query, best matches first.
+
+        Documents are matched and ranked by the database's text index: FTS5 with bm25 on
+        SQLite, a GIN-indexed `tsvector` with `ts_rank_cd` on PostgreSQL. Matches in a title
+        rank above matches in a body. Pages are keyset-paginated on `(score, id)`, and only
+        the rows of the page are highlighted.
+
+        Args:
+            current_user (User): The user searching.
+            q (str): The query.
+            types (tuple): The types of documents to search, see `TYPES`. Defaults to all.
+            limit (int): The page size, at most `MAX_PAGE_SIZE`.
+            cursor (str): The cursor of the previous page, or None for the first page.
+
+        Returns:
+            tuple: The results, as dicts of `type`, `id`, `title`, `snippet` and `score`, and
+                the cursor of the next page (None on the last page).
+
+        Raises:
+            ValueError: If the query has no words.
+            InvalidCursor: If the cursor is malformed or was issued for another query.
+        """
+        words = SearchService.terms(q)
+        types = types or SearchService.TYPES
+        limit = max(1, min(limit or SearchService.DEFAULT_PAGE_SIZE, SearchService.MAX_PAGE_SIZE))
+        postgresql = db.session.get_bind().dialect.name == 'postgresql'
+        if postgresql:
+            query, score = SearchService._postgresql(words)
+            query = query.where(SearchService.visible(current_user, types))
+        else:
+            query, score = SearchService._sqlite(words)
+            # The IDs of the visible documents are collected once and each match is checked
+            # against them before it is joined; `+ 0` stops SQLite from running the match once
+            # per visible ID instead.
+            visible = documents.alias('visible')
+            query = query.where((fts.c.rowid + 0).in_(
+                select(visible.c.id).where(SearchService.visible(current_user, types, visible))
+            ))
+
+        key = ' '.join(words) + '|' + ','.join(types)
+        if cursor:
+            cursor_key, last_score, last_id = decode_cursor(cursor, str, float, int)
+            if cursor_key != key:
+                raise InvalidCursor("The cursor was issued for a different search")
+            query = query.where(or_(score < last_score,
+                                    and_(score == last_score, documents.c.id > last_id)))
+
+        rows = db.session.execute(
+            query.order_by(score.desc(), documents.c.id).limit(limit + 1)
+        ).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(key, rows[-1].score, rows[-1].id)
+
+        highlights = (SearchService._postgresql_highlights if postgresql
+                      else SearchService._sqlite_highlights)
+        marked = {
+            doc_id: (title, snippet)
+            for doc_id, title, snippet in highlights(words, [row.id for row in rows])
+        } if rows else {}
+        results = []
+        for row in rows:
+            title, snippet = marked.get(row.id, ('', ''))
+            results.append({'type': row.target_type, 'id': row.target_id,
+                            'title': SearchService.mark(title),
+                            'snippet': SearchService.mark(snippet), 'score': row.score})
+        return results, next_cursor
@@ -1,12 +1,145 @@
+from datetime import datetime, timezone
+from http import HTTPStatus
+
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, selectinload
 
 from app import db
-from app.aop import log_activity
-from app.models import Task
+from app.aop import activity_batch, commit, log_activity
+from app.counters import project_counters
+from app.models import Comment, Subtask, Task, task_tags
 from app.routes.users import session_required
+from app.scoping import task_scope
+from app.search import search_index
+from app.summaries import summary_cache
+from app.utils.fieldsets import column_loader
+from app.utils.pagination import count_rows, paginate, parse_sort
 
 
 class TaskService:
+    UPDATABLE_FIELDS = ('title', 'description', 'due_date', 'completed_at', 'status', 'priority')
+    SORT_KEYS = {'due_date': datetime, 'priority': int, 'created_at': datetime,
+                 'updated_at': datetime, 'id': int}
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    # Relations that can be loaded with a task; collections are loaded with one extra
+    # SELECT ... IN query each, many-to-one relations are joined into the task query.
+    INCLUDES = ('tags', 'subtasks', 'comments', 'project', 'assignee')
+    COLLECTIONS = ('tags', 'subtasks', 'comments')
+    CREATABLE_FIELDS = UPDATABLE_FIELDS + ('project_id', 'assignee_id')
+    DATETIME_FIELDS = ('due_date', 'completed_at')
+    INTEGER_FIELDS = ('priority', 'project_id', 'assignee_id')
+
+    @staticmethod
+    def parse_include(include):
+        """
+        Parses an `include` argument such as `tags,project`.
+
+        Returns:
+            tuple: The relation names, in `INCLUDES` order.
+
+        Raises:
+            ValueError: If a name is not one of `INCLUDES`.
+        """
+        names = {name.strip() for name in (include or '').split(',') if name.strip()}
+        unknown = names.difference(TaskService.INCLUDES)
+        if unknown:
+            raise ValueError(
+                f"Cannot include {', '.join(sorted(unknown))}; "
+                f"use any of {', '.join(TaskService.INCLUDES)}"
+            )
+        return tuple(name for name in TaskService.INCLUDES if name in names)
+
+    @staticmethod
+    def loader_options(include, fields=None, *extra):
+        """
+        Returns the loader options eagerly loading the given relations, so that a page of tasks
+        and its relations take a fixed number of queries whatever the page size. With `fields`,
+        only those columns (and `extra`) are selected.
+        """
+        options = [
+            selectinload(getattr(Task, name)) if name in TaskService.COLLECTIONS
+            else joinedload(getattr(Task, name))
+            for name in include
+        ]
+        if fields:
+            options.append(column_loader(Task, fields, *extra))
+        return options
+
+    @staticmethod
+    def get_task(task_id, current_user, include=(), fields=None):
+        """
+        Returns a task the user can see, with the given relations loaded.
+
+        Args:
+            task_id (int): The task ID.
+            current_user (User): The user asking for the task.
+            include (tuple): The relations to load with the task, see `INCLUDES`.
+            fields (tuple): The columns to load, or None for all of them. The version is
+                always loaded.
+
+        Returns:
+            Task: The task, or None if it does not exist or is not visible to the user.
+        """
+        query = (select(Task).where(Task.id == task_id, task_scope(current_user.id))
+                 .options(*TaskService.loader_options(include, fields, 'version')))
+        return db.session.scalars(query).unique().one_or_none()
+
+    @staticmethod
+    def get_version(task_id, current_user):
+        """
+        Returns the version of a task the user can see, or None, with a single primary key lookup.
+        """
+        return db.session.scalar(
+            select(Task.version).where(Task.id == task_id, task_scope(current_user.id))
+        )
+
+    @staticmethod
+    def list_tasks(current_user, limit=None, cursor=None, sort=None, count=None, status=None,
+                   include=(), fields=None):
+        """
+        Returns one page of the tasks a user can see: those assigned to them and every task
+        of their projects (see `app.scoping`).
+
+        Pages are keyset-paginated on the sort key with the task id as tiebreaker, so each page
+        is an index range scan of `limit` rows however deep it is; every sort key has a
+        `(sort key, id)` index on `tasks`.
+
+        Args:
+            current_user (User): The user listing the tasks.
+            limit (int): The page size, at most `MAX_PAGE_SIZE`.
+            cursor (str): The cursor of the previous page, or None for the first page.
+            sort (str): One of `SORT_KEYS`, prefixed with `-` for descending order. Defaults to
+                `id`.
+            count (str): 'exact' to count all tasks, 'estimated' to use the planner's estimate
+                where the database provides one, or None to skip counting.
+            status (str): Only return tasks with this status.
+            include (tuple): The relations to load with the tasks, see `INCLUDES`.
+            fields (tuple): The columns to load, or None for all of them. The sort key is
+                always loaded, as the next cursor is built from it.
+
+        Returns:
+            tuple: The tasks, the cursor of the next page (None on the last page) and the
+                total as a `(count, is_estimate)` tuple, or None if not requested.
+
+        Raises:
+            ValueError: If the sort key is not allowed.
+            InvalidCursor: If the cursor is malformed or was issued for another sort order.
+        """
+        limit = max(1, min(limit or TaskService.DEFAULT_PAGE_SIZE, TaskService.MAX_PAGE_SIZE))
+        query = select(Task).where(task_scope(current_user.id))
+        if status:
+            query = query.where(Task.status == status)
+
+        sort_key, _ = parse_sort(sort, TaskService.SORT_KEYS)
+        tasks, next_cursor = paginate(
+            query.options(*TaskService.loader_options(include, fields, sort_key)), Task, sort,
+            tuple(TaskService.SORT_KEYS), limit, cursor, db.session, TaskService.SORT_KEYS
+        )
+        total = count_rows(query, db.session, estimated=count == 'estimated') if count else None
+        return tasks, next_cursor, total
+
     @staticmethod
     @session_required
     @log_activity('create', 'task')
@@ -23,7 +156,8 @@ class TaskService:
             data (dict): A dictionary containing the task data to be used for creating
                          the Task object.
 
-            current_user:
+            current_user: The user creating the task; it is assigned to them unless the
+                          data names another assignee.
 
         Returns:
             Task: The newly created Task object.
@@ -37,11 +171,276 @@ class TaskService:
                 raise ValueError("Required values are missing")
 
             task = Task(**data)
+            if task.assignee_id is None:
+                task.assignee_id = current_user.id
             db.session.add(task)
-            db.session.commit()
+            commit()
             return task
         except SQLAlchemyError as e:
             db.session.rollback()
             raise Exception("Database error occurred") from e
         except Exception as e:
             raise Exception("An error occurred while creating the task") from e
+
+    @staticmethod
+    @log_activity('update', 'task')
+    def update_task(task, data, current_user):
+        """
+        Applies the given field values to a task and saves it.
+
+        Args:
+            task (Task): The task to update.
+            data (dict): The new values; only `UPDATABLE_FIELDS` are applied.
+            current_user (User): The user making the change.
+
+        Returns:
+            Task: The updated task.
+        """
+        for field in TaskService.UPDATABLE_FIELDS:
+            if field in data:
+                setattr(task, field, data[field])
+        commit()
+        return task
+
+    @staticmethod
+    @log_activity('delete', 'task')
+    def delete_task(task, current_user):
+        """
+        Deletes a task.
+
+        Args:
+            task (Task): The task to delete.
+            current_user (User): The user deleting it.
+
+        Returns:
+            Task: The deleted task.
+        """
+        db.session.delete(task)
+        commit()
+        return task
+
+    @staticmethod
+    def _bulk_values(item, allowed):
+        """
+        Validates one item of a bulk request and converts its values to column types.
+
+        Raises:
+            ValueError: If the item is not an object, has fields outside `allowed` or a value
+                of the wrong type.
+        """
+        if not isinstance(item, dict):
+            raise ValueError("Each item must be an object")
+        unknown = set(item).difference(allowed)
+        if unknown:
+            raise ValueError(f"Unknown fields {', '.join(sorted(unknown))}")
+
+        values = {}
+        for field, value in item.items():
+            try:
+                if value is not None and field in TaskService.DATETIME_FIELDS:
+                    value = datetime.fromisoformat(value)
+                elif value is not None and field in TaskService.INTEGER_FIELDS:
+                    value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {field}")
+            values[field] = value
+
+        if 'title' in values and not values['title']:
+            raise ValueError("Title cannot be empty")
+        return values
+
+    @staticmethod
+    def _bulk_ids(items, results, key=None):
+        """
+        Collects the task IDs of a bulk update or delete, recording a BAD_REQUEST result for
+        every item without a valid ID or repeating one.
+
+        Returns:
+            dict: The position of each valid item by task ID.
+        """
+        positions = {}
+        for index, item in enumerate(items):
+            task_id = item.get(key) if key and isinstance(item, dict) else item
+            if not isinstance(task_id, int) or isinstance(task_id, bool):
+                results[index] = {'index': index, 'status': HTTPStatus.BAD_REQUEST,
+                                  'error': "A task id is required"}
+            elif task_id in positions:
+                results[index] = {'index': index, 'id': task_id, 'status': HTTPStatus.BAD_REQUEST,
+                                  'error': "The task appears more than once in the batch"}
+            else:
+                positions[task_id] = index
+        return positions
+
+    @staticmethod
+    def bulk_create(items, current_user):
+        """
+        Creates many tasks in one transaction with multi-row INSERTs, and logs their
+        activities with one bulk write.
+
+        Every item is validated first; invalid items get a BAD_REQUEST result and the others
+        are created. Tasks without an assignee are assigned to the current user.
+
+        Args:
+            items (list): The tasks, as dicts of `CREATABLE_FIELDS`.
+            current_user (User): The user creating the tasks.
+
+        Returns:
+            list: One result per item, in order: its `index`, `status` and the new task's `id`,
+                or an `error`.
+        """
+        results = [None] * len(items)
+        rows, positions = [], []
+        for index, item in enumerate(items):
+            try:
+                values = TaskService._bulk_values(item, TaskService.CREATABLE_FIELDS)
+            except ValueError as e:
+                results[index] = {'index': index, 'status': HTTPStatus.BAD_REQUEST, 'error': str(e)}
+                continue
+            if not values.get('title'):
+                results[index] = {'index': index, 'status': HTTPStatus.BAD_REQUEST,
+                                  'error': "Title is required"}
+                continue
+            if values.get('assignee_id') is None:
+                values['assignee_id'] = current_user.id
+            # Rows with the same keys are inserted together, in as few statements as possible.
+            rows.append({field: values.get(field) for field in TaskService.CREATABLE_FIELDS})
+            positions.append(index)
+
+        if rows:
+            with activity_batch('create', 'task', current_user) as logged:
+                # A Core insert keeps every row in one multi-row INSERT (the ORM splits rows by
+                # which values are None), and returns the rows in the order of `rows`.
+                table = Task.__table__
+                created = db.session.execute(
+                    insert(table).returning(table.c.id, table.c.title, table.c.project_id,
+                                            sort_by_parameter_order=True),
+                    rows
+                ).all()
+                search_index.add('task', [row.id for row in created])
+                project_counters.adjust(added=[(row.project_id, False, None) for row in created])
+                summary_cache.invalidate(row.project_id for row in created)
+                logged.extend(created)
+
+            for index, row in zip(positions, created):
+                results[index] = {'index': index, 'id': row.id, 'status': HTTPStatus.CREATED}
+        return results
+
+    @staticmethod
+    def bulk_update(items, current_user):
+        """
+        Partially updates many tasks in one transaction with an executemany UPDATE, and logs
+        their activities with one bulk write.
+
+        Each item names the task by `id` and carries the `UPDATABLE_FIELDS` to change, and
+        optionally the `version` it was read at. Items that are invalid get a BAD_REQUEST
+        result, tasks that do not exist or are not visible to the user a NOT_FOUND result, and
+        tasks changed since the given version a PRECONDITION_FAILED result.
+
+        Args:
+            items (list): The changes, as dicts with an `id`.
+            current_user (User): The user making the changes.
+
+        Returns:
+            list: One result per item, in order: its `index`, `id`, `status` and the task's new
+                `version`, or an `error`.
+
+        Raises:
+            StaleDataError: If a task changed between reading its version and updating it.
+        """
+        results = [None] * len(items)
+        positions = TaskService._bulk_ids(items, results, key='id')
+        changes = {}
+        for task_id, index in positions.items():
+            item = {field: value for field, value in items[index].items()
+                    if field not in ('id', 'version')}
+            try:
+                changes[task_id] = TaskService._bulk_values(item, TaskService.UPDATABLE_FIELDS)
+            except ValueError as e:
+                results[index] = {'index': index, 'id': task_id, 'status': HTTPStatus.BAD_REQUEST,
+                                  'error': str(e)}
+
+        versions = dict(db.session.execute(
+            select(Task.id, Task.version)
+            .where(Task.id.in_(list(changes)), task_scope(current_user.id))
+        ).all()) if changes else {}
+        now = datetime.now(timezone.utc)
+        params = []
+        for task_id, values in changes.items():
+            index = positions[task_id]
+            expected = items[index].get('version')
+            if task_id not in versions:
+                results[index] = {'index': index, 'id': task_id, 'status': HTTPStatus.NOT_FOUND,
+                                  'error': "Task not found"}
+            elif expected is not None and expected != versions[task_id]:
+                results[index] = {'index': index, 'id': task_id,
+                                  'status': HTTPStatus.PRECONDITION_FAILED,
+                                  'version': versions[task_id],
+                                  'error': "The task has changed since that version"}
+            else:
+                # The version is matched in the UPDATE's WHERE clause and incremented.
+                params.append(dict(values, id=task_id, version=versions[task_id], updated_at=now))
+                results[index] = {'index': index, 'id': task_id, 'status': HTTPStatus.OK,
+                                  'version': versions[task_id] + 1}
+
+        if params:
+            with activity_batch('update', 'task', current_user) as logged:
+                db.session.execute(update(Task), params)
+                retitled = [p['id'] for p in params if 'title' in p or 'description' in p]
+                if retitled:
+                    search_index.refresh('task', retitled)
+                updated = db.session.execute(
+                    select(Task.id, Task.title, Task.project_id)
+                    .where(Task.id.in_([p['id'] for p in params]))
+                ).all()
+                summary_cache.invalidate(row.project_id for row in updated)
+                logged.extend(updated)
+        return results
+
+    @staticmethod
+    def bulk_delete(task_ids, current_user):
+        """
+        Deletes many tasks in one transaction, and logs their activities with one bulk write.
+
+        The comments of the deleted tasks are deleted with them, their tags are unlinked and
+        their subtasks detached.
+
+        Args:
+            task_ids (list): The IDs of the tasks to delete.
+            current_user (User): The user deleting them.
+
+        Returns:
+            list: One result per ID, in order: its `index`, `id` and `status`, or an `error`.
+        """
+        results = [None] * len(task_ids)
+        positions = TaskService._bulk_ids(task_ids, results)
+
+        targets = db.session.execute(
+            select(Task.id, Task.title, Task.project_id, Task.is_completed, Task.estimated_time)
+            .where(Task.id.in_(list(positions)), task_scope(current_user.id))
+        ).all() if positions else []
+        found = {row.id for row in targets}
+
+        for task_id, index in positions.items():
+            if task_id in found:
+                results[index] = {'index': index, 'id': task_id, 'status': HTTPStatus.NO_CONTENT}
+            else:
+                results[index] = {'index': index, 'id': task_id, 'status': HTTPStatus.NOT_FOUND,
+                                  'error': "Task not found"}
+
+        if found:
+            with activity_batch('delete', 'task', current_user) as logged:
+                search_index.remove('comment',
+                                    select(Comment.id).where(Comment.task_id.in_(list(found))))
+                search_index.remove('task', list(found))
+                db.session.execute(delete(task_tags).where(task_tags.c.task_id.in_(list(found))))
+                db.session.execute(delete(Comment).where(Comment.task_id.in_(list(found))))
+                db.session.execute(
+                    update(Subtask).where(Subtask.task_id.in_(list(found))).values(task_id=None)
+                )
+                db.session.execute(delete(Task).where(Task.id.in_(list(found))))
+                project_counters.adjust(removed=[
+                    (row.project_id, row.is_completed, row.estimated_time) for row in targets
+                ])
+                summary_cache.invalidate(row.project_id for row in targets)
+                logged.extend(targets)
+        return results
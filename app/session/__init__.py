@@ -0,0 +1,23 @@
+from app.session.cache import SessionCache, session_cache
+from app.session.manager import SessionManager
+from app.session.renewal import SessionRenewer, session_renewer
+from app.session.stores import (
+    MemorySessionStore,
+    RedisSessionStore,
+    SessionStore,
+    SqlSessionStore,
+    create_session_store
+)
+
+__all__ = [
+    'MemorySessionStore',
+    'RedisSessionStore',
+    'SessionCache',
+    'SessionManager',
+    'SessionRenewer',
+    'SessionStore',
+    'SqlSessionStore',
+    'create_session_store',
+    'session_cache',
+    'session_renewer'
+]
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+from app import db
+from app.models import User
+from app.utils.cache import TTLCache
+from app.utils.extensions import extension
+
+
+def _as_utc(value):
+    # SQLite hands back naive datetimes even for timezone-aware columns.
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class SessionCache:
+    """
+    Per-worker cache of validated sessions used by the `session_required` decorator.
+
+    Each entry is keyed by the decrypted session ID and holds the session expiry together
+    with a snapshot of the user's columns (the password hash is left out). A cache hit
+    rebuilds the user and attaches it to the current database session without issuing
+    any query, so the view can still modify and commit it.
+    """
+
+    USER_SNAPSHOT_FIELDS = ('id', 'first_name', 'last_name', 'username', 'email', 'view_mode')
+
+    def __init__(self, maxsize=1024, ttl=30):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def init_app(self, app):
+        self._cache.configure(
+            maxsize=app.config.get('SESSION_CACHE_SIZE', 1024),
+            ttl=app.config.get('SESSION_CACHE_TTL', 30)
+        )
+
+    def get(self, session_id):
+        """
+        Returns the cached entry for a session ID, or None when it is missing or the session
+        expired.
+
+        The entry is a dict with the session's `expires_at` and the `user` snapshot. Callers may
+        update `expires_at` in place when they slide the expiry.
+        """
+        entry = self._cache.get(session_id)
+        if entry is None:
+            return None
+
+        if entry['expires_at'] <= datetime.now(timezone.utc):
+            self._cache.delete(session_id)
+            return None
+
+        return entry
+
+    @staticmethod
+    def attach_user(entry):
+        """
+        Rebuilds the user from a cache entry and attaches it to the current database session.
+        """
+        user = User(**entry['user'])
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def get_user(self, session_id):
+        """
+        Returns the cached user for a session ID, or None when the entry is missing or expired.
+        """
+        entry = self.get(session_id)
+        if entry is None:
+            return None
+        return self.attach_user(entry)
+
+    def put(self, session_id, expires_at, user):
+        self._cache.set(session_id, {
+            'expires_at': _as_utc(expires_at),
+            'user': {field: getattr(user, field) for field in self.USER_SNAPSHOT_FIELDS}
+        })
+
+    def evict(self, session_id):
+        return self._cache.delete(session_id)
+
+    def evict_user(self, user_id):
+        return self._cache.delete_where(lambda entry: entry['user']['id'] == user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+    def __len__(self):
+        return len(self._cache)
+
+
+session_cache = extension('session_cache')
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _evict_cached_user(mapper, connection, target):
+    session_cache.evict_user(target.id)
@@ -0,0 +1,96 @@
+from flask import current_app
+from sqlalchemy import delete
+
+from app import db
+from app.models import RefreshToken
+from app.session.cache import session_cache
+
+
+class SessionManager:
+    """
+    Session operations used by the user routes and `session_required`.
+
+    Sessions are kept in the application's `SessionStore` (see `SESSION_STORE`); the
+    per-worker `session_cache` is kept in step with every change.
+    """
+
+    @staticmethod
+    def store():
+        return current_app.extensions['session_store']
+
+    @staticmethod
+    def create_session(user_id, session_id):
+        SessionManager.store().create(session_id, user_id)
+
+    @staticmethod
+    def invalidate_session(session_id):
+        session_cache.evict(session_id)
+        return SessionManager.store().delete(session_id)
+
+    @staticmethod
+    def invalidate_user_sessions(user_id):
+        """
+        Revokes every session and refresh token of a user.
+
+        Returns:
+            dict: The number of sessions and refresh tokens removed.
+        """
+        session_cache.evict_user(user_id)
+        removed = {'sessions': SessionManager.store().delete_user(user_id)}
+
+        result = db.session.execute(
+            delete(RefreshToken)
+            .where(RefreshToken.user_id == user_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        removed['refresh_tokens'] = result.rowcount
+        return removed
+
+    @staticmethod
+    def resolve_session(session_id):
+        """
+        Validates a session, slides its expiry and loads its user.
+
+        With the SQL store the session and its user are read with a single joined SELECT and
+        the expiry is only written when the `SessionRenewer` policy asks for it, so a typical
+        authenticated request costs exactly one statement.
+
+        Args:
+            session_id (str): The decrypted session ID.
+
+        Returns:
+            tuple: The `User` and the expiry now in effect, or None if the session is
+                unknown or has expired.
+        """
+        return SessionManager.store().resolve(session_id)
+
+    @staticmethod
+    def renew_session(session_id, expires_at=None):
+        """
+        Slides the session expiry.
+
+        Args:
+            session_id (str): The decrypted session ID.
+            expires_at (datetime): The expiry already known to the caller. When omitted the
+                session is looked up first.
+
+        Returns:
+            datetime: The expiry now in effect, or None if the session does not exist.
+        """
+        return SessionManager.store().touch(session_id, expires_at)
+
+    @staticmethod
+    def is_session_valid(session_id):
+        return SessionManager.store().get(session_id) is not None
+
+    @staticmethod
+    def update_session_id(old_session_id, new_session_id):
+        """
+        Rotates a session ID and restarts its expiry.
+
+        Returns:
+            bool: True if the old session existed and was rotated.
+        """
+        session_cache.evict(old_session_id)
+        return SessionManager.store().rename(old_session_id, new_session_id)
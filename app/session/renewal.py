@@ -0,0 +1,144 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import case, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models import Session
+from app.utils.extensions import extension
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRenewer:
+    """
+    Decides when a sliding session expiry actually has to be written to the database.
+
+    In the default `threshold` mode the new expiry is only written once the remaining
+    lifetime has dropped below `SESSION_RENEW_THRESHOLD` (a fraction of `SESSION_LIFETIME`),
+    so a busy session costs one UPDATE every few minutes instead of one per request.
+
+    In `write-behind` mode every renewal is recorded in memory and a background thread
+    writes all pending renewals of this worker in a single UPDATE every
+    `SESSION_RENEW_FLUSH_INTERVAL` seconds. Pending renewals are also taken into account
+    when this worker validates a session, and are flushed when the process exits.
+    """
+
+    THRESHOLD = 'threshold'
+    WRITE_BEHIND = 'write-behind'
+
+    def __init__(self):
+        self.lifetime = timedelta(hours=1)
+        self.threshold = 0.9
+        self.mode = self.THRESHOLD
+        self.flush_interval = 5
+        self._app = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def init_app(self, app):
+        self._app = app
+        self.lifetime = timedelta(seconds=app.config.get('SESSION_LIFETIME', 3600))
+        self.threshold = app.config.get('SESSION_RENEW_THRESHOLD', 0.9)
+        self.mode = app.config.get('SESSION_RENEW_MODE', self.THRESHOLD)
+        self.flush_interval = app.config.get('SESSION_RENEW_FLUSH_INTERVAL', 5)
+        if self.mode == self.WRITE_BEHIND:
+            atexit.register(self._flush_on_exit)
+
+    def renew(self, session_id, expires_at, now=None):
+        """
+        Slides the expiry of a session and returns the expiry that is now in effect.
+
+        Args:
+            session_id (str): The decrypted session ID.
+            expires_at (datetime): The expiry currently known for the session.
+            now (datetime): The current time, defaults to `datetime.now(timezone.utc)`.
+
+        Returns:
+            datetime: The new expiry, or the unchanged one when no write was needed yet.
+        """
+        now = now or datetime.now(timezone.utc)
+        new_expiry = now + self.lifetime
+
+        if self.mode == self.WRITE_BEHIND:
+            with self._lock:
+                self._pending[session_id] = new_expiry
+            self._ensure_flusher()
+            return new_expiry
+
+        if expires_at is not None and expires_at - now >= self.lifetime * self.threshold:
+            return expires_at
+
+        # Written on its own connection so the request's unit of work (and the objects it
+        # already loaded) is not committed or expired by a renewal.
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(Session.__table__)
+                .where(Session.session_id == session_id)
+                .values(expires_at=new_expiry)
+            )
+        return new_expiry
+
+    def pending_expiry(self, session_id):
+        with self._lock:
+            return self._pending.get(session_id)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._pending.pop(session_id, None)
+
+    def flush(self):
+        """
+        Writes every pending renewal of this worker with one UPDATE statement.
+
+        Returns:
+            int: The number of sessions whose expiry was written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(Session.__table__)
+                    .where(Session.session_id.in_(list(pending)))
+                    .values(expires_at=case(pending, value=Session.session_id))
+                )
+            return len(pending)
+        except SQLAlchemyError:
+            logger.error("Error writing pending session renewals", exc_info=True)
+            with self._lock:
+                for session_id, expires_at in pending.items():
+                    self._pending.setdefault(session_id, expires_at)
+            return 0
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='session-renewer',
+                                                daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            with self._app.app_context():
+                self.flush()
+
+    def _flush_on_exit(self):
+        if self._app is not None:
+            with self._app.app_context():
+                self.flush()
+
+
+session_renewer = extension('session_renewer')
@@ -0,0 +1,344 @@
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import delete, select, update
+
+from app import db
+from app.models import Session, User
+from app.session.cache import _as_utc
+from app.session.renewal import session_renewer
+from app.utils.resp import RespClient, RespError
+
+SessionRecord = namedtuple('SessionRecord', ['user_id', 'expires_at'])
+
+
+class SessionStore(ABC):
+    """
+    Where server-side sessions live.
+
+    `SessionManager` only talks to this interface, so the backend can be chosen with the
+    `SESSION_STORE` setting. Every store keeps sessions for `lifetime` after they were last
+    touched and forgets them afterwards.
+    """
+
+    def __init__(self, lifetime=timedelta(hours=1)):
+        self.lifetime = lifetime
+
+    @abstractmethod
+    def create(self, session_id, user_id):
+        """Stores a new session of a user, expiring `lifetime` from now."""
+
+    @abstractmethod
+    def get(self, session_id):
+        """
+        Returns:
+            SessionRecord: The session's user ID and expiry, or None if it is unknown or expired.
+        """
+
+    @abstractmethod
+    def touch(self, session_id, expires_at=None):
+        """
+        Slides the expiry of a session.
+
+        Returns:
+            datetime: The expiry now in effect, or None if the session does not exist.
+        """
+
+    @abstractmethod
+    def rename(self, old_session_id, new_session_id):
+        """
+        Moves a session to a new ID and restarts its expiry.
+
+        Returns:
+            bool: True if the old session existed.
+        """
+
+    @abstractmethod
+    def delete(self, session_id):
+        """Removes a session, if it exists."""
+
+    @abstractmethod
+    def delete_user(self, user_id):
+        """
+        Removes every session of a user.
+
+        Returns:
+            int: The number of sessions removed.
+        """
+
+    def resolve(self, session_id):
+        """
+        Validates a session, slides its expiry and loads its user.
+
+        Returns:
+            tuple: The `User` and the expiry now in effect, or None if the session is not valid.
+        """
+        record = self.get(session_id)
+        if record is None:
+            return None
+
+        user = db.session.get(User, record.user_id)
+        if user is None:
+            return None
+        return user, self.touch(session_id, record.expires_at)
+
+
+class SqlSessionStore(SessionStore):
+    """
+    Sessions in the `sessions` table. Expiry writes follow the `session_renewer` policy.
+    """
+
+    def create(self, session_id, user_id):
+        db.session.add(Session.create(
+            user_id=user_id,
+            session_id=session_id,
+            expiration_delta=self.lifetime
+        ))
+        db.session.commit()
+
+    def get(self, session_id):
+        session = Session.query.filter_by(session_id=session_id).first()
+        if session is None:
+            return None
+
+        expires_at = session_renewer.pending_expiry(session_id) or _as_utc(session.expires_at)
+        if expires_at <= datetime.now(timezone.utc):
+            return None
+        return SessionRecord(session.user_id, expires_at)
+
+    def resolve(self, session_id):
+        """
+        Reads the session and its user with a single joined SELECT; the expiry is then slid
+        through `session_renewer`, which only writes when its policy asks for it.
+        """
+        row = db.session.execute(
+            select(User, Session.expires_at)
+            .join(Session, Session.user_id == User.id)
+            .where(Session.session_id == session_id)
+        ).first()
+
+        if row is None:
+            return None
+
+        user, expires_at = row
+        expires_at = session_renewer.pending_expiry(session_id) or _as_utc(expires_at)
+        if expires_at <= datetime.now(timezone.utc):
+            return None
+
+        return user, session_renewer.renew(session_id, expires_at)
+
+    def touch(self, session_id, expires_at=None):
+        if expires_at is None:
+            record = self.get(session_id)
+            if record is None:
+                return None
+            expires_at = record.expires_at
+        return session_renewer.renew(session_id, expires_at)
+
+    def rename(self, old_session_id, new_session_id):
+        session_renewer.discard(old_session_id)
+        result = db.session.execute(
+            update(Session)
+            .where(Session.session_id == old_session_id)
+            .values(
+                session_id=new_session_id,
+                expires_at=datetime.now(timezone.utc) + self.lifetime
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def delete(self, session_id):
+        session_renewer.discard(session_id)
+        deleted = Session.query.filter_by(session_id=session_id).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted > 0
+
+    def delete_user(self, user_id):
+        result = db.session.execute(
+            delete(Session)
+            .where(Session.user_id == user_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Sessions in a dict of this process.
+
+    Only suitable when a single process serves the application (threads are fine), for
+    example a single-node deployment running one worker or local development. Expired
+    sessions are dropped when read and swept at most once a minute when sessions are created.
+    """
+
+    SWEEP_INTERVAL = timedelta(minutes=1)
+
+    def __init__(self, lifetime=timedelta(hours=1)):
+        super().__init__(lifetime)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._swept_at = datetime.now(timezone.utc)
+
+    def _sweep(self, now):
+        if now - self._swept_at < self.SWEEP_INTERVAL:
+            return
+        self._sessions = {
+            session_id: record for session_id, record in self._sessions.items()
+            if record.expires_at > now
+        }
+        self._swept_at = now
+
+    def create(self, session_id, user_id):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self._sweep(now)
+            self._sessions[session_id] = SessionRecord(user_id, now + self.lifetime)
+
+    def get(self, session_id):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if record is None:
+                return None
+            if record.expires_at <= now:
+                del self._sessions[session_id]
+                return None
+            return record
+
+    def touch(self, session_id, expires_at=None):
+        expires_at = datetime.now(timezone.utc) + self.lifetime
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if record is None:
+                return None
+            self._sessions[session_id] = record._replace(expires_at=expires_at)
+        return expires_at
+
+    def rename(self, old_session_id, new_session_id):
+        with self._lock:
+            record = self._sessions.pop(old_session_id, None)
+            if record is None:
+                return False
+            self._sessions[new_session_id] = record._replace(
+                expires_at=datetime.now(timezone.utc) + self.lifetime
+            )
+        return True
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def delete_user(self, user_id):
+        with self._lock:
+            session_ids = [key for key, record in self._sessions.items()
+                           if record.user_id == user_id]
+            for session_id in session_ids:
+                del self._sessions[session_id]
+        return len(session_ids)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions in a Redis-protocol key-value server, shared by every worker and node.
+
+    Each session is a `session:<id>` key holding the user ID, expired by the server's own
+    TTL. A `user_sessions:<user id>` set tracks a user's sessions so they can all be
+    revoked at once.
+    """
+
+    def __init__(self, url, lifetime=timedelta(hours=1)):
+        super().__init__(lifetime)
+        self.client = RespClient.from_url(url)
+
+    @property
+    def ttl(self):
+        return int(self.lifetime.total_seconds())
+
+    @staticmethod
+    def _key(session_id):
+        return f'session:{session_id}'
+
+    @staticmethod
+    def _user_key(user_id):
+        return f'user_sessions:{user_id}'
+
+    def create(self, session_id, user_id):
+        self.client.pipeline(
+            ('SET', self._key(session_id), user_id, 'EX', self.ttl),
+            ('SADD', self._user_key(user_id), session_id),
+            ('EXPIRE', self._user_key(user_id), self.ttl)
+        )
+
+    def get(self, session_id):
+        user_id, ttl = self.client.pipeline(
+            ('GET', self._key(session_id)),
+            ('PTTL', self._key(session_id))
+        )
+        if user_id is None or isinstance(ttl, RespError) or ttl < 0:
+            return None
+        return SessionRecord(int(user_id), datetime.now(timezone.utc) + timedelta(milliseconds=ttl))
+
+    def touch(self, session_id, expires_at=None):
+        if not self.client.execute('EXPIRE', self._key(session_id), self.ttl):
+            return None
+        return datetime.now(timezone.utc) + self.lifetime
+
+    def rename(self, old_session_id, new_session_id):
+        # RENAME fails on a missing (or expired) key, so there is no need to look the session
+        # up first; its user ID is read back from the new key for the user's set.
+        renamed, _, user_id = self.client.pipeline(
+            ('RENAME', self._key(old_session_id), self._key(new_session_id)),
+            ('EXPIRE', self._key(new_session_id), self.ttl),
+            ('GET', self._key(new_session_id))
+        )
+        if isinstance(renamed, RespError):
+            if 'no such key' in str(renamed):
+                return False
+            raise renamed
+
+        self.client.pipeline(
+            ('SREM', self._user_key(user_id), old_session_id),
+            ('SADD', self._user_key(user_id), new_session_id),
+            ('EXPIRE', self._user_key(user_id), self.ttl)
+        )
+        return True
+
+    def delete(self, session_id):
+        user_id = self.client.execute('GET', self._key(session_id))
+        if user_id is None:
+            return False
+
+        deleted, _ = self.client.pipeline(
+            ('DEL', self._key(session_id)),
+            ('SREM', self._user_key(user_id), session_id)
+        )
+        return deleted == 1
+
+    def delete_user(self, user_id):
+        session_ids = self.client.execute('SMEMBERS', self._user_key(user_id)) or []
+        keys = [self._key(session_id) for session_id in session_ids]
+        deleted = self.client.execute('DEL', *keys) if keys else 0
+        self.client.execute('DEL', self._user_key(user_id))
+        return deleted
+
+
+def create_session_store(app):
+    """
+    Builds the session store selected by `SESSION_STORE` ('sql', 'memory' or 'redis').
+    """
+    lifetime = timedelta(seconds=app.config.get('SESSION_LIFETIME', 3600))
+    backend = app.config.get('SESSION_STORE', 'sql')
+
+    if backend == 'sql':
+        return SqlSessionStore(lifetime)
+    if backend == 'memory':
+        return MemorySessionStore(lifetime)
+    if backend == 'redis':
+        url = app.config.get('SESSION_STORE_URL', 'redis://localhost:6379/0')
+        return RedisSessionStore(url, lifetime)
+    raise ValueError(f"Unknown SESSION_STORE: {backend}")
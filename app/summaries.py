@@ -0,0 +1,111 @@
+import threading
+
+from sqlalchemy import event, inspect
+
+from app import db
+from app.models import Task
+from app.utils.cache import TTLCache
+from app.utils.extensions import extension
+
+
+class ProjectSummaryCache:
+    """
+    Per-worker cache of project summaries (see `ProjectService.summary`), keyed by project ID.
+
+    Every flush that creates, changes or deletes a task notes its projects, old and new, and
+    their summaries are evicted once the transaction commits. Writes that bypass the ORM, such
+    as the bulk task endpoints, call `invalidate` themselves. Workers only evict their own
+    entries, so another worker may serve a summary up to `PROJECT_SUMMARY_CACHE_TTL` seconds
+    old; the overdue and due-this-week counts, which move with the clock, are as fresh.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._cache.configure(
+            maxsize=app.config.get('PROJECT_SUMMARY_CACHE_SIZE', 1024),
+            ttl=app.config.get('PROJECT_SUMMARY_CACHE_TTL', 60)
+        )
+        for name, listener in (('after_flush', note_flushed_projects),
+                               ('after_commit', evict_committed_projects),
+                               ('after_rollback', forget_rolled_back_projects)):
+            if not event.contains(db.session, name, listener):
+                event.listen(db.session, name, listener)
+
+    def generation(self):
+        """
+        Returns a token to pass to `put`, taken before a summary is computed, so that a summary
+        computed while another request evicted it is not cached.
+        """
+        return self._generation
+
+    def get(self, project_id):
+        return self._cache.get(project_id)
+
+    def put(self, project_id, summary, generation):
+        with self._lock:
+            if generation == self._generation:
+                self._cache.set(project_id, summary)
+
+    def evict(self, project_ids):
+        with self._lock:
+            self._generation += 1
+            for project_id in project_ids:
+                self._cache.delete(project_id)
+
+    def invalidate(self, project_ids, session=None):
+        """
+        Evicts the summaries of projects once the current transaction commits.
+
+        Args:
+            project_ids (iterable): The projects, None for tasks without one.
+            session: The session of the transaction; defaults to `db.session`.
+        """
+        pending = (session or db.session).info.setdefault('summary_projects', set())
+        pending.update(project_id for project_id in project_ids if project_id is not None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+def note_flushed_projects(session, flush_context):
+    """
+    Notes the projects of the tasks a flush added, changed or deleted, and those changed
+    tasks were moved from. Listens to `after_flush`.
+    """
+    project_ids = set()
+    for task in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(task, Task):
+            state = inspect(task)
+            if 'project_id' not in state.dict:
+                # Not loaded, so its project is unknown without a query.
+                session.info['summary_projects_unknown'] = True
+                continue
+            project_ids.add(state.dict['project_id'])
+            project_ids.update(state.attrs.project_id.history.deleted)
+    if project_ids:
+        summary_cache.invalidate(project_ids, session)
+
+
+def evict_committed_projects(session):
+    if session.info.pop('summary_projects_unknown', False):
+        session.info.pop('summary_projects', None)
+        summary_cache.clear()
+    elif session.info.get('summary_projects'):
+        summary_cache.evict(session.info.pop('summary_projects'))
+
+
+def forget_rolled_back_projects(session):
+    session.info.pop('summary_projects', None)
+    session.info.pop('summary_projects_unknown', None)
+
+
+summary_cache = extension('summary_cache')
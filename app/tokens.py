@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+import jwt
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import RevokedSession, User
+from app.session import session_cache, session_renewer
+from app.utils.bloom import BloomFilter
+from app.utils.extensions import extension
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    Per-worker view of the `revoked_sessions` table.
+
+    Revoked session IDs are held in a Bloom filter that is rebuilt from the table every
+    `SESSION_REVOCATION_REFRESH` seconds. A session that is not in the filter is certainly
+    not revoked, so valid tokens are accepted without a database read; only filter hits
+    are confirmed against the table. Revocations made by other workers are picked up on
+    the next refresh.
+    """
+
+    def __init__(self, capacity=10000, refresh_interval=30):
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+        self._filter = BloomFilter(capacity)
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.capacity = app.config.get('SESSION_REVOCATION_CAPACITY', 10000)
+        self.refresh_interval = app.config.get('SESSION_REVOCATION_REFRESH', 30)
+        self._refreshed_at = None
+
+    def refresh(self):
+        session_ids = db.session.scalars(
+            select(RevokedSession.session_id)
+            .where(RevokedSession.expires_at > datetime.now(timezone.utc))
+        ).all()
+
+        bloom = BloomFilter(max(self.capacity, len(session_ids) * 2))
+        for session_id in session_ids:
+            bloom.add(session_id)
+
+        with self._lock:
+            self._filter = bloom
+            self._refreshed_at = time.monotonic()
+
+    def _is_stale(self):
+        return (self._refreshed_at is None
+                or time.monotonic() - self._refreshed_at >= self.refresh_interval)
+
+    def is_revoked(self, session_id):
+        if self._is_stale():
+            self.refresh()
+
+        if session_id not in self._filter:
+            return False
+
+        return db.session.scalar(
+            select(RevokedSession.id).where(RevokedSession.session_id == session_id)
+        ) is not None
+
+    def revoke(self, session_id, expires_at):
+        """
+        Records a session as revoked until `expires_at`, after which none of its tokens are valid.
+        """
+        try:
+            db.session.add(RevokedSession(session_id=session_id, expires_at=expires_at))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+        with self._lock:
+            self._filter.add(session_id)
+
+
+revocation_list = extension('revocation_list')
+
+
+class StatelessSessionManager:
+    """
+    Session handling for `SESSION_MODE = 'stateless'`.
+
+    The session cookie is an HMAC-signed (HS256) token carrying the user ID (`sub`), the
+    session ID (`sid`) and the expiry (`exp`). Validating it needs no database read; logout
+    and rotation go through the `revocation_list`. Tokens are re-issued with a fresh expiry
+    once less than `SESSION_RENEW_THRESHOLD` of the session lifetime is left, which gives
+    the same sliding expiry as the database-backed sessions.
+    """
+
+    ALGORITHM = 'HS256'
+
+    @staticmethod
+    def is_enabled():
+        return current_app.config.get('SESSION_MODE') == 'stateless'
+
+    @staticmethod
+    def _secret():
+        return current_app.config.get('SESSION_TOKEN_SECRET') or current_app.config['SECRET_KEY']
+
+    @staticmethod
+    def create_session(user_id, session_id):
+        """
+        Returns a signed token for a new session of the given user.
+        """
+        expires_at = datetime.now(timezone.utc) + session_renewer.lifetime
+        return jwt.encode(
+            {'sub': str(user_id), 'sid': session_id, 'exp': expires_at},
+            StatelessSessionManager._secret(),
+            algorithm=StatelessSessionManager.ALGORITHM
+        )
+
+    @staticmethod
+    def decode(token):
+        """
+        Verifies a token's signature, expiry and revocation status.
+
+        Returns:
+            dict: The token claims, or None if the token is not valid.
+        """
+        try:
+            claims = jwt.decode(
+                token,
+                StatelessSessionManager._secret(),
+                algorithms=[StatelessSessionManager.ALGORITHM],
+                options={'require': ['sub', 'sid', 'exp']}
+            )
+        except jwt.InvalidTokenError as e:
+            logger.debug(f"Rejected session token: {e}")
+            return None
+
+        if revocation_list.is_revoked(claims['sid']):
+            return None
+        return claims
+
+    @staticmethod
+    def resolve_session(token):
+        """
+        Validates a token and returns its user.
+
+        The user is served from the `session_cache` when possible and loaded by primary key
+        otherwise.
+
+        Returns:
+            tuple: The `User` and a re-issued token (None if the current one is still fresh
+                enough), or None if the token is not valid.
+        """
+        claims = StatelessSessionManager.decode(token)
+        if claims is None:
+            return None
+
+        session_id = claims['sid']
+        expires_at = datetime.fromtimestamp(claims['exp'], timezone.utc)
+
+        cached = session_cache.get(session_id)
+        if cached is not None:
+            user = session_cache.attach_user(cached)
+        else:
+            user = db.session.get(User, int(claims['sub']))
+            if user is None:
+                return None
+            session_cache.put(session_id, expires_at, user)
+
+        new_token = None
+        remaining = expires_at - datetime.now(timezone.utc)
+        if remaining < session_renewer.lifetime * session_renewer.threshold:
+            new_token = StatelessSessionManager.create_session(user.id, session_id)
+        return user, new_token
+
+    @staticmethod
+    def _revoke(claims):
+        session_cache.evict(claims['sid'])
+        # Re-issued tokens for the same session expire at most one lifetime from now.
+        revocation_list.revoke(claims['sid'], datetime.now(timezone.utc) + session_renewer.lifetime)
+
+    @staticmethod
+    def invalidate_session(token):
+        claims = StatelessSessionManager.decode(token)
+        if claims is None:
+            return False
+
+        StatelessSessionManager._revoke(claims)
+        return True
+
+    @staticmethod
+    def update_session_id(token, new_session_id):
+        """
+        Revokes the session behind a token and returns a token for a new session of the same user.
+
+        Returns:
+            str: The new token, or None if the given token is not valid.
+        """
+        claims = StatelessSessionManager.decode(token)
+        if claims is None:
+            return None
+
+        StatelessSessionManager._revoke(claims)
+        return StatelessSessionManager.create_session(claims['sub'], new_session_id)
@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(*values):
+    """
+    Encodes the sort key of the last row of a page as an opaque, URL-safe cursor.
+
+    Datetimes are stored as ISO 8601 strings; everything else must be JSON serialisable.
+    """
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    data = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor sent by the client.
+        *types: One type per value (e.g. `datetime`, `int`) used to validate and convert it.
+            None values are passed through unchanged.
+
+    Returns:
+        tuple: The decoded values.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or does not match `types`.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("Unexpected cursor length")
+        return tuple(
+            value if value is None
+            else datetime.fromisoformat(value) if kind is datetime
+            else kind(value)
+            for kind, value in zip(types, values)
+        )
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
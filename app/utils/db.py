@@ -1,6 +1,6 @@
 from sqlalchemy.sql import expression
 from sqlalchemy.ext.compiler import compiles
-from sqlalchemy.types import DateTime
+from sqlalchemy.types import DateTime, String
 
 
 class UtcNow(expression.FunctionElement):
@@ -15,3 +15,37 @@ def pg_utcnow(element, compiler, **kw):
 @compiles(UtcNow, 'sqlite')
 def sqlite_utcnow(element, compiler, **kw):
     return "CURRENT_TIMESTAMP"
+
+
+class JsonText(expression.FunctionElement):
+    """
+    The text value of a top-level key of a JSON column.
+
+    The key is rendered as a literal rather than a bound parameter, so queries produce exactly
+    the expression an index was built on and the database can use that index.
+    """
+    type = String()
+    name = 'json_text'
+    inherit_cache = True
+
+    def __init__(self, column, key):
+        if not key.isidentifier():
+            raise ValueError(f"Invalid JSON key: {key}")
+        super().__init__(column, expression.literal_column(key))
+
+
+def _json_text_parts(element, compiler, **kw):
+    column, key = element.clauses
+    return compiler.process(column, **kw), key.name
+
+
+@compiles(JsonText, 'postgresql')
+def pg_json_text(element, compiler, **kw):
+    column, key = _json_text_parts(element, compiler, **kw)
+    return f"({column} ->> '{key}')"
+
+
+@compiles(JsonText)
+def json_text(element, compiler, **kw):
+    column, key = _json_text_parts(element, compiler, **kw)
+    return f"json_extract({column}, '$.{key}')"
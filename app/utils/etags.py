@@ -0,0 +1,39 @@
+from flask import request
+from werkzeug.http import quote_etag, unquote_etag
+
+
+def version_etag(version, *variant):
+    """
+    Returns the strong ETag of a versioned row, e.g. `"3"`. Representations other than the
+    default one (such as a sparse fieldset) pass a `variant` so that each gets its own tag.
+    """
+    return quote_etag('.'.join([str(version), *variant]))
+
+
+def not_modified(etag):
+    """
+    Tells whether the request's `If-None-Match` matches `etag` (weak comparison, as RFC 9110
+    requires).
+    """
+    return request.if_none_match.contains_weak(unquote_etag(etag)[0])
+
+
+def precondition_failed(etag):
+    """
+    Tells whether the request has an `If-Match` that `etag` does not match (strong comparison).
+    Requests without `If-Match` are unconditional.
+    """
+    return bool(request.if_match) and not request.if_match.contains(unquote_etag(etag)[0])
+
+
+def version_precondition_failed(version):
+    """
+    Tells whether the request has an `If-Match` none of whose tags was issued at `version`,
+    comparing only the version each tag starts with. For rows whose ETag also covers values
+    that change without their version, such as a project's progress, so that only a change
+    to the row itself fails the precondition.
+    """
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return False
+    return not any(tag.split('.', 1)[0] == str(version) for tag in if_match.as_set())
@@ -0,0 +1,16 @@
+from flask import current_app, has_app_context
+from werkzeug.local import LocalProxy
+
+
+def extension(name, default=None):
+    """
+    Returns a proxy to `current_app.extensions[name]`, so that a module can expose one name
+    while every application built by `create_app` keeps its own instance. Like `current_app`,
+    the proxy only resolves inside an application context, unless a `default` is given to use
+    outside of one.
+    """
+    def get():
+        if default is not None and not has_app_context():
+            return default
+        return current_app.extensions[name]
+    return LocalProxy(get)
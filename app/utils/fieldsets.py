@@ -0,0 +1,41 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+
+def parse_fields(fields, allowed, always=('id',)):
+    """
+    Parses a `fields` argument such as `title,status` naming the fields of a response.
+
+    Args:
+        fields (str): The comma-separated field names, or None for every field.
+        allowed (iterable): The fields the response can have, in output order.
+        always (tuple): Fields returned whether they are asked for or not.
+
+    Returns:
+        tuple: The field names, in `allowed` order.
+
+    Raises:
+        ValueError: If a name is not in `allowed`.
+    """
+    allowed = tuple(allowed)
+    names = {name.strip() for name in (fields or '').split(',') if name.strip()}
+    if not names:
+        return allowed
+
+    unknown = names.difference(allowed)
+    if unknown:
+        raise ValueError(
+            f"Unknown fields {', '.join(sorted(unknown))}; use any of {', '.join(allowed)}"
+        )
+    names.update(always)
+    return tuple(name for name in allowed if name in names)
+
+
+def column_loader(model, names, *extra):
+    """
+    Returns a `load_only` option selecting the mapped columns among `names` (and `extra`),
+    so that the other columns are left out of the SQL. Names that are not columns, such as
+    properties, are ignored.
+    """
+    columns = inspect(model).columns.keys()
+    return load_only(*[getattr(model, name) for name in (*names, *extra) if name in columns])
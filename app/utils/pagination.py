@@ -0,0 +1,118 @@
+from sqlalchemy import and_, func, or_, select, tuple_
+
+from app.utils.cursor import InvalidCursor, decode_cursor, encode_cursor
+
+
+def parse_sort(sort, allowed, default='id'):
+    """
+    Parses a `sort` argument such as `due_date` or `-due_date` (descending).
+
+    Returns:
+        tuple: The sort key and whether it is descending.
+
+    Raises:
+        ValueError: If the key is not in `allowed`.
+    """
+    sort = sort or default
+    descending = sort.startswith('-')
+    key = sort.lstrip('-')
+    if key not in allowed:
+        raise ValueError(f"Cannot sort by '{key}'; use one of {', '.join(allowed)}")
+    return key, descending
+
+
+def nulls_sort_high(dialect_name):
+    """PostgreSQL sorts NULL after every value, SQLite (and MySQL) before."""
+    return dialect_name in ('postgresql', 'oracle')
+
+
+def keyset_after(column, id_column, value, last_id, descending, dialect_name):
+    """
+    Builds the condition selecting the rows that come after `(value, last_id)` in
+    `ORDER BY column, id_column` (both descending if `descending`).
+
+    NULLs are placed where the database puts them natively, so the condition and the order
+    can both be served by a plain `(column, id)` index.
+    """
+    if column is id_column:
+        return id_column < last_id if descending else id_column > last_id
+
+    nulls_last = nulls_sort_high(dialect_name) != descending
+    after_id = id_column < last_id if descending else id_column > last_id
+
+    if value is None:
+        condition = and_(column.is_(None), after_id)
+        return condition if nulls_last else or_(condition, column.isnot(None))
+
+    row, bound = tuple_(column, id_column), tuple_(value, last_id)
+    condition = row < bound if descending else row > bound
+    return or_(condition, column.is_(None)) if nulls_last else condition
+
+
+def paginate(query, model, sort, allowed, limit, cursor, session, value_types):
+    """
+    Applies keyset pagination to a select of `model`.
+
+    Args:
+        query: The select to paginate.
+        model: The mapped class; its `id` is the tiebreaker.
+        sort (str): The sort argument, e.g. `-due_date`.
+        allowed (tuple): The sortable attribute names.
+        limit (int): The page size.
+        cursor (str): The cursor of the previous page, or None.
+        session: The session to run the query in.
+        value_types (dict): The Python type of each sortable attribute, used to decode cursors.
+
+    Returns:
+        tuple: The rows of the page and the cursor of the next page (None on the last page).
+
+    Raises:
+        ValueError: If the sort key is not allowed.
+        InvalidCursor: If the cursor is malformed or was issued for another sort order.
+    """
+    key, descending = parse_sort(sort, allowed)
+    column, id_column = getattr(model, key), model.id
+    dialect_name = session.get_bind().dialect.name
+
+    if cursor:
+        cursor_sort, value, last_id = decode_cursor(cursor, str, value_types[key], int)
+        if cursor_sort != (sort or 'id'):
+            raise InvalidCursor("The cursor was issued for a different sort order")
+        query = query.where(
+            keyset_after(column, id_column, value, last_id, descending, dialect_name)
+        )
+
+    if column is id_column:
+        order = [id_column.desc() if descending else id_column.asc()]
+    else:
+        order = [column.desc(), id_column.desc()] if descending else [column.asc(), id_column.asc()]
+
+    rows = session.scalars(query.order_by(*order).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort or 'id', getattr(last, key), last.id)
+    return rows, next_cursor
+
+
+def count_rows(query, session, estimated=False):
+    """
+    Counts the rows a select returns.
+
+    With `estimated` on PostgreSQL the planner's row estimate is returned instead, which costs
+    no scan at all; other databases always count exactly.
+
+    Returns:
+        tuple: The count and whether it is an estimate.
+    """
+    query = query.order_by(None).limit(None)
+    bind = session.get_bind()
+    if estimated and bind.dialect.name == 'postgresql':
+        compiled = query.compile(bind)
+        plan = session.connection().exec_driver_sql(
+            f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params
+        ).scalar()
+        return int(plan[0]['Plan']['Plan Rows']), True
+
+    return session.scalar(select(func.count()).select_from(query.subquery())), False
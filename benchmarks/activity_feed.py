@@ -0,0 +1,109 @@
+"""
+Benchmark: time to first page of the recent activity feed as the table grows.
+
+Fills an SQLite database with synthetic activities, then times the old query (oldest
+first, no index on created_at) and `ActivityService.feed` for the first page, a page
+deep into the feed and a filtered page.
+
+    python benchmarks/activity_feed.py [rows ...]    # default: 1000000 10000000
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from cryptography.fernet import Fernet
+from sqlalchemy import text
+
+sys.path.insert(0, '.')
+
+from app import create_app, db
+from app.models import Activities
+from app.services.activity import ActivityService
+from app.utils.cursor import encode_cursor
+from config import Config
+
+DATABASE = os.path.join(tempfile.gettempdir(), 'activity_feed_bench.db')
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE}'
+    FERNET_KEY = Fernet.generate_key().decode()
+    PASSWORD_HASH_WORKERS = 0
+
+
+def fill(rows, chunk=100000):
+    start = datetime(2020, 1, 1)
+    connection = db.engine.raw_connection()
+    cursor = connection.cursor()
+    for offset in range(0, rows, chunk):
+        cursor.executemany(
+            'INSERT INTO activities (user_id, action_type, target_type, target_id, created_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            [
+                (i % 1000, ('create', 'update', 'archive')[i % 3], 'task', i % 50000,
+                 (start + timedelta(seconds=i)).isoformat(' '))
+                for i in range(offset, min(offset + chunk, rows))
+            ]
+        )
+        connection.commit()
+    connection.close()
+
+
+def timed(func, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def legacy_page():
+    return Activities.query.order_by(Activities.created_at).limit(10).all()
+
+
+def run(rows):
+    if os.path.exists(DATABASE):
+        os.remove(DATABASE)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        indexes = [index.name for index in Activities.__table__.indexes]
+        for name in indexes:
+            db.session.execute(text(f'DROP INDEX {name}'))
+        db.session.commit()
+
+        started = time.perf_counter()
+        fill(rows)
+        print(f'{rows:>10} rows  filled in {time.perf_counter() - started:.1f} s')
+        print(f'  legacy (created_at ASC, no index)  {timed(legacy_page, 3):9.2f} ms')
+
+        started = time.perf_counter()
+        for index in Activities.__table__.indexes:
+            index.create(db.engine)
+        print(f'  built feed indexes in {time.perf_counter() - started:.1f} s')
+
+        deep = db.session.execute(text(
+            'SELECT created_at, id FROM activities '
+            'ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET :n'
+        ), {'n': rows // 2}).one()
+        deep_cursor = encode_cursor(datetime.fromisoformat(str(deep.created_at)), deep.id)
+
+        print(f'  feed, first page                   '
+              f'{timed(lambda: ActivityService.feed(10)):9.2f} ms')
+        print(f'  feed, page at row {rows // 2:<10}       '
+              f'{timed(lambda: ActivityService.feed(10, deep_cursor)):9.2f} ms')
+        print(f'  feed, user_id filter               '
+              f'{timed(lambda: ActivityService.feed(10, user_id=7, action_type=None)):9.2f} ms')
+        filtered = timed(lambda: ActivityService.feed(10, deep_cursor, target_type='task',
+                                                      target_id=7))
+        print(f'  feed, target filter, deep cursor   {filtered:9.2f} ms')
+        db.session.remove()
+    os.remove(DATABASE)
+
+
+if __name__ == '__main__':
+    for size in [int(arg) for arg in sys.argv[1:]] or [1000000, 10000000]:
+        run(size)
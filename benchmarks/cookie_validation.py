@@ -0,0 +1,49 @@
+"""
+Benchmark: session cookie decryption throughput.
+
+Compares building a new `Fernet` for every request (the old behaviour of the user routes)
+with the application key ring, uncached and with its decrypted-cookie LRU warm.
+
+    python benchmarks/cookie_validation.py [iterations]
+"""
+import sys
+import time
+
+from cryptography.fernet import Fernet
+from flask import Flask
+
+sys.path.insert(0, '.')
+
+from app.keyring import KeyRing
+
+
+def measure(label, func, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<26} {n / elapsed:>12.0f} cookies/s')
+
+
+def main(n):
+    key = Fernet.generate_key().decode()
+    app = Flask(__name__)
+    app.config['FERNET_KEY'] = key
+    key_ring = KeyRing()
+    key_ring.init_app(app)
+    cookie = key_ring.encrypt('x' * 43)
+
+    def per_request_fernet():
+        Fernet(key.encode()).decrypt(cookie.encode('ascii')).decode('utf-8')
+
+    def key_ring_uncached():
+        key_ring.forget(cookie)
+        key_ring.decrypt(cookie)
+
+    measure('new Fernet per request', per_request_fernet, n)
+    measure('key ring, uncached', key_ring_uncached, n)
+    measure('key ring, cached', lambda: key_ring.decrypt(cookie), n)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,152 @@
+"""
+Load test: idle Server-Sent Events subscribers held by one worker.
+
+Serves the app with werkzeug's threaded server (one thread per open stream, like a
+threaded gunicorn worker), opens N idle /api/activities/stream connections for one user,
+then records a single activity and measures how long it takes to reach every subscriber.
+Reports the worker's memory and thread count per subscriber level, and the number of
+database reads the broadcaster made meanwhile.
+
+    python benchmarks/event_stream.py [subscribers ...]    # default: 100 500 1000 2000
+"""
+import json
+import logging
+import os
+import resource
+import selectors
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from cryptography.fernet import Fernet
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.serving import make_server
+
+sys.path.insert(0, '.')
+
+from app import create_app, db
+from app.models import Activities, User
+from config import Config
+
+DATABASE = os.path.join(tempfile.gettempdir(), 'event_stream_bench.db')
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE}'
+    FERNET_KEY = Fernet.generate_key().decode()
+    PASSWORD_HASH_WORKERS = 0
+    ACTIVITY_SINK_MODE = 'sync'
+    EVENT_POLL_INTERVAL = 0.5
+    EVENT_HEARTBEAT = 15
+
+
+polls = []
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count(conn, cursor, statement, parameters, context, executemany):
+    if 'FROM activities' in statement and 'activities.id >' in statement:
+        polls.append(statement)
+
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0
+
+
+def open_stream(port, cookie):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall(
+        f'GET /api/activities/stream HTTP/1.1\r\nHost: localhost\r\nCookie: session_id={cookie}\r\n'
+        f'Accept: text/event-stream\r\n\r\n'.encode()
+    )
+    received = b''
+    while b'retry:' not in received:
+        received += sock.recv(4096)
+    return sock
+
+
+def main(levels):
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    if os.path.exists(DATABASE):
+        os.remove(DATABASE)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+
+    client = app.test_client()
+    client.post('/api/user/register', data=json.dumps({
+        'username': 'bench', 'first_name': 'Bench', 'last_name': 'User',
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+    client.post('/api/user/login', data=json.dumps({
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+    cookie = client.get_cookie('session_id').value
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with app.app_context():
+        user_id = User.query.filter_by(email='bench@example.com').one().id
+
+    baseline_rss, baseline_threads = rss_mb(), threading.active_count()
+    print(f'baseline: {baseline_rss:.1f} MB RSS, {baseline_threads} threads')
+    print(f'{"subscribers":>11} {"RSS MB":>8} {"KB/sub":>7} {"threads":>8} {"fan-out ms":>11} '
+          f'{"polls/s":>8}')
+
+    sockets = []
+    for level in levels:
+        while len(sockets) < level:
+            sockets.append(open_stream(server.port, cookie))
+        time.sleep(1)
+
+        polls.clear()
+        idle_started = time.perf_counter()
+        time.sleep(2)
+        poll_rate = len(polls) / (time.perf_counter() - idle_started)
+
+        with app.app_context():
+            db.session.add(Activities(user_id=user_id, action_type='create', target_type='task',
+                                      target_id=1, details={'task_title': 'bench'}))
+            db.session.commit()
+        started = time.perf_counter()
+
+        selector = selectors.DefaultSelector()
+        for sock in sockets:
+            selector.register(sock, selectors.EVENT_READ)
+        pending = len(sockets)
+        while pending:
+            ready = selector.select(5)
+            if not ready:
+                raise RuntimeError(f'{pending} subscribers did not receive the event')
+            for key, _ in ready:
+                if b'event: task' in key.fileobj.recv(65536):
+                    selector.unregister(key.fileobj)
+                    pending -= 1
+        selector.close()
+        fan_out = (time.perf_counter() - started) * 1000
+
+        rss = rss_mb()
+        print(f'{level:>11} {rss:>8.1f} {(rss - baseline_rss) * 1024 / level:>7.1f} '
+              f'{threading.active_count():>8} {fan_out:>11.1f} {poll_rate:>8.1f}')
+        assert len(app.extensions['event_broadcaster']) == level
+
+    for sock in sockets:
+        sock.close()
+    server.shutdown()
+    os.remove(DATABASE)
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 500, 1000, 2000])
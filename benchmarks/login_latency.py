@@ -0,0 +1,92 @@
+"""
+Benchmark: login latency under concurrent load.
+
+Fires concurrent logins at `/api/user/login` while other threads poll a cheap endpoint,
+once with hashing on the request thread and once on the password hashing pool, and
+reports p50/p99 latencies and the number of 503 responses.
+
+    python benchmarks/login_latency.py [logins] [concurrency]
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptography.fernet import Fernet
+
+sys.path.insert(0, '.')
+
+from app import create_app, db
+from config import Config
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = f'sqlite:///{DB_PATH}'
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+    FERNET_KEY = Fernet.generate_key().decode()
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:600000'
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+def run(workers, logins, concurrency):
+    BenchConfig.PASSWORD_HASH_WORKERS = workers
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    app.test_client().post('/api/user/register', data=json.dumps({
+        'username': 'bench', 'first_name': 'Bench', 'last_name': 'User',
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+
+    login_latencies, ping_latencies, statuses = [], [], []
+    done = threading.Event()
+
+    def login(_):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/api/user/login', data=json.dumps({
+            'email': 'bench@example.com', 'password': 'benchpassword'
+        }), content_type='application/json')
+        login_latencies.append(time.perf_counter() - start)
+        statuses.append(response.status_code)
+
+    def ping():
+        client = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get('/api/user/check-auth')
+            ping_latencies.append(time.perf_counter() - start)
+
+    pinger = threading.Thread(target=ping)
+    pinger.start()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(login, range(logins)))
+    done.set()
+    pinger.join()
+
+    label = f'{workers} hashing workers' if workers else 'request thread'
+    print(f'{label:<20} login p50 {percentile(login_latencies, 0.5):7.1f} ms'
+          f'  p99 {percentile(login_latencies, 0.99):7.1f} ms'
+          f'  | other requests p50 {statistics.median(ping_latencies) * 1000:6.1f} ms'
+          f'  p99 {percentile(ping_latencies, 0.99):6.1f} ms'
+          f'  | 503s {statuses.count(503)}')
+
+
+if __name__ == '__main__':
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    run(0, logins, concurrency)
+    run(os.cpu_count() or 2, logins, concurrency)
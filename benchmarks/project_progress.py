@@ -0,0 +1,142 @@
+"""
+Benchmark: listing projects with their progress as the task table grows.
+
+Fills the database with P projects (default 1000) of N tasks in all (default 1000000), a
+quarter of them completed, and the benchmark user assigned one task in every project, so that
+`/api/projects` lists them all. Then times the listing with progress read from the task
+counters, counted with one GROUP BY (`PROJECT_PROGRESS_SOURCE = 'aggregate'`), and loaded
+the old way, every task of every project, and counts the queries each makes.
+
+    python benchmarks/project_progress.py [projects] [tasks]
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from cryptography.fernet import Fernet
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import selectinload
+
+sys.path.insert(0, '.')
+
+from app import create_app, db
+from app.models import Project, Task
+from app.scoping import project_scope
+from config import Config
+
+DATABASE = os.path.join(tempfile.gettempdir(), 'project_progress_bench.db')
+# The counter backfill of the migration that added them.
+COUNT = (
+    "UPDATE projects SET "
+    "total_task_count = (SELECT count(*) FROM tasks WHERE tasks.project_id = projects.id), "
+    "completed_task_count = (SELECT count(*) FROM tasks WHERE tasks.project_id = projects.id "
+    "AND tasks.is_completed = true)"
+)
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE}'
+    FERNET_KEY = Fernet.generate_key().decode()
+    PASSWORD_HASH_WORKERS = 0
+
+
+def fill(projects, rows, chunk=100000):
+    connection = db.engine.raw_connection()
+    cursor = connection.cursor()
+    cursor.executemany('INSERT INTO projects (name, version, total_task_count, '
+                       'completed_task_count) VALUES (?, 1, 0, 0)',
+                       [(f'Project {i}',) for i in range(projects)])
+    for offset in range(0, rows, chunk):
+        cursor.executemany(
+            'INSERT INTO tasks (title, assignee_id, project_id, is_completed, version) '
+            'VALUES (?, ?, ?, ?, 1)',
+            [
+                # User 1 is assigned the first task of every project.
+                (f'Task {i}', 1 if i < projects else 2, i % projects + 1, i % 4 == 0)
+                for i in range(offset, min(offset + chunk, rows))
+            ]
+        )
+    cursor.execute(COUNT)
+    connection.commit()
+    connection.close()
+
+
+def login(client):
+    client.post('/api/user/register', data=json.dumps({
+        'username': 'bench', 'first_name': 'Bench', 'last_name': 'User',
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+    client.post('/api/user/login', data=json.dumps({
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+
+
+def timed(run, repeat):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    timings = []
+    event.listen(Engine, 'before_cursor_execute', count)
+    try:
+        for _ in range(repeat):
+            statements.clear()
+            started = time.perf_counter()
+            result = run()
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count)
+    return statistics.median(timings), len(statements), result
+
+
+def main(projects=1000, rows=1000000):
+    if os.path.exists(DATABASE):
+        os.remove(DATABASE)
+    app = create_app(BenchConfig)
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        login(client)
+        started = time.perf_counter()
+        fill(projects, rows)
+        elapsed = time.perf_counter() - started
+        print(f'{projects} projects, {rows} tasks inserted and counted in {elapsed:.1f} s')
+    # Warms the session up, so that only the listing is timed.
+    client.get('/api/tasks/?limit=1')
+
+    def listing():
+        response = client.get('/api/projects?fields=name,progress')
+        assert response.status_code == 200 and len(response.json) == projects
+        return sorted(project['progress'] for project in response.json)
+
+    def every_task():
+        with app.app_context():
+            listed = (Project.query
+                      .options(selectinload(Project.tasks).load_only(Task.is_completed))
+                      .filter(project_scope(1)).all())
+            return sorted(
+                round(sum(task.is_completed for task in project.tasks) / len(project.tasks) * 100)
+                for project in listed
+            )
+
+    print(f"{'progress from':<20}{'latency':>10}{'queries':>9}")
+    counted = timed(listing, 10)
+    print(f"{'counters':<20}{counted[0]:8.1f}ms{counted[1]:9}")
+    app.config['PROJECT_PROGRESS_SOURCE'] = 'aggregate'
+    aggregated = timed(listing, 5)
+    print(f"{'GROUP BY':<20}{aggregated[0]:8.1f}ms{aggregated[1]:9}")
+    loaded = timed(every_task, 1)
+    print(f"{'every task':<20}{loaded[0]:8.1f}ms{loaded[1]:9}")
+    assert counted[2] == aggregated[2] == loaded[2]
+
+    os.remove(DATABASE)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
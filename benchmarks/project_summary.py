@@ -0,0 +1,141 @@
+"""
+Benchmark: a project dashboard from /api/projects/<id>/summary against counting in the client.
+
+Fills the database with P projects (default 20) of N tasks in all (default 200000) with
+random statuses, priorities, assignees, due dates and times, and the benchmark user assigned
+one task in every project. Then times the summary of one project computed (cache cleared
+before every request) and cached, against the old way of building the dashboard: paging
+through every visible task with `/api/tasks/` and counting those of the project in the client.
+
+    python benchmarks/project_summary.py [projects] [tasks]
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from cryptography.fernet import Fernet
+
+sys.path.insert(0, '.')
+
+from app import create_app, db
+from app.summaries import summary_cache
+from config import Config
+
+DATABASE = os.path.join(tempfile.gettempdir(), 'project_summary_bench.db')
+STATUSES = ['TODO', 'IN PROGRESS', 'REVIEW', 'DONE']
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE}'
+    FERNET_KEY = Fernet.generate_key().decode()
+    PASSWORD_HASH_WORKERS = 0
+
+
+def fill(projects, rows, rng, chunk=100000):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    connection = db.engine.raw_connection()
+    cursor = connection.cursor()
+    cursor.executemany('INSERT INTO projects (name, version, total_task_count, '
+                       'completed_task_count) VALUES (?, 1, 0, 0)',
+                       [(f'Project {i}',) for i in range(projects)])
+    cursor.executemany('INSERT INTO users (username, email) VALUES (?, ?)',
+                       [(f'user{i}', f'user{i}@example.com') for i in range(2, 52)])
+    for offset in range(0, rows, chunk):
+        batch = []
+        for i in range(offset, min(offset + chunk, rows)):
+            status = rng.choice(STATUSES)
+            batch.append((
+                f'Task {i}', status, rng.randint(1, 4), status == 'DONE',
+                # User 1 is assigned the first task of every project.
+                1 if i < projects else rng.randint(2, 51), i % projects + 1,
+                now + timedelta(days=rng.randint(-60, 60)), rng.choice([None, 30, 60, 120]),
+                rng.choice([None, 45])
+            ))
+        cursor.executemany(
+            'INSERT INTO tasks (title, status, priority, is_completed, assignee_id, project_id, '
+            'due_date, estimated_time, actual_time, version) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)', batch
+        )
+    connection.commit()
+    connection.close()
+
+
+def login(client):
+    client.post('/api/user/register', data=json.dumps({
+        'username': 'bench', 'first_name': 'Bench', 'last_name': 'User',
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+    client.post('/api/user/login', data=json.dumps({
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+
+
+def timed(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def client_side(client, project_id):
+    """The old way: every visible task, counted in the client."""
+    by_status, total, cursor = Counter(), 0, None
+    while True:
+        url = ('/api/tasks/?limit=500&fields=status,priority,due_date&include=project,assignee'
+               + (f'&cursor={cursor}' if cursor else ''))
+        response = client.get(url)
+        for task in response.json['tasks']:
+            if (task['project'] or {}).get('id') == project_id:
+                total += 1
+                by_status[task['status']] += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return total, by_status
+
+
+def main(projects=20, rows=200000):
+    if os.path.exists(DATABASE):
+        os.remove(DATABASE)
+    rng = random.Random(7)
+    app = create_app(BenchConfig)
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        login(client)
+        started = time.perf_counter()
+        fill(projects, rows, rng)
+        elapsed = time.perf_counter() - started
+        print(f'{projects} projects, {rows} tasks inserted in {elapsed:.1f} s')
+    client.get('/api/tasks/?limit=1')
+
+    def computed():
+        summary_cache.clear()
+        response = client.get('/api/projects/1/summary')
+        assert response.status_code == 200
+        return response.json
+
+    cold, summary = timed(computed, 10)
+    cached = timed(lambda: client.get('/api/projects/1/summary').json, 10)[0]
+    scanned, (total, by_status) = timed(lambda: client_side(client, 1), 1)
+    assert total == summary['total']
+    assert dict(by_status) == {entry['status']: entry['count'] for entry in summary['by_status']}
+
+    print(f'{rows // projects} tasks in the project, {rows} visible')
+    print(f"{'summary':<22}{cold:10.1f}ms")
+    print(f"{'summary, cached':<22}{cached:10.1f}ms")
+    print(f"{'counted in the client':<22}{scanned:10.1f}ms")
+
+    os.remove(DATABASE)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
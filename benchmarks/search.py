@@ -0,0 +1,143 @@
+"""
+Benchmark: /api/search latency as the task table grows.
+
+Fills the tasks table with N tasks (default 1000000) of generated text whose words follow a
+Zipf distribution, spread so that the searching user sees 1% of them, and indexes them with
+`search_index.rebuild()`. Then times searches for a very common, a mid-frequency and a rare
+word and for a two-word query, against the old way of finding a task: paging through every
+visible task with `/api/tasks/` and filtering them in the client.
+
+    python benchmarks/search.py [tasks]
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from cryptography.fernet import Fernet
+
+sys.path.insert(0, '.')
+
+from app import create_app, db
+from app.search import search_index
+from config import Config
+
+DATABASE = os.path.join(tempfile.gettempdir(), 'search_bench.db')
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'pa', 'do', 'gu', 'be', 'fi',
+             'ho']
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE}'
+    FERNET_KEY = Fernet.generate_key().decode()
+    PASSWORD_HASH_WORKERS = 0
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words, key=lambda word: rng.random())
+
+
+def fill(rows, words, rng, chunk=100000):
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    connection = db.engine.raw_connection()
+    cursor = connection.cursor()
+    for offset in range(0, rows, chunk):
+        count = min(chunk, rows - offset)
+        text = rng.choices(words, weights, k=count * 24)
+        cursor.executemany(
+            'INSERT INTO tasks (title, description, assignee_id, project_id, is_completed, '
+            'version) VALUES (?, ?, ?, ?, 0, 1)',
+            [
+                # User 1 is assigned ten tasks in every thousand, each in a project of 100 tasks.
+                (' '.join(text[j * 24:j * 24 + 4]), ' '.join(text[j * 24 + 4:j * 24 + 24]),
+                 (offset + j) // 10 % 1000 + 1, (offset + j) // 100 + 1)
+                for j in range(count)
+            ]
+        )
+        connection.commit()
+    connection.close()
+
+
+def login(client):
+    client.post('/api/user/register', data=json.dumps({
+        'username': 'bench', 'first_name': 'Bench', 'last_name': 'User',
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+    client.post('/api/user/login', data=json.dumps({
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+
+
+def timed(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def scan(client, words):
+    """The old way: every visible task, filtered in the client."""
+    found, cursor = 0, None
+    while True:
+        url = '/api/tasks/?limit=500&fields=title,description'
+        url += f'&cursor={cursor}' if cursor else ''
+        response = client.get(url)
+        found += sum(
+            all(word in f"{task['title']} {task['description']}".split() for word in words)
+            for task in response.json['tasks']
+        )
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return found
+
+
+def main(rows):
+    if os.path.exists(DATABASE):
+        os.remove(DATABASE)
+    rng = random.Random(7)
+    app = create_app(BenchConfig)
+    client = app.test_client()
+    words = vocabulary(5000, rng)
+
+    with app.app_context():
+        db.create_all()
+        login(client)
+        started = time.perf_counter()
+        fill(rows, words, rng)
+        print(f'{rows} tasks inserted in {time.perf_counter() - started:.1f} s')
+
+        started = time.perf_counter()
+        search_index.rebuild()
+        elapsed = time.perf_counter() - started
+        print(f'index rebuilt in {elapsed:.1f} s ({rows / elapsed:.0f} tasks/s)')
+
+    queries = {
+        'most common word': [words[0]],
+        'word of rank 100': [words[99]],
+        'word of rank 4000': [words[3999]],
+        'two common words': [words[0], words[1]],
+    }
+    print(f"{'query':<20}{'first page':>12}{'page 2':>10}{'client scan':>13}  results visible")
+    for label, query in queries.items():
+        q = ' '.join(query)
+        first, response = timed(lambda: client.get(f'/api/search?q={q}&types=task'), 10)
+        assert response.status_code == 200
+        cursor = response.headers.get('X-Next-Cursor')
+        second = timed(lambda: client.get(f'/api/search?q={q}&types=task&cursor={cursor}'),
+                       10)[0] if cursor else 0
+        scanned, visible = timed(lambda: scan(client, query), 1)
+        print(f'{label:<20}{first:10.1f}ms{second:8.1f}ms{scanned:11.1f}ms  {visible}')
+
+    os.remove(DATABASE)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
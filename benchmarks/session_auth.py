@@ -0,0 +1,87 @@
+"""
+Benchmark: database statements and throughput of authenticated requests.
+
+Compares the old lookup sequence in `session_required` (validity check, renewal commit,
+session re-read and user fetch) with `SessionManager.resolve_session` and with the
+per-worker session cache.
+
+    python benchmarks/session_auth.py [requests]
+"""
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from cryptography.fernet import Fernet
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+sys.path.insert(0, '.')
+
+from app import create_app, db
+from app.models import Session, User
+from app.session import SessionManager, session_cache
+from config import Config
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    FERNET_KEY = Fernet.generate_key().decode()
+
+
+statements = []
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+def legacy_resolve(session_id):
+    SessionManager.is_session_valid(session_id)
+    session = Session.query.filter_by(session_id=session_id).first()
+    session.expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    db.session.commit()
+    session = Session.query.filter_by(session_id=session_id).first()
+    return db.session.get(User, session.user_id)
+
+
+def measure(label, func, n):
+    statements.clear()
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+        db.session.remove()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<28} {len(statements) / n:>6.2f} statements/request '
+          f'{n / elapsed:>10.0f} requests/s')
+
+
+def main(n):
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        client.post('/api/user/register', data=json.dumps({
+            'username': 'bench', 'first_name': 'Bench', 'last_name': 'User',
+            'email': 'bench@example.com', 'password': 'benchpassword'
+        }), content_type='application/json')
+        client.post('/api/user/login', data=json.dumps({
+            'email': 'bench@example.com', 'password': 'benchpassword'
+        }), content_type='application/json')
+        session_id = Session.query.first().session_id
+        db.session.remove()
+
+        measure('legacy lookups', lambda: legacy_resolve(session_id), n)
+        measure('resolve_session', lambda: SessionManager.resolve_session(session_id), n)
+
+        def request_uncached():
+            session_cache.clear()
+            client.get('/api/user/check-auth')
+
+        measure('check-auth, cache cold', request_uncached, n)
+        measure('check-auth, cache warm', lambda: client.get('/api/user/check-auth'), n)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,124 @@
+"""
+Benchmark: importing tasks one request at a time vs. through /api/tasks/bulk.
+
+Creates N tasks (default 10000) with `POST /api/tasks/` per task, then with
+`POST /api/tasks/bulk` in batches of TASK_BULK_LIMIT, and then updates them all with
+`PUT /api/tasks/update/<id>` vs. `PATCH /api/tasks/bulk`. Activities are written in outbox
+mode, so each run includes its activity rows. Reports tasks per second and the number of
+statements and commits each import took.
+
+    python benchmarks/task_bulk.py [tasks]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from cryptography.fernet import Fernet
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+sys.path.insert(0, '.')
+
+from app import create_app, db
+from app.models import Activities, Task
+from config import Config
+
+DATABASE = os.path.join(tempfile.gettempdir(), 'task_bulk_bench.db')
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE}'
+    FERNET_KEY = Fernet.generate_key().decode()
+    PASSWORD_HASH_WORKERS = 0
+    ACTIVITY_SINK_MODE = 'outbox'
+    TASK_BULK_LIMIT = 1000
+
+
+counts = {'statements': 0, 'commits': 0}
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    counts['statements'] += 1
+
+
+@event.listens_for(Engine, 'commit')
+def count_commit(conn):
+    counts['commits'] += 1
+
+
+def task(i):
+    return {'title': f'Imported task {i}', 'description': 'x' * 200, 'priority': i % 5,
+            'status': 'TODO'}
+
+
+def timed(label, total, run):
+    counts.update(statements=0, commits=0)
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    print(f'  {label:<32}{elapsed:8.2f} s {total / elapsed:9.0f} tasks/s '
+          f'{counts["statements"]:8} statements {counts["commits"]:7} commits')
+
+
+def main(total):
+    if os.path.exists(DATABASE):
+        os.remove(DATABASE)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+
+    client = app.test_client()
+    client.post('/api/user/register', data=json.dumps({
+        'username': 'bench', 'first_name': 'Bench', 'last_name': 'User',
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+    client.post('/api/user/login', data=json.dumps({
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+    batch = BenchConfig.TASK_BULK_LIMIT
+    ids = {}
+
+    def create_each():
+        ids['each'] = [
+            client.post('/api/tasks/', data=json.dumps(task(i)),
+                        content_type='application/json').json['task']['id']
+            for i in range(total)
+        ]
+
+    def create_bulk():
+        ids['bulk'] = []
+        for start in range(0, total, batch):
+            response = client.post('/api/tasks/bulk', data=json.dumps({
+                'tasks': [task(i) for i in range(start, min(start + batch, total))]
+            }), content_type='application/json')
+            ids['bulk'] += [result['id'] for result in response.json['results']]
+
+    def update_each():
+        for task_id in ids['each']:
+            client.put(f'/api/tasks/update/{task_id}', data=json.dumps({'status': 'DONE'}),
+                       content_type='application/json')
+
+    def update_bulk():
+        for start in range(0, total, batch):
+            client.patch('/api/tasks/bulk', data=json.dumps({
+                'tasks': [{'id': task_id, 'status': 'DONE'}
+                          for task_id in ids['bulk'][start:start + batch]]
+            }), content_type='application/json')
+
+    print(f'{total} tasks, batches of {batch}')
+    timed('create, one request per task', total, create_each)
+    timed('create, /api/tasks/bulk', total, create_bulk)
+    timed('update, one request per task', total, update_each)
+    timed('update, /api/tasks/bulk', total, update_bulk)
+
+    with app.app_context():
+        assert Task.query.filter_by(status='DONE').count() == 2 * total
+        assert Activities.query.count() == 4 * total
+    os.remove(DATABASE)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
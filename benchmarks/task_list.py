@@ -0,0 +1,122 @@
+"""
+Benchmark: task list response time and memory as the table grows.
+
+Times `GET /api/tasks/` the old way (every task, `Task.query.all()`) and with keyset
+pagination (first page and a page deep into the list, sorted by due date), and reports
+the Python memory allocated while serving each request. Then compares the payload size and
+time of a 500-task page with every field against `fields=title,status`.
+
+    python benchmarks/task_list.py [rows ...]    # default: 10000 100000 1000000
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from cryptography.fernet import Fernet
+from sqlalchemy import text
+
+sys.path.insert(0, '.')
+
+from app import create_app, db
+from app.models import Task
+from app.utils.cursor import encode_cursor
+from config import Config
+
+DATABASE = os.path.join(tempfile.gettempdir(), 'task_list_bench.db')
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE}'
+    FERNET_KEY = Fernet.generate_key().decode()
+    PASSWORD_HASH_WORKERS = 0
+
+
+def login(client):
+    client.post('/api/user/register', data=json.dumps({
+        'username': 'bench', 'first_name': 'Bench', 'last_name': 'User',
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+    client.post('/api/user/login', data=json.dumps({
+        'email': 'bench@example.com', 'password': 'benchpassword'
+    }), content_type='application/json')
+
+
+def fill(rows, chunk=100000):
+    start = datetime(2020, 1, 1)
+    connection = db.engine.raw_connection()
+    cursor = connection.cursor()
+    for offset in range(0, rows, chunk):
+        cursor.executemany(
+            'INSERT INTO tasks (title, description, due_date, priority, created_at, updated_at, '
+            'is_completed, assignee_id) VALUES (?, ?, ?, ?, ?, ?, 0, 1)',
+            [
+                (f'Task {i}', 'x' * 200, (start + timedelta(minutes=i % 100000)).isoformat(' '),
+                 i % 5, start.isoformat(' '), start.isoformat(' '))
+                for i in range(offset, min(offset + chunk, rows))
+            ]
+        )
+        connection.commit()
+    connection.close()
+
+
+def measure(client, url, repeat=5):
+    best, peak = float('inf'), 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.get(url)
+        best = min(best, time.perf_counter() - started)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert response.status_code == 200
+    return best * 1000, peak / 1024 / 1024, len(response.data)
+
+
+def run(rows):
+    if os.path.exists(DATABASE):
+        os.remove(DATABASE)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    login(client)
+    with app.app_context():
+        fill(rows)
+        deep = db.session.execute(text(
+            'SELECT due_date, id FROM tasks ORDER BY due_date, id LIMIT 1 OFFSET :n'
+        ), {'n': rows // 2}).one()
+        deep_cursor = encode_cursor('due_date', datetime.fromisoformat(str(deep.due_date)), deep.id)
+
+    print(f'{rows:>9} tasks')
+    if rows <= 100000:
+        with app.app_context():
+            started = time.perf_counter()
+            tracemalloc.start()
+            Task.query.all()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f'  legacy Task.query.all() (query only) {elapsed:9.1f} ms '
+                  f'{peak / 1024 / 1024:8.1f} MB')
+    for label, url in [
+        ('first page, 50 tasks', '/api/tasks/?sort=due_date'),
+        (f'page at task {rows // 2}', f'/api/tasks/?sort=due_date&cursor={deep_cursor}'),
+    ]:
+        elapsed, peak, _ = measure(client, url)
+        print(f'  {label:<37}{elapsed:9.1f} ms {peak:8.1f} MB')
+    for label, url in [
+        ('500 tasks, every field', '/api/tasks/?limit=500'),
+        ('500 tasks, fields=title,status', '/api/tasks/?limit=500&fields=title,status'),
+    ]:
+        elapsed, peak, size = measure(client, url)
+        print(f'  {label:<37}{elapsed:9.1f} ms {peak:8.1f} MB {size / 1024:8.1f} KB')
+    os.remove(DATABASE)
+
+
+if __name__ == '__main__':
+    for size in [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]:
+        run(size)
@@ -7,11 +7,76 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'super-secret-key'
     FERNET_KEY = os.environ.get('FERNET_KEY')
+    # Comma separated, newest first; takes precedence over FERNET_KEY to allow key rotation
+    FERNET_KEYS = os.environ.get('FERNET_KEYS')
+    FERNET_CACHE_SIZE = int(os.environ.get('FERNET_CACHE_SIZE', 4096))
+    FERNET_CACHE_TTL = int(os.environ.get('FERNET_CACHE_TTL', 300))
     REFRESH_SECRET_KEY = os.environ.get('REFRESH_SECRET_KEY') or 'super-secret-refresh_key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///dev.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     FLASK_ENV = os.environ.get('FLASK_ENV')
     FLASK_MODE = os.environ.get('FLASK_MODE', 'production')
+    # Passed to werkzeug's generate_password_hash, e.g. 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1'
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD')
+    # Size of the hashing process pool; 0 hashes on the request thread
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    # Hashing jobs allowed in flight before requests are rejected with 503
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 16))
+    SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 1024))
+    SESSION_CACHE_TTL = int(os.environ.get('SESSION_CACHE_TTL', 30))
+    SESSION_LIFETIME = int(os.environ.get('SESSION_LIFETIME', 3600))
+    # 'sql' (sessions table), 'memory' (single process only) or 'redis' (SESSION_STORE_URL)
+    SESSION_STORE = os.environ.get('SESSION_STORE', 'sql')
+    # redis://[[user]:password@]host[:port][/db]; rediss:// connects over TLS
+    SESSION_STORE_URL = os.environ.get('SESSION_STORE_URL', 'redis://localhost:6379/0')
+    # 'threshold' writes the new expiry once less than SESSION_RENEW_THRESHOLD of the lifetime
+    # is left, 'write-behind' batches every renewal into one UPDATE each
+    # SESSION_RENEW_FLUSH_INTERVAL seconds.
+    SESSION_RENEW_MODE = os.environ.get('SESSION_RENEW_MODE', 'threshold')
+    SESSION_RENEW_THRESHOLD = float(os.environ.get('SESSION_RENEW_THRESHOLD', 0.9))
+    SESSION_RENEW_FLUSH_INTERVAL = int(os.environ.get('SESSION_RENEW_FLUSH_INTERVAL', 5))
+    # 'database' keeps sessions in the sessions table, 'stateless' uses signed session tokens
+    SESSION_MODE = os.environ.get('SESSION_MODE', 'database')
+    SESSION_TOKEN_SECRET = os.environ.get('SESSION_TOKEN_SECRET')
+    SESSION_REVOCATION_REFRESH = int(os.environ.get('SESSION_REVOCATION_REFRESH', 30))
+    SESSION_REVOCATION_CAPACITY = int(os.environ.get('SESSION_REVOCATION_CAPACITY', 10000))
+    # Seconds between in-process reaper runs; 0 leaves reaping to `flask sessions reap`
+    SESSION_REAPER_INTERVAL = int(os.environ.get('SESSION_REAPER_INTERVAL', 0))
+    SESSION_REAPER_BATCH_SIZE = int(os.environ.get('SESSION_REAPER_BATCH_SIZE', 1000))
+    SESSION_REAPER_GRACE = int(os.environ.get('SESSION_REAPER_GRACE', 60))
+    # 'sync' inserts each activity as it happens, 'buffered' batches them on a background thread,
+    # 'outbox' commits them in the same transaction as the change they describe
+    ACTIVITY_SINK_MODE = os.environ.get('ACTIVITY_SINK_MODE', 'buffered')
+    ACTIVITY_BATCH_SIZE = int(os.environ.get('ACTIVITY_BATCH_SIZE', 100))
+    ACTIVITY_FLUSH_INTERVAL = float(os.environ.get('ACTIVITY_FLUSH_INTERVAL', 2))
+    # Activities held in memory before new ones are dropped
+    ACTIVITY_QUEUE_LIMIT = int(os.environ.get('ACTIVITY_QUEUE_LIMIT', 10000))
+    # Whole days of raw activities kept by `flask activities compact`; older ones become daily
+    # rollups
+    ACTIVITY_RETENTION_DAYS = int(os.environ.get('ACTIVITY_RETENTION_DAYS', 90))
+    ACTIVITY_RETENTION_BATCH_SIZE = int(os.environ.get('ACTIVITY_RETENTION_BATCH_SIZE', 1000))
+    # Compacted activities are archived here as gzipped NDJSON; unset to delete them
+    ACTIVITY_ARCHIVE_DIR = os.environ.get('ACTIVITY_ARCHIVE_DIR')
+    # Seconds between the per-worker reads of new activities for /api/activities/stream
+    EVENT_POLL_INTERVAL = float(os.environ.get('EVENT_POLL_INTERVAL', 1))
+    EVENT_HEARTBEAT = float(os.environ.get('EVENT_HEARTBEAT', 15))
+    # Undelivered events per stream before the client is disconnected to resume with Last-Event-ID
+    EVENT_SUBSCRIBER_QUEUE = int(os.environ.get('EVENT_SUBSCRIBER_QUEUE', 1000))
+    EVENT_REPLAY_LIMIT = int(os.environ.get('EVENT_REPLAY_LIMIT', 1000))
+    # Seconds the stream waits for an activity whose id was allocated but has not committed
+    EVENT_GAP_TIMEOUT = float(os.environ.get('EVENT_GAP_TIMEOUT', 10))
+    # Most tasks accepted by one /api/tasks/bulk request
+    TASK_BULK_LIMIT = int(os.environ.get('TASK_BULK_LIMIT', 1000))
+    # Rows re-indexed per transaction by `flask search rebuild`
+    SEARCH_REBUILD_BATCH_SIZE = int(os.environ.get('SEARCH_REBUILD_BATCH_SIZE', 10000))
+    # 'counters' reads project progress from the task counters on each project, 'aggregate' counts
+    # the tasks of the listed projects with one GROUP BY (for tasks written outside the app)
+    PROJECT_PROGRESS_SOURCE = os.environ.get('PROJECT_PROGRESS_SOURCE', 'counters')
+    # Project summaries cached per worker; each is evicted when a task of its project is written
+    PROJECT_SUMMARY_CACHE_SIZE = int(os.environ.get('PROJECT_SUMMARY_CACHE_SIZE', 1024))
+    PROJECT_SUMMARY_CACHE_TTL = int(os.environ.get('PROJECT_SUMMARY_CACHE_TTL', 60))
+    # Projects compared per transaction by `flask projects snapshot`
+    PROJECT_SNAPSHOT_BATCH_SIZE = int(os.environ.get('PROJECT_SNAPSHOT_BATCH_SIZE', 1000))
 
     @classmethod
     def is_production(cls):
@@ -20,3 +85,7 @@ class Config:
 
 class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
+    PASSWORD_HASH_WORKERS = 0
+    ACTIVITY_SINK_MODE = 'sync'
+    EVENT_POLL_INTERVAL = 0.05
+    EVENT_HEARTBEAT = 0.2
@@ -0,0 +1,36 @@
+"""Added task scope indexes
+
+Revision ID: 3b8e6f1d2a49
+Revises: e71b3d9f5a04
+Create Date: 2026-10-18 16:21:07.182604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e6f1d2a49'
+down_revision = 'e71b3d9f5a04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tasks_assignee_id'), ['assignee_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_tasks_project_id'), ['project_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_tasks_status'), ['status'], unique=False)
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_comments_task_id'), ['task_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_comments_task_id'))
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tasks_status'))
+        batch_op.drop_index(batch_op.f('ix_tasks_project_id'))
+        batch_op.drop_index(batch_op.f('ix_tasks_assignee_id'))
@@ -0,0 +1,35 @@
+"""Added revoked sessions table
+
+Revision ID: 3c5e8a1f9b42
+Revises: a73f797f0923
+Create Date: 2026-10-18 09:12:41.204113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c5e8a1f9b42'
+down_revision = 'a73f797f0923'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('revoked_sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id')
+    )
+    with op.batch_alter_table('revoked_sessions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_revoked_sessions_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('revoked_sessions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_revoked_sessions_expires_at'))
+
+    op.drop_table('revoked_sessions')
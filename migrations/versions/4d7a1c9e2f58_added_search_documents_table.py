@@ -0,0 +1,71 @@
+"""Added search documents table
+
+Revision ID: 4d7a1c9e2f58
+Revises: 8f4a2c6e9b13
+Create Date: 2026-10-18 18:02:41.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d7a1c9e2f58'
+down_revision = '8f4a2c6e9b13'
+branch_labels = None
+depends_on = None
+
+SEARCH_INDEX_DDL = {
+    'sqlite': (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5("
+        "title, body, content='search_documents', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+        "INSERT INTO search_documents_fts (rowid, title, body) VALUES (new.id, new.title, new.body); END",
+        "CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+        "INSERT INTO search_documents_fts (search_documents_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); END",
+        "CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN "
+        "INSERT INTO search_documents_fts (search_documents_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); "
+        "INSERT INTO search_documents_fts (rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    ),
+    'postgresql': (
+        "ALTER TABLE search_documents ADD COLUMN document tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', body), 'B')) STORED",
+        "CREATE INDEX ix_search_documents_document ON search_documents USING gin (document)",
+    ),
+}
+
+# Existing rows are indexed with the table; `flask search rebuild` does the same in batches.
+BACKFILL = (
+    "INSERT INTO search_documents (target_type, target_id, title, body) "
+    "SELECT 'task', id, title, COALESCE(description, '') FROM tasks",
+    "INSERT INTO search_documents (target_type, target_id, title, body) "
+    "SELECT 'comment', id, '', content FROM comments",
+    "INSERT INTO search_documents (target_type, target_id, title, body) "
+    "SELECT 'project', id, name, COALESCE(description, '') FROM projects",
+    "INSERT INTO search_documents (target_type, target_id, title, body) "
+    "SELECT 'tag', id, name, '' FROM tags",
+)
+
+
+def upgrade():
+    op.create_table('search_documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('target_type', sa.String(length=20), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.Text(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('target_type', 'target_id', name='uq_search_documents_target_type_target_id')
+    )
+    for statement in SEARCH_INDEX_DDL.get(op.get_bind().dialect.name, ()):
+        op.execute(statement)
+    for statement in BACKFILL:
+        op.execute(statement)
+
+
+def downgrade():
+    op.drop_table('search_documents')
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS search_documents_fts")
@@ -0,0 +1,32 @@
+"""Added activity feed indexes
+
+Revision ID: 5e1c9a7d3f26
+Revises: 7d2f4b6a8c10
+Create Date: 2026-10-18 11:24:05.318642
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1c9a7d3f26'
+down_revision = '7d2f4b6a8c10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.create_index('ix_activities_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_activities_user_id_created_at_id', ['user_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_activities_action_type_created_at_id', ['action_type', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_activities_target_created_at_id', ['target_type', 'target_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.drop_index('ix_activities_target_created_at_id')
+        batch_op.drop_index('ix_activities_action_type_created_at_id')
+        batch_op.drop_index('ix_activities_user_id_created_at_id')
+        batch_op.drop_index('ix_activities_created_at_id')
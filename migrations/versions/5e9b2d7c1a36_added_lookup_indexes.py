@@ -0,0 +1,42 @@
+"""Added lookup indexes
+
+Revision ID: 5e9b2d7c1a36
+Revises: 4d7a1c9e2f58
+Create Date: 2026-10-18 18:31:07.214863
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9b2d7c1a36'
+down_revision = '4d7a1c9e2f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tasks_parent_task_id'), ['parent_task_id'], unique=False)
+        batch_op.create_index('ix_tasks_open_project_id_due_date', ['project_id', 'due_date'], unique=False,
+                              sqlite_where=sa.text('is_completed IS 0'),
+                              postgresql_where=sa.text('is_completed IS false'))
+
+    with op.batch_alter_table('subtasks', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_subtasks_task_id'), ['task_id'], unique=False)
+
+    with op.batch_alter_table('task_tags', schema=None) as batch_op:
+        batch_op.create_index('ix_task_tags_tag_id', ['tag_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task_tags', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_tags_tag_id')
+
+    with op.batch_alter_table('subtasks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_subtasks_task_id'))
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_open_project_id_due_date')
+        batch_op.drop_index(batch_op.f('ix_tasks_parent_task_id'))
@@ -0,0 +1,32 @@
+"""Added task and project versions
+
+Revision ID: 8f4a2c6e9b13
+Revises: 3b8e6f1d2a49
+Create Date: 2026-10-18 18:05:41.529617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f4a2c6e9b13'
+down_revision = '3b8e6f1d2a49'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_column('version')
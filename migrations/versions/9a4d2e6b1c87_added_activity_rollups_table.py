@@ -0,0 +1,37 @@
+"""Added activity rollups table
+
+Revision ID: 9a4d2e6b1c87
+Revises: 5e1c9a7d3f26
+Create Date: 2026-10-18 12:41:52.907315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4d2e6b1c87'
+down_revision = '5e1c9a7d3f26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('activity_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('action_type', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'user_id', 'action_type', name='uq_activity_rollups_day_user_id_action_type')
+    )
+    with op.batch_alter_table('activity_rollups', schema=None) as batch_op:
+        batch_op.create_index('ix_activity_rollups_user_id_day', ['user_id', 'day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('activity_rollups', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_rollups_user_id_day')
+
+    op.drop_table('activity_rollups')
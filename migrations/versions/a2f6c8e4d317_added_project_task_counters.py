@@ -0,0 +1,38 @@
+"""Added project task counters
+
+Revision ID: a2f6c8e4d317
+Revises: 5e9b2d7c1a36
+Create Date: 2026-10-18 18:52:19.604318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2f6c8e4d317'
+down_revision = '5e9b2d7c1a36'
+branch_labels = None
+depends_on = None
+
+# Existing projects are counted with the columns; from then on `app.counters` keeps them up to date.
+BACKFILL = (
+    "UPDATE projects SET "
+    "total_task_count = (SELECT count(*) FROM tasks WHERE tasks.project_id = projects.id), "
+    "completed_task_count = (SELECT count(*) FROM tasks WHERE tasks.project_id = projects.id "
+    "AND tasks.is_completed = true)"
+)
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_task_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('completed_task_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(BACKFILL)
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('completed_task_count')
+        batch_op.drop_column('total_task_count')
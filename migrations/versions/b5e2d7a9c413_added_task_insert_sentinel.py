@@ -0,0 +1,26 @@
+"""Added task insert sentinel
+
+Revision ID: b5e2d7a9c413
+Revises: f3a8b1c6d2e9
+Create Date: 2026-10-18 21:52:16.204718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e2d7a9c413'
+down_revision = 'f3a8b1c6d2e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sentinel', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_column('sentinel')
@@ -0,0 +1,66 @@
+"""Activity details as JSON
+
+Revision ID: c38f0b5e7a12
+Revises: 9a4d2e6b1c87
+Create Date: 2026-10-18 13:37:20.114958
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c38f0b5e7a12'
+down_revision = '9a4d2e6b1c87'
+branch_labels = None
+depends_on = None
+
+DETAIL_INDEXES = {
+    'ix_activities_details_actor': 'actor',
+    'ix_activities_details_task_title': 'task_title',
+}
+
+
+def detail_expression(dialect, key):
+    if dialect == 'postgresql':
+        return sa.text(f"(details ->> '{key}')")
+    return sa.text(f"json_extract(details, '$.{key}')")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.alter_column('activities', 'details',
+                        existing_type=sa.TEXT(),
+                        type_=postgresql.JSONB(astext_type=sa.Text()),
+                        existing_nullable=True,
+                        postgresql_using='details::jsonb')
+    else:
+        # SQLite keeps JSON as text; json_extract (JSON1) reads it in place.
+        with op.batch_alter_table('activities', schema=None) as batch_op:
+            batch_op.alter_column('details',
+                                  existing_type=sa.TEXT(),
+                                  type_=sa.JSON(),
+                                  existing_nullable=True)
+
+    for name, key in DETAIL_INDEXES.items():
+        op.create_index(name, 'activities', [detail_expression(dialect, key), 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    for name in DETAIL_INDEXES:
+        op.drop_index(name, table_name='activities')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('activities', 'details',
+                        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                        type_=sa.TEXT(),
+                        existing_nullable=True,
+                        postgresql_using='details::text')
+    else:
+        with op.batch_alter_table('activities', schema=None) as batch_op:
+            batch_op.alter_column('details',
+                                  existing_type=sa.JSON(),
+                                  type_=sa.TEXT(),
+                                  existing_nullable=True)
@@ -0,0 +1,50 @@
+"""Added project snapshots table
+
+Revision ID: c7d3e9a1f624
+Revises: a2f6c8e4d317
+Create Date: 2026-10-18 19:24:53.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d3e9a1f624'
+down_revision = 'a2f6c8e4d317'
+branch_labels = None
+depends_on = None
+
+# Existing projects are counted with the column; from then on `app.counters` keeps it up to date.
+BACKFILL = (
+    "UPDATE projects SET remaining_estimated_time = ("
+    "SELECT COALESCE(SUM(estimated_time), 0) FROM tasks WHERE tasks.project_id = projects.id "
+    "AND tasks.is_completed IS NOT true)"
+)
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('remaining_estimated_time', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(BACKFILL)
+
+    op.create_table('project_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('open_count', sa.Integer(), nullable=False),
+    sa.Column('completed_count', sa.Integer(), nullable=False),
+    sa.Column('remaining_estimated_time', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('project_id', 'day', name='uq_project_snapshots_project_id_day')
+    )
+
+
+def downgrade():
+    op.drop_table('project_snapshots')
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('remaining_estimated_time')
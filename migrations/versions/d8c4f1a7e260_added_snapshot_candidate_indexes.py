@@ -0,0 +1,35 @@
+"""Added snapshot candidate indexes
+
+Revision ID: d8c4f1a7e260
+Revises: b5e2d7a9c413
+Create Date: 2026-10-18 22:41:09.318524
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8c4f1a7e260'
+down_revision = 'b5e2d7a9c413'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tasks_removed_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_projects_tasks_removed_at'), ['tasks_removed_at'],
+                              unique=False)
+
+    with op.batch_alter_table('project_snapshots', schema=None) as batch_op:
+        batch_op.create_index('ix_project_snapshots_taken_at', ['taken_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('project_snapshots', schema=None) as batch_op:
+        batch_op.drop_index('ix_project_snapshots_taken_at')
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_projects_tasks_removed_at'))
+        batch_op.drop_column('tasks_removed_at')
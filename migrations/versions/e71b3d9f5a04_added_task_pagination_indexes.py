@@ -0,0 +1,32 @@
+"""Added task pagination indexes
+
+Revision ID: e71b3d9f5a04
+Revises: c38f0b5e7a12
+Create Date: 2026-10-18 15:02:48.660391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71b3d9f5a04'
+down_revision = 'c38f0b5e7a12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index('ix_tasks_due_date_id', ['due_date', 'id'], unique=False)
+        batch_op.create_index('ix_tasks_priority_id', ['priority', 'id'], unique=False)
+        batch_op.create_index('ix_tasks_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_tasks_updated_at_id', ['updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_updated_at_id')
+        batch_op.drop_index('ix_tasks_created_at_id')
+        batch_op.drop_index('ix_tasks_priority_id')
+        batch_op.drop_index('ix_tasks_due_date_id')
@@ -0,0 +1,30 @@
+"""Added project created_by
+
+Revision ID: f3a8b1c6d2e9
+Revises: c7d3e9a1f624
+Create Date: 2026-10-18 21:07:42.531907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8b1c6d2e9'
+down_revision = 'c7d3e9a1f624'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_by', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_projects_created_by'), ['created_by'], unique=False)
+        batch_op.create_foreign_key('fk_projects_created_by_users', 'users', ['created_by'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_projects_created_by_users', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_projects_created_by'))
+        batch_op.drop_column('created_by')
@@ -1,7 +1,12 @@
+import json
+
 import pytest
 from sqlalchemy import inspect
 from app import create_app, db
+from app.session import session_cache
+from app.summaries import summary_cache
 from config import TestConfig
+from tests.resp_server import RespStandIn
 
 
 @pytest.fixture(scope='module')
@@ -13,7 +18,6 @@ def app():
 
 @pytest.fixture(scope='module')
 def test_client(app):
-    app = create_app()
     with app.test_client() as client:
         yield client
 
@@ -39,3 +43,54 @@ def init_database(app):
         inspector = inspect(db.engine)
         table_names = inspector.get_table_names()
         print("Tables after deletion:", table_names)
+
+
+@pytest.fixture(scope='session')
+def resp_server():
+    server = RespStandIn().start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def register(client, name, password='testpassword'):
+    """Registers the user `<name>user`, with the email `<name>@example.com`."""
+    return client.post('/api/user/register',
+                       data=json.dumps({
+                           'username': f'{name}user',
+                           'first_name': name.title(),
+                           'last_name': 'User',
+                           'email': f'{name}@example.com',
+                           'password': password
+                       }),
+                       content_type='application/json')
+
+
+def login(client, name, password='testpassword'):
+    return client.post('/api/user/login',
+                       data=json.dumps({
+                           'email': f'{name}@example.com',
+                           'password': password
+                       }),
+                       content_type='application/json')
+
+
+@pytest.fixture
+def user_name():
+    """
+    Who `logged_in_client` registers and logs in as, see `register`. Override it in a test
+    module, or parametrize it, to log in as someone else.
+    """
+    return 'test'
+
+
+@pytest.fixture(scope='function')
+def logged_in_client(test_client, init_database, user_name):
+    with test_client.application.app_context():
+        session_cache.clear()
+        summary_cache.clear()
+    register(test_client, user_name)
+    response = login(test_client, user_name)
+    assert response.status_code == 200
+    yield test_client
+    test_client.delete_cookie('session_id')
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+
+from app import db
+from app.models import Activities, Project, Task, User
+from app.services.activity import ActivityService
+from app.utils.cursor import InvalidCursor
+
+
+@pytest.fixture(scope='function')
+def activities(app, logged_in_client):
+    """
+    25 activities the logged in user can see: their own and another user's in a shared
+    project. The activities of a third user outside of it are not theirs to see.
+    """
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        other = User(username='other', email='other@example.com')
+        shared = Project(name='Shared')
+        db.session.add_all([other, Task(title='Shared', assignee=user, project=shared)])
+        db.session.flush()
+        # Pairs of activities share a timestamp so the id tiebreaker is exercised.
+        db.session.add_all([
+            Activities(
+                user_id=other.id if i % 2 else user.id,
+                action_type='create' if i % 3 else 'update',
+                target_type='task',
+                target_id=i,
+                details={'project_id': shared.id} if i % 2 else {},
+                created_at=start + timedelta(minutes=i // 2)
+            )
+            for i in range(25)
+        ])
+        db.session.add_all([
+            Activities(user_id=other.id + 1, action_type='create', target_type='task',
+                       target_id=i, details={'project_id': shared.id + 1},
+                       created_at=start + timedelta(minutes=i))
+            for i in range(25, 28)
+        ])
+        db.session.commit()
+        ids = {'user': user.id, 'other': other.id}
+    yield ids
+
+
+def fetch_all(client, query=''):
+    pages, cursor = [], None
+    while True:
+        url = f'/api/activities/recent-activities?limit=10{query}'
+        if cursor:
+            url += f'&cursor={cursor}'
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append(response.json)
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return pages
+
+
+def test_feed_pages_newest_first_without_gaps(logged_in_client, activities):
+    pages = fetch_all(logged_in_client)
+    assert [len(page) for page in pages] == [10, 10, 5]
+
+    ids = [activity['id'] for page in pages for activity in page]
+    assert ids == list(range(25, 0, -1))
+
+
+def test_feed_filters(logged_in_client, activities):
+    pages = fetch_all(logged_in_client, f"&user_id={activities['other']}&action_type=create")
+    found = [activity for page in pages for activity in page]
+    assert found
+    assert all(a['user_id'] == activities['other'] and a['action_type'] == 'create'
+               for a in found)
+    assert len(found) == len([i for i in range(25) if i % 2 == 1 and i % 3])
+
+    assert fetch_all(logged_in_client, f"&user_id={activities['other'] + 1}") == [[]]
+
+
+def test_feed_rejects_bad_cursor(logged_in_client, activities):
+    response = logged_in_client.get('/api/activities/recent-activities?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+def test_feed_requires_a_session(test_client, init_database):
+    assert test_client.get('/api/activities/recent-activities').status_code == 401
+
+
+def test_unknown_filter_is_rejected(app, activities):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            ActivityService.feed(10, None, details='x')
+        with pytest.raises(InvalidCursor):
+            ActivityService.feed(10, 'e30')
+
+
+@pytest.mark.parametrize('where, index', [
+    ('', 'ix_activities_created_at_id'),
+    ('user_id = 1 AND', 'ix_activities_user_id_created_at_id'),
+    ('target_type = \'task\' AND target_id = 3 AND', 'ix_activities_target_created_at_id'),
+])
+def test_feed_page_is_an_index_range_scan(app, activities, where, index):
+    with app.app_context():
+        plan = db.session.execute(text(
+            f"EXPLAIN QUERY PLAN SELECT * FROM activities "
+            f"WHERE {where} (created_at, id) < ('2026-01-01 12:05:00', 10) "
+            f"ORDER BY created_at DESC, id DESC LIMIT 11"
+        )).all()
+    details = ' '.join(row[-1] for row in plan)
+    assert index in details
+    assert details.startswith('SEARCH')
+    assert 'TEMP B-TREE' not in details
+
+
+@pytest.fixture(scope='function')
+def detailed_activities(app, logged_in_client):
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        db.session.add_all([
+            Activities(user_id=user.id, action_type='create', target_type='task', target_id=i,
+                       details={'actor': 'alice' if i % 2 else 'bob', 'task_title': f'Task {i}'})
+            for i in range(6)
+        ])
+        db.session.commit()
+    yield
+
+
+def test_details_are_stored_as_json(app, detailed_activities):
+    with app.app_context():
+        activity = Activities.query.filter(Activities.detail('task_title') == 'Task 3').one()
+        assert activity.details == {'actor': 'alice', 'task_title': 'Task 3'}
+        assert activity.details_json is activity.details
+
+
+def test_feed_filters_on_details(logged_in_client, detailed_activities):
+    response = logged_in_client.get('/api/activities/recent-activities?actor=bob')
+    assert [activity['target_id'] for activity in response.json] == ['4', '2', '0']
+
+    response = logged_in_client.get('/api/activities/recent-activities?task_title=Task%205')
+    assert [activity['target_id'] for activity in response.json] == ['5']
+
+
+@pytest.mark.parametrize('key', ['actor', 'task_title'])
+def test_detail_filter_uses_expression_index(app, detailed_activities, key):
+    with app.app_context():
+        query = select(Activities).where(Activities.detail(key) == 'x').order_by(
+            Activities.created_at.desc(), Activities.id.desc()).limit(11)
+        compiled = query.compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = db.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}')).all()
+    details = ' '.join(row[-1] for row in plan)
+    assert f'ix_activities_details_{key}' in details
+    assert 'TEMP B-TREE' not in details
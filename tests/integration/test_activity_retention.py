@@ -0,0 +1,114 @@
+import gzip
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app import db
+from app.maintenance import activity_retention
+from app.models import Activities, ActivityRollup, User
+from app.services.activity import ActivityService
+
+NOW = datetime(2026, 6, 30, 15, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def activities(app, init_database):
+    with app.app_context():
+        for days_ago, user_id, action_type in [
+            (40, 1, 'create'), (40, 1, 'create'), (40, 2, 'update'),
+            (35, 1, 'create'),
+            (31, 1, 'create'),
+            (3, 1, 'create'), (0, 2, 'update'),
+        ]:
+            created_at = (NOW - timedelta(days=days_ago)).replace(tzinfo=None)
+            db.session.add(Activities(user_id=user_id, action_type=action_type, target_type='task',
+                                      target_id=1, details={}, created_at=created_at))
+        db.session.commit()
+    yield
+
+
+def counts_by_day(rows):
+    return {(row['day'], row['user_id'], row['action_type']): row['count'] for row in rows}
+
+
+def test_compact_rolls_up_old_activities_in_batches(app, activities):
+    with app.app_context():
+        before = counts_by_day(ActivityService.daily_counts(date(2026, 5, 1), date(2026, 6, 30)))
+
+        result = activity_retention.compact(days=30, batch_size=2, now=NOW)
+
+        assert result == {'compacted': 5, 'archived': 0, 'rollups': 4}
+        assert Activities.query.count() == 2
+        rollups = {(r.day, r.user_id, r.action_type): r.count for r in ActivityRollup.query.all()}
+        assert rollups[(date(2026, 5, 21), 1, 'create')] == 2
+        assert sum(rollups.values()) == 5
+
+        after = counts_by_day(ActivityService.daily_counts(date(2026, 5, 1), date(2026, 6, 30)))
+        assert after == before
+        assert sum(after.values()) == 7
+
+
+def test_compact_is_idempotent(app, activities):
+    with app.app_context():
+        activity_retention.compact(days=30, now=NOW)
+        assert activity_retention.compact(days=30, now=NOW)['compacted'] == 0
+        assert db.session.query(db.func.sum(ActivityRollup.count)).scalar() == 5
+
+
+def test_compact_archives_rows_as_gzipped_ndjson(app, activities, tmp_path):
+    with app.app_context():
+        result = activity_retention.compact(days=30, batch_size=2, archive_dir=str(tmp_path),
+                                            now=NOW)
+    assert result['archived'] == 5
+
+    with gzip.open(tmp_path / 'activities-2026-05-21.ndjson.gz', 'rt') as archive:
+        rows = [json.loads(line) for line in archive]
+    assert len(rows) == 3
+    assert {row['action_type'] for row in rows} == {'create', 'update'}
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        'activities-2026-05-21.ndjson.gz',
+        'activities-2026-05-26.ndjson.gz',
+        'activities-2026-05-30.ndjson.gz',
+    ]
+
+
+def test_daily_counts_endpoint(logged_in_client, app, activities):
+    with app.app_context():
+        assert User.query.filter_by(email='test@example.com').one().id == 1
+        activity_retention.compact(days=30, now=NOW)
+
+    # Only the caller's own activities are counted.
+    expected = [
+        {'day': '2026-05-21', 'user_id': 1, 'action_type': 'create', 'count': 2},
+        {'day': '2026-05-26', 'user_id': 1, 'action_type': 'create', 'count': 1},
+        {'day': '2026-05-30', 'user_id': 1, 'action_type': 'create', 'count': 1},
+        {'day': '2026-06-27', 'user_id': 1, 'action_type': 'create', 'count': 1},
+    ]
+    for query in ['', '&user_id=1']:
+        response = logged_in_client.get(
+            f'/api/activities/daily-counts?start=2026-05-01&end=2026-06-30{query}'
+        )
+        assert response.status_code == 200
+        assert response.json == expected
+    response = logged_in_client.get(
+        '/api/activities/daily-counts?start=2026-05-01&end=2026-06-30&user_id=2'
+    )
+    assert response.json == []
+
+    response = logged_in_client.get(
+        '/api/activities/daily-counts?start=2026-06-30&end=2026-05-01'
+    )
+    assert response.status_code == 400
+
+
+def test_daily_counts_require_a_session(test_client, init_database):
+    response = test_client.get('/api/activities/daily-counts?start=2026-05-01&end=2026-06-30')
+    assert response.status_code == 401
+
+
+def test_compact_command(app, activities):
+    result = app.test_cli_runner().invoke(args=['activities', 'compact', '--days', '0'])
+
+    assert result.exit_code == 0
+    assert '7 activities compacted' in result.output
@@ -0,0 +1,161 @@
+import json
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import db
+from app.activity_sink import activity_sink
+from app.aop import commit, log_activity
+from app.models import Activities, Task, User
+
+
+@pytest.fixture
+def inserts():
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('INSERT INTO ACTIVITIES'):
+            executed.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def buffered(monkeypatch):
+    activity_sink.flush()
+    monkeypatch.setattr(activity_sink, 'mode', activity_sink.BUFFERED)
+    # Keep the background flusher out of the way so the tests decide when to flush.
+    monkeypatch.setattr(activity_sink, '_ensure_flusher', lambda: None)
+    yield activity_sink
+
+
+def create_task(client, title):
+    return client.post('/api/tasks/', data=json.dumps({'title': title}),
+                       content_type='application/json')
+
+
+def test_sync_mode_writes_immediately(app, logged_in_client, inserts):
+    assert create_task(logged_in_client, 'Write docs').status_code == 201
+    assert len(inserts) == 1
+
+    with app.app_context():
+        activity = Activities.query.one()
+        assert activity.action_type == 'create'
+        assert activity.details_json['task_title'] == 'Write docs'
+
+
+def test_buffered_mode_writes_one_insert_per_batch(app, logged_in_client, inserts, buffered):
+    for i in range(5):
+        assert create_task(logged_in_client, f'Task {i}').status_code == 201
+    assert inserts == []
+    assert buffered.stats()['queue_depth'] == 5
+
+    with app.app_context():
+        assert buffered.flush() == 5
+        assert Activities.query.count() == 5
+    assert len(inserts) == 1
+    assert buffered.stats()['queue_depth'] == 0
+
+
+def test_buffered_mode_drops_beyond_queue_limit(app, init_database, buffered, monkeypatch):
+    monkeypatch.setattr(buffered, 'queue_limit', 2)
+    dropped = buffered.dropped
+    with app.app_context():
+        for _ in range(3):
+            buffered.record(user_id=1, action_type='create', target_type='task', target_id=1)
+        assert buffered.dropped == dropped + 1
+        assert buffered.flush() == 2
+
+
+def test_failed_batches_are_counted(app, init_database, buffered):
+    failed = buffered.failed
+    with app.app_context():
+        buffered.record(user_id=1, action_type='create', target_type='task', target_id=None)
+        buffered.flush()
+        assert db.session.query(Activities).count() == 0
+    assert buffered.failed == failed + 1
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    monkeypatch.setattr(activity_sink, 'mode', activity_sink.OUTBOX)
+    yield activity_sink
+
+
+@pytest.fixture
+def transactions():
+    executed = {'statements': [], 'commits': 0}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed['statements'].append(statement)
+
+    def count_commit(conn):
+        executed['commits'] += 1
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    event.listen(Engine, 'commit', count_commit)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', record)
+    event.remove(Engine, 'commit', count_commit)
+
+
+def writes(statements):
+    return [s for s in statements if s.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+
+def test_sync_mode_commits_twice_per_service_call(logged_in_client, transactions):
+    assert create_task(logged_in_client, 'Two commits').status_code == 201
+    assert transactions['commits'] == 2
+
+
+def test_outbox_mode_commits_once_per_service_call(app, logged_in_client, transactions, outbox):
+    assert create_task(logged_in_client, 'One commit').status_code == 201
+    assert transactions['commits'] == 1
+    assert [s.split()[2] for s in writes(transactions['statements'])] == [
+        'tasks', 'search_documents', 'activities'
+    ]
+
+    with app.app_context():
+        activity = Activities.query.one()
+        assert activity.details_json['task_title'] == 'One commit'
+
+
+def test_outbox_mode_rolls_back_business_change_with_activity(app, init_database, outbox):
+    calls = []
+
+    @log_activity('create', 'task')
+    def create_untargeted(title, current_user):
+        calls.append(title)
+        db.session.add(Task(title=title))
+        commit()
+        # No `id` on the result, so the NOT NULL activities.target_id insert fails.
+        return {'title': title}
+
+    with app.app_context():
+        user = User(username='outbox', first_name='Out', last_name='Box',
+                    email='outbox@example.com')
+        db.session.add(user)
+        db.session.commit()
+
+        with pytest.raises(Exception):
+            create_untargeted('Orphan', current_user=user)
+        assert calls == ['Orphan']
+        assert Task.query.count() == 0
+        assert Activities.query.count() == 0
+
+
+def test_failing_service_is_called_once(app, init_database):
+    calls = []
+
+    @log_activity('create', 'task')
+    def failing(current_user):
+        calls.append(1)
+        raise ValueError("boom")
+
+    with app.app_context():
+        with pytest.raises(ValueError):
+            failing(current_user=None)
+    assert calls == [1]
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import db
+from app.models import User
+from app.passwords import password_hasher
+from app.session import MemorySessionStore, RedisSessionStore
+
+
+@pytest.fixture(params=['database', 'memory', 'redis', 'stateless'])
+def session_mode(request, test_client, resp_server):
+    app = test_client.application
+    previous_mode = app.config.get('SESSION_MODE')
+    previous_store = app.extensions['session_store']
+
+    if request.param == 'stateless':
+        app.config['SESSION_MODE'] = 'stateless'
+    elif request.param == 'memory':
+        app.extensions['session_store'] = MemorySessionStore(previous_store.lifetime)
+    elif request.param == 'redis':
+        resp_server.data.clear()
+        app.extensions['session_store'] = RedisSessionStore(resp_server.url,
+                                                            previous_store.lifetime)
+
+    yield request.param
+    app.config['SESSION_MODE'] = previous_mode
+    app.extensions['session_store'] = previous_store
+
+
+@pytest.fixture
+def user_name(session_mode):
+    # Depending on the session mode switches it before `logged_in_client` logs in.
+    return 'auth'
+
+
+def test_authenticated_request(logged_in_client):
+    response = logged_in_client.get('/api/user/check-auth')
+    assert response.status_code == 200
+    assert response.get_json()['email'] == 'auth@example.com'
+
+
+def test_missing_cookie_is_rejected(test_client, init_database, session_mode):
+    test_client.delete_cookie('session_id')
+    assert test_client.get('/api/user/check-auth').status_code == 401
+
+
+def test_tampered_cookie_is_rejected(logged_in_client):
+    cookie = logged_in_client.get_cookie('session_id').value
+    logged_in_client.set_cookie('session_id', cookie[:-4] + 'AAAA')
+    assert logged_in_client.get('/api/user/check-auth').status_code == 401
+
+
+def test_refresh_rotates_session(logged_in_client):
+    old_cookie = logged_in_client.get_cookie('session_id').value
+
+    response = logged_in_client.post('/api/user/refresh-session')
+    assert response.status_code == 200
+    assert logged_in_client.get_cookie('session_id').value != old_cookie
+    assert logged_in_client.get('/api/user/check-auth').status_code == 200
+
+    logged_in_client.set_cookie('session_id', old_cookie)
+    assert logged_in_client.get('/api/user/check-auth').status_code == 401
+
+
+def test_logout_ends_session(logged_in_client):
+    assert logged_in_client.get('/api/user/check-auth').status_code == 200
+
+    response = logged_in_client.post('/api/user/logout', data=json.dumps({}),
+                                     content_type='application/json')
+    assert response.status_code == 200
+    assert logged_in_client.get('/api/user/check-auth').status_code == 401
+
+
+def test_stateless_token_validates_without_queries(logged_in_client, session_mode):
+    if session_mode != 'stateless':
+        pytest.skip('Only stateless sessions skip the sessions table')
+
+    assert logged_in_client.get('/api/user/check-auth').status_code == 200
+
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    try:
+        assert logged_in_client.get('/api/user/check-auth').status_code == 200
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count)
+    assert executed == []
+
+
+def test_login_upgrades_outdated_hash(app, test_client, init_database, monkeypatch):
+    monkeypatch.setattr(password_hasher, 'method', 'pbkdf2:sha256:1000')
+    monkeypatch.setattr(password_hasher, '_method_prefix', None)
+    test_client.post('/api/user/register',
+                     data=json.dumps({
+                         'username': 'hashuser',
+                         'first_name': 'Hash',
+                         'last_name': 'User',
+                         'email': 'hash@example.com',
+                         'password': 'testpassword'
+                     }),
+                     content_type='application/json')
+
+    monkeypatch.setattr(password_hasher, 'method', 'pbkdf2:sha256:2000')
+    monkeypatch.setattr(password_hasher, '_method_prefix', None)
+    response = test_client.post('/api/user/login',
+                                data=json.dumps({
+                                    'email': 'hash@example.com',
+                                    'password': 'testpassword'
+                                }),
+                                content_type='application/json')
+    assert response.status_code == 200
+
+    with app.app_context():
+        user = db.session.scalar(db.select(User).filter_by(email='hash@example.com'))
+        assert user.password_hash.startswith('pbkdf2:sha256:2000$')
+        assert user.check_password('testpassword')
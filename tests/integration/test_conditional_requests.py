@@ -0,0 +1,205 @@
+import json
+
+import pytest
+from sqlalchemy import event, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import db
+from app.models import Project, Task, User
+from app.services.task import TaskService
+
+
+@pytest.fixture(scope='function')
+def data(app, logged_in_client):
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        project = Project(name='Versioned')
+        task = Task(title='Versioned', assignee=user, project=project)
+        db.session.add(task)
+        db.session.commit()
+        ids = {'task': task.id, 'project': project.id}
+    yield ids
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', count)
+
+
+def put_task(client, task_id, body, etag=None):
+    headers = {'If-Match': etag} if etag else {}
+    return client.put(f'/api/tasks/update/{task_id}', data=json.dumps(body),
+                      content_type='application/json', headers=headers)
+
+
+def test_unchanged_task_is_not_modified(logged_in_client, data, statements):
+    response = logged_in_client.get(f"/api/tasks/{data['task']}")
+    assert response.status_code == 200
+    assert response.headers['ETag'] == '"1"'
+    assert response.json['task']['version'] == 1
+
+    statements.clear()
+    response = logged_in_client.get(f"/api/tasks/{data['task']}", headers={'If-None-Match': '"1"'})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == '"1"'
+    assert len(statements) == 1
+
+
+def test_etags_follow_the_representation(logged_in_client, data):
+    response = logged_in_client.get(f"/api/tasks/{data['task']}?fields=title")
+    assert response.headers['ETag'] == '"1.id.title"'
+    assert logged_in_client.get(f"/api/tasks/{data['task']}?fields=title",
+                                headers={'If-None-Match': '"1"'}).status_code == 200
+
+    assert 'ETag' not in logged_in_client.get(f"/api/tasks/{data['task']}?include=tags").headers
+
+
+def test_update_with_if_match(app, logged_in_client, data):
+    response = put_task(logged_in_client, data['task'], {'status': 'DONE'}, etag='"1"')
+    assert response.status_code == 200
+    assert response.headers['ETag'] == '"2"'
+    assert response.json['task']['version'] == 2
+
+    # A second editor still holding version 1 does not overwrite the change.
+    response = put_task(logged_in_client, data['task'], {'status': 'TODO'}, etag='"1"')
+    assert response.status_code == 412
+    assert response.headers['ETag'] == '"2"'
+    with app.app_context():
+        assert db.session.get(Task, data['task']).status == 'DONE'
+
+    response = logged_in_client.get(f"/api/tasks/{data['task']}", headers={'If-None-Match': '"1"'})
+    assert response.status_code == 200
+    # Without If-Match the update is unconditional.
+    assert put_task(logged_in_client, data['task'], {'status': 'TODO'}).status_code == 200
+
+
+def test_concurrent_update_is_rejected(app, data):
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        task = db.session.get(Task, data['task'])
+        # Another worker commits a change after this one read the task.
+        with db.engine.begin() as connection:
+            connection.execute(update(Task.__table__).where(Task.__table__.c.id == task.id)
+                               .values(status='THEIRS', version=2))
+        with pytest.raises(StaleDataError):
+            TaskService.update_task(task, {'status': 'MINE'}, current_user=user)
+        db.session.rollback()
+        assert db.session.get(Task, data['task']).status == 'THEIRS'
+
+
+def test_bulk_update_checks_versions(app, logged_in_client, data):
+    response = logged_in_client.patch('/api/tasks/bulk', data=json.dumps({'tasks': [
+        {'id': data['task'], 'version': 1, 'status': 'DONE'}
+    ]}), content_type='application/json')
+    assert response.json['results'] == [
+        {'index': 0, 'id': data['task'], 'status': 200, 'version': 2}
+    ]
+
+    response = logged_in_client.patch('/api/tasks/bulk', data=json.dumps({'tasks': [
+        {'id': data['task'], 'version': 1, 'status': 'TODO'}
+    ]}), content_type='application/json')
+    assert response.json['results'][0]['status'] == 412
+    assert response.json['results'][0]['version'] == 2
+    with app.app_context():
+        task = db.session.get(Task, data['task'])
+        assert (task.status, task.version) == ('DONE', 2)
+
+
+def test_project_etag_covers_progress(app, logged_in_client, data, statements):
+    response = logged_in_client.get(f"/api/projects/{data['project']}")
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    statements.clear()
+    assert logged_in_client.get(f"/api/projects/{data['project']}",
+                                headers={'If-None-Match': etag}).status_code == 304
+    assert len(statements) == 1
+
+    # Completing a task changes the project's progress, and so its ETag.
+    with app.app_context():
+        db.session.get(Task, data['task']).is_completed = True
+        db.session.commit()
+    response = logged_in_client.get(f"/api/projects/{data['project']}",
+                                    headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['progress'] == 100
+    assert response.headers['ETag'] != etag
+
+
+def test_project_update_with_if_match(app, logged_in_client, data):
+    etag = logged_in_client.get(f"/api/projects/{data['project']}").headers['ETag']
+    url = f"/api/projects/{data['project']}"
+
+    response = logged_in_client.put(url, data=json.dumps({'name': 'Renamed'}),
+                                    content_type='application/json', headers={'If-Match': etag})
+    assert response.status_code == 200
+    assert response.json['version'] == 2
+
+    response = logged_in_client.put(url, data=json.dumps({'name': 'Lost'}),
+                                    content_type='application/json', headers={'If-Match': etag})
+    assert response.status_code == 412
+    with app.app_context():
+        assert db.session.get(Project, data['project']).name == 'Renamed'
+
+
+def test_task_changes_do_not_fail_project_if_match(app, logged_in_client, data):
+    url = f"/api/projects/{data['project']}"
+    etag = logged_in_client.get(url).headers['ETag']
+    with app.app_context():
+        db.session.get(Task, data['task']).is_completed = True
+        db.session.commit()
+
+    # The ETag moved with the project's progress, but the project itself did not change.
+    assert logged_in_client.get(url).headers['ETag'] != etag
+    response = logged_in_client.put(url, data=json.dumps({'name': 'Renamed'}),
+                                    content_type='application/json', headers={'If-Match': etag})
+    assert response.status_code == 200
+    assert response.json['progress'] == 100
+
+
+def test_project_writes_are_scoped(app, test_client, logged_in_client, data):
+    with app.app_context():
+        hidden = Project(name='Hidden')
+        db.session.add(hidden)
+        db.session.commit()
+        hidden_id = hidden.id
+    url = f'/api/projects/{hidden_id}'
+    assert logged_in_client.put(url, data=json.dumps({'name': 'Taken'}),
+                                content_type='application/json').status_code == 404
+    assert logged_in_client.delete(url).status_code == 404
+
+    logged_in_client.delete_cookie('session_id')
+    url = f"/api/projects/{data['project']}"
+    assert test_client.put(url, data=json.dumps({'name': 'Taken'}),
+                           content_type='application/json').status_code == 401
+    assert test_client.delete(url).status_code == 401
+    with app.app_context():
+        assert db.session.get(Project, hidden_id).name == 'Hidden'
+        assert db.session.get(Project, data['project']).name == 'Versioned'
+
+
+def test_creators_write_their_own_empty_projects(app, logged_in_client, data):
+    assert logged_in_client.post('/api/projects', data=json.dumps({'name': 'Empty'}),
+                                 content_type='application/json').status_code == 201
+    with app.app_context():
+        project_id = Project.query.filter_by(name='Empty').one().id
+    url = f'/api/projects/{project_id}'
+
+    etag = logged_in_client.get(url).headers['ETag']
+    response = logged_in_client.put(url, data=json.dumps({'name': 'Renamed'}),
+                                    content_type='application/json', headers={'If-Match': etag})
+    assert response.status_code == 200
+    assert response.json['name'] == 'Renamed'
+
+    assert logged_in_client.delete(url).status_code == 204
+    with app.app_context():
+        assert db.session.get(Project, project_id) is None
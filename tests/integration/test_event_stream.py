@@ -0,0 +1,168 @@
+import json
+
+import pytest
+
+from app import db
+from app.events import event_broadcaster
+from app.models import Activities, Project, Task, User
+
+
+@pytest.fixture
+def projects(app, logged_in_client):
+    """Project 'mine' has a task assigned to the logged in user, project 'other' does not."""
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        mine, other = Project(name='mine'), Project(name='other')
+        db.session.add_all([mine, other])
+        db.session.flush()
+        db.session.add(Task(title='Assigned', assignee_id=user.id, project_id=mine.id))
+        db.session.commit()
+        ids = {'user_id': user.id, 'mine': mine.id, 'other': other.id}
+    yield ids
+
+
+def add_activity(user_id, project_id, title, activity_id=None):
+    activity = Activities(id=activity_id, user_id=user_id, action_type='create', target_type='task',
+                          target_id=1, details={'task_title': title, 'project_id': project_id})
+    db.session.add(activity)
+    db.session.commit()
+    return activity.id
+
+
+def read_events(response, count, max_chunks=50):
+    events = []
+    chunks = iter(response.response)
+    for _ in range(max_chunks):
+        chunk = next(chunks)
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith('id: '):
+            lines = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+            events.append({'id': int(lines['id']), 'event': lines['event'],
+                           'data': json.loads(lines['data'])})
+            if len(events) == count:
+                break
+    response.close()
+    return events
+
+
+def test_poll_fans_out_to_matching_subscribers(app, projects, monkeypatch):
+    monkeypatch.setattr(event_broadcaster, '_run', lambda: None)
+    with app.app_context():
+        member = event_broadcaster.subscribe(projects['user_id'], {projects['mine']})
+        outsider = event_broadcaster.subscribe(999, {projects['other']})
+        try:
+            add_activity(42, projects['mine'], 'In mine')
+            add_activity(42, projects['other'], 'In other')
+            add_activity(projects['user_id'], None, 'No project')
+
+            assert event_broadcaster.poll() == 3
+            assert event_broadcaster.poll() == 0
+
+            mine = [member.events.get_nowait()['data']['details']['task_title']
+                    for _ in range(member.events.qsize())]
+            other = [outsider.events.get_nowait()['data']['details']['task_title']
+                     for _ in range(outsider.events.qsize())]
+            assert mine == ['In mine', 'No project']
+            assert other == ['In other']
+        finally:
+            event_broadcaster.unsubscribe(member)
+            event_broadcaster.unsubscribe(outsider)
+    assert len(event_broadcaster) == 0
+
+
+def test_slow_subscriber_is_disconnected(app, projects, monkeypatch):
+    monkeypatch.setattr(event_broadcaster, '_run', lambda: None)
+    monkeypatch.setattr(event_broadcaster, 'queue_size', 1)
+    with app.app_context():
+        subscription = event_broadcaster.subscribe(projects['user_id'], {projects['mine']})
+        add_activity(42, projects['mine'], 'First')
+        add_activity(42, projects['mine'], 'Second')
+        event_broadcaster.poll()
+        assert subscription.overflowed
+        event_broadcaster.unsubscribe(subscription)
+
+
+def test_rows_committed_out_of_order_are_not_skipped(app, projects, monkeypatch):
+    monkeypatch.setattr(event_broadcaster, '_run', lambda: None)
+    with app.app_context():
+        subscription = event_broadcaster.subscribe(projects['user_id'], {projects['mine']})
+        try:
+            first = add_activity(42, projects['mine'], 'First')
+            event_broadcaster.poll(now=0)
+            # The id after `first` is allocated to a transaction that commits after the next one.
+            add_activity(42, projects['mine'], 'Committed first', first + 2)
+            assert event_broadcaster.poll(now=1) == 0
+            add_activity(42, projects['mine'], 'Committed last', first + 1)
+            assert event_broadcaster.poll(now=2) == 2
+
+            # A gap that never fills is given up after EVENT_GAP_TIMEOUT.
+            add_activity(42, projects['mine'], 'After a rollback', first + 4)
+            assert event_broadcaster.poll(now=3) == 0
+            assert event_broadcaster.poll(now=3 + event_broadcaster.gap_timeout) == 1
+
+            titles = [subscription.events.get_nowait()['data']['details']['task_title']
+                      for _ in range(subscription.events.qsize())]
+            assert titles == ['First', 'Committed last', 'Committed first', 'After a rollback']
+        finally:
+            event_broadcaster.unsubscribe(subscription)
+
+
+def test_replay_stops_at_the_subscription_cursor(app, projects, monkeypatch):
+    monkeypatch.setattr(event_broadcaster, '_run', lambda: None)
+    with app.app_context():
+        listening = event_broadcaster.subscribe(42, set())
+        seen = add_activity(42, projects['mine'], 'Seen')
+        event_broadcaster.poll()
+        subscription = event_broadcaster.subscribe(projects['user_id'], {projects['mine']})
+        assert subscription.since == seen
+        try:
+            add_activity(42, projects['mine'], 'Missed', seen + 2)
+            add_activity(42, projects['mine'], 'Live', seen + 3)
+            # Whatever follows the cursor is left to the live stream, which waits for `seen + 1`.
+            assert [event['id'] for event in event_broadcaster.replay(subscription, seen)] == []
+            assert event_broadcaster.poll() == 0
+            add_activity(42, projects['mine'], 'Late', seen + 1)
+            assert event_broadcaster.poll() == 3
+            pushed = [subscription.events.get_nowait()['id'] for _ in range(3)]
+            assert pushed == [seen + 1, seen + 2, seen + 3]
+        finally:
+            event_broadcaster.unsubscribe(subscription)
+            event_broadcaster.unsubscribe(listening)
+
+
+def test_stream_requires_a_session(test_client, init_database):
+    assert test_client.get('/api/activities/stream').status_code == 401
+
+
+def test_stream_resumes_from_last_event_id(app, logged_in_client, projects):
+    with app.app_context():
+        seen = add_activity(42, projects['mine'], 'Seen')
+        add_activity(42, projects['other'], 'Not mine')
+        missed = add_activity(42, projects['mine'], 'Missed')
+
+    response = logged_in_client.get('/api/activities/stream', headers={'Last-Event-ID': str(seen)})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    events = read_events(response, 1)
+    assert [event['id'] for event in events] == [missed]
+    assert events[0]['event'] == 'task'
+
+
+def test_stream_pushes_task_changes(app, logged_in_client, projects):
+    response = logged_in_client.get('/api/activities/stream')
+    assert response.status_code == 200
+
+    created = logged_in_client.post('/api/tasks/', data=json.dumps({
+        'title': 'Live', 'project_id': projects['mine']
+    }), content_type='application/json')
+    assert created.status_code == 201
+    task_id = created.json['task']['id']
+    assert logged_in_client.put(f'/api/tasks/update/{task_id}', data=json.dumps({'status': 'DONE'}),
+                                content_type='application/json').status_code == 200
+
+    events = read_events(response, 2)
+    assert [(e['event'], e['data']['action_type']) for e in events] == [
+        ('task', 'create'), ('task', 'update')
+    ]
+    assert all(e['data']['details']['project_id'] == projects['mine'] for e in events)
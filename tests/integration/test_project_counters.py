@@ -0,0 +1,174 @@
+import json
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+
+from app import db
+from app.models import Project, Task, User
+
+
+@pytest.fixture(scope='function')
+def data(app, logged_in_client):
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        launch, relaunch = Project(name='Launch'), Project(name='Relaunch')
+        tasks = [Task(title=f'Task {i}', assignee=user, project=launch, is_completed=i == 0)
+                 for i in range(4)]
+        tasks.append(Task(title='Other', assignee=user, project=relaunch))
+        db.session.add_all(tasks)
+        db.session.commit()
+        ids = {'user': user.id, 'launch': launch.id, 'relaunch': relaunch.id,
+               'tasks': [task.id for task in tasks]}
+    yield ids
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', count)
+
+
+@pytest.fixture
+def aggregate(logged_in_client):
+    config = logged_in_client.application.config
+    config['PROJECT_PROGRESS_SOURCE'] = 'aggregate'
+    yield
+    config['PROJECT_PROGRESS_SOURCE'] = 'counters'
+
+
+def counters(app):
+    """Returns the counters of every project, and what they should be."""
+    with app.app_context():
+        stored = {project.id: (project.total_task_count, project.completed_task_count)
+                  for project in Project.query.all()}
+        counted = dict.fromkeys(stored, (0, 0))
+        counted.update({
+            project_id: (total, completed) for project_id, total, completed in db.session.execute(
+                select(Task.project_id, func.count(Task.id),
+                       func.count(Task.id).filter(Task.is_completed.is_(True)))
+                .where(Task.project_id.isnot(None)).group_by(Task.project_id)
+            )
+        })
+    return stored, counted
+
+
+def test_orm_writes_keep_the_counters(app, logged_in_client, data):
+    stored, counted = counters(app)
+    assert stored == counted
+    assert stored[data['launch']] == (4, 1)
+
+    first, second, third = data['tasks'][:3]
+    with app.app_context():
+        # Completed, reopened, moved to another project and out of any project.
+        db.session.get(Task, second).is_completed = True
+        db.session.get(Task, first).is_completed = False
+        db.session.get(Task, third).project = db.session.get(Project, data['relaunch'])
+        db.session.add(Task(title='New', project_id=data['relaunch'], is_completed=True))
+        db.session.commit()
+        assert counters(app)[0][data['relaunch']] == (3, 1)
+
+        db.session.get(Task, second).project_id = None
+        db.session.delete(db.session.get(Task, data['tasks'][4]))
+        db.session.commit()
+
+    stored, counted = counters(app)
+    assert stored == counted
+    assert stored == {data['launch']: (2, 0), data['relaunch']: (2, 1)}
+
+
+def test_unchanged_tasks_are_not_counted(app, logged_in_client, data, statements):
+    with app.app_context():
+        db.session.get(Task, data['tasks'][0]).title = 'Renamed'
+        statements.clear()
+        db.session.commit()
+    assert not any(statement.startswith('UPDATE projects') for statement in statements)
+    assert counters(app)[0][data['launch']] == (4, 1)
+
+
+def test_loaded_projects_see_new_counts(app, logged_in_client, data):
+    with app.app_context():
+        project = db.session.get(Project, data['launch'])
+        assert project.progress == 25
+        db.session.add(Task(title='New', project=project))
+        db.session.flush()
+        assert project.total_task_count == 5
+        assert project.progress == 20
+        db.session.rollback()
+    assert counters(app)[0][data['launch']] == (4, 1)
+
+
+def test_api_writes_keep_the_counters(app, logged_in_client, data):
+    response = logged_in_client.post('/api/tasks/bulk', data=json.dumps({'tasks': [
+        {'title': 'Bulk 1', 'project_id': data['launch']},
+        {'title': 'Bulk 2', 'project_id': data['launch']},
+        {'title': 'Bulk 3'},
+    ]}), content_type='application/json')
+    assert response.status_code == 200
+    assert counters(app)[0][data['launch']] == (6, 1)
+
+    response = logged_in_client.delete('/api/tasks/bulk',
+                                       data=json.dumps({'ids': data['tasks'][:2]}),
+                                       content_type='application/json')
+    assert response.status_code == 200
+
+    stored, counted = counters(app)
+    assert stored == counted
+    assert stored[data['launch']] == (4, 0)
+    assert logged_in_client.get(f"/api/projects/{data['launch']}").json['progress'] == 0
+
+
+def test_listing_takes_one_query(app, logged_in_client, data, statements):
+    logged_in_client.get('/api/tasks/?limit=1')
+    statements.clear()
+    response = logged_in_client.get('/api/projects')
+    assert response.status_code == 200
+    assert {project['id']: project['progress'] for project in response.json} == {
+        data['launch']: 25, data['relaunch']: 0
+    }
+    few = len(statements)
+
+    with app.app_context():
+        db.session.add_all([
+            Task(title=f'More {i}', assignee_id=data['user'], project=Project(name=f'More {i}'))
+            for i in range(20)
+        ])
+        db.session.commit()
+    statements.clear()
+    response = logged_in_client.get('/api/projects')
+    assert len(response.json) == 22
+    assert len(statements) == few == 1
+
+
+def test_aggregate_progress(app, logged_in_client, data, aggregate, statements):
+    with app.app_context():
+        # Counters gone wrong, e.g. after tasks were written outside the app.
+        db.session.execute(
+            Project.__table__.update().values(total_task_count=0, completed_task_count=0)
+        )
+        db.session.commit()
+
+    logged_in_client.get('/api/tasks/?limit=1')
+    statements.clear()
+    response = logged_in_client.get('/api/projects?fields=progress')
+    # The projects, then one GROUP BY over their tasks.
+    assert len(statements) == 2
+    assert 'GROUP BY tasks.project_id' in statements[1]
+    assert response.json == [
+        {'id': data['launch'], 'progress': 25}, {'id': data['relaunch'], 'progress': 0}
+    ]
+
+    response = logged_in_client.get(f"/api/projects/{data['launch']}")
+    assert response.json['progress'] == 25
+    etag = response.headers['ETag']
+    assert logged_in_client.get(f"/api/projects/{data['launch']}",
+                                headers={'If-None-Match': etag}).status_code == 304
+    with app.app_context():
+        # Counting does not mark the projects changed.
+        assert db.session.get(Project, data['launch']).total_task_count == 0
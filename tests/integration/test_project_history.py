@@ -0,0 +1,193 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from app import db
+from app.maintenance import project_snapshots
+from app.models import Project, ProjectSnapshot, Task, User
+
+
+@pytest.fixture(scope='function')
+def data(app, logged_in_client):
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        project, idle = Project(name='Burndown'), Project(name='Idle')
+        tasks = [
+            Task(title='Design', assignee=user, estimated_time=60),
+            Task(title='Build', assignee=user, estimated_time=120),
+            Task(title='Ship', assignee=user),
+            Task(title='Done', assignee=user, is_completed=True, estimated_time=30),
+        ]
+        project.tasks = tasks
+        idle.tasks = [Task(title='Idle', assignee=user, estimated_time=15)]
+        db.session.add_all([project, idle])
+        db.session.commit()
+        ids = {'project': project.id, 'idle': idle.id, 'user': user.id,
+               'tasks': [task.id for task in tasks]}
+    yield ids
+
+
+def counters(project_id):
+    project = db.session.get(Project, project_id)
+    db.session.refresh(project)
+    return project.total_task_count, project.completed_task_count, project.remaining_estimated_time
+
+
+def snapshots(project_id):
+    return [(row.day, row.open_count, row.completed_count, row.remaining_estimated_time)
+            for row in db.session.scalars(select(ProjectSnapshot).filter_by(project_id=project_id)
+                                          .order_by(ProjectSnapshot.day))]
+
+
+def burndown(client, project_id, **params):
+    query = '&'.join(f'{name}={value}' for name, value in params.items())
+    return client.get(f'/api/projects/{project_id}/burndown' + (f'?{query}' if query else ''))
+
+
+def test_remaining_estimated_time_is_counted(app, logged_in_client, data):
+    with app.app_context():
+        assert counters(data['project']) == (4, 1, 180)
+
+        design = db.session.get(Task, data['tasks'][0])
+        build = db.session.get(Task, data['tasks'][1])
+        design.estimated_time = 90
+        build.is_completed = True
+        db.session.commit()
+        assert counters(data['project']) == (4, 2, 90)
+
+        build.is_completed = False
+        db.session.get(Task, data['tasks'][2]).estimated_time = 10
+        db.session.commit()
+        assert counters(data['project']) == (4, 1, 220)
+
+        # Moving a task takes its estimate along.
+        design.project_id = data['idle']
+        db.session.commit()
+        assert counters(data['project']) == (3, 1, 130)
+        assert counters(data['idle']) == (2, 0, 105)
+
+    logged_in_client.delete('/api/tasks/bulk', data=json.dumps({'ids': data['tasks'][1:2]}),
+                            content_type='application/json')
+    with app.app_context():
+        assert counters(data['project']) == (2, 1, 10)
+
+
+def test_snapshots_only_changed_projects(app, data):
+    # Runs a week ago, on tasks last written before them.
+    now = (datetime.now(timezone.utc) - timedelta(days=7)).replace(hour=22, minute=0)
+    with app.app_context():
+        db.session.execute(update(Task).values(updated_at=now - timedelta(days=1)))
+        db.session.commit()
+
+        assert project_snapshots.take(now=now) == {'projects': 2, 'snapshots': 2}
+        assert snapshots(data['project']) == [(now.date(), 3, 1, 180)]
+
+        # Nothing changed, nothing compared or written, whatever the day.
+        result = project_snapshots.take(now=now + timedelta(days=1))
+        assert result == {'projects': 0, 'snapshots': 0}
+
+        db.session.get(Task, data['tasks'][0]).is_completed = True
+        db.session.commit()
+        result = project_snapshots.take(batch_size=1, now=now + timedelta(days=2))
+        assert result == {'projects': 1, 'snapshots': 1}
+
+        # Running again the same day updates that day's row. A deleted task leaves no row
+        # behind, but the project is still compared.
+        db.session.execute(update(Task).values(updated_at=now + timedelta(days=1)))
+        db.session.delete(db.session.get(Task, data['tasks'][2]))
+        db.session.commit()
+        result = project_snapshots.take(now=now + timedelta(days=2, hours=1))
+        assert result == {'projects': 1, 'snapshots': 1}
+        assert snapshots(data['project']) == [
+            (now.date(), 3, 1, 180), (now.date() + timedelta(days=2), 1, 2, 120)
+        ]
+        assert snapshots(data['idle']) == [(now.date(), 1, 0, 15)]
+
+        # So is the project a task moves out of (the other one has a task written).
+        db.session.get(Task, data['tasks'][1]).project_id = data['idle']
+        db.session.commit()
+        db.session.execute(update(Task).values(updated_at=now + timedelta(days=1)))
+        db.session.commit()
+        result = project_snapshots.take(now=now + timedelta(days=3))
+        assert result == {'projects': 1, 'snapshots': 1}
+        assert snapshots(data['project'])[-1] == (now.date() + timedelta(days=3), 0, 2, 0)
+
+
+def test_snapshot_command(app, data):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['projects', 'snapshot', '--batch-size', '1'])
+    assert result.exit_code == 0
+    assert result.output.strip() == '2 of 2 projects snapshotted'
+    result = runner.invoke(args=['projects', 'snapshot'])
+    assert result.output.strip() == '0 of 2 projects snapshotted'
+
+
+def test_burndown(app, logged_in_client, data):
+    today = datetime.now(timezone.utc).date()
+    with app.app_context():
+        db.session.add_all([
+            ProjectSnapshot(project_id=data['project'], day=today - timedelta(days=days),
+                            open_count=open_count, completed_count=completed,
+                            remaining_estimated_time=remaining,
+                            taken_at=datetime.now(timezone.utc))
+            for days, open_count, completed, remaining in (
+                (10, 6, 0, 400), (5, 5, 1, 300), (3, 4, 2, 240)
+            )
+        ])
+        db.session.commit()
+
+    response = burndown(logged_in_client, data['project'], start=today - timedelta(days=6))
+    assert response.status_code == 200
+    result = response.json
+    assert (result['start'], result['end']) == (
+        (today - timedelta(days=6)).isoformat(), today.isoformat()
+    )
+    # Days without a snapshot carry over the previous one; today is read from the counters.
+    assert [(point['open'], point['completed'], point['remaining_estimated_time'])
+            for point in result['burndown']] == [
+        (6, 0, 400), (5, 1, 300), (5, 1, 300), (4, 2, 240), (4, 2, 240), (4, 2, 240), (3, 1, 180)
+    ]
+    assert [point['completed'] for point in result['velocity']] == [0, 1, 0, 1, 0, 0, -1]
+    assert result['burndown'][0]['date'] == (today - timedelta(days=6)).isoformat()
+
+    # Before the first snapshot there is nothing to show.
+    result = burndown(logged_in_client, data['project'], start=today - timedelta(days=12),
+                      end=today - timedelta(days=9)).json
+    assert [point['open'] for point in result['burndown']] == [None, None, 6, 6]
+    assert [point['completed'] for point in result['velocity']] == [None, None, None, 0]
+
+    # The default range is the last 30 days, ending today.
+    result = burndown(logged_in_client, data['idle']).json
+    assert len(result['burndown']) == 30
+    assert result['burndown'][-1] == {'date': today.isoformat(), 'open': 1, 'completed': 0,
+                                      'remaining_estimated_time': 15}
+    assert result['burndown'][-2]['open'] is None
+
+
+def test_burndown_of_a_bad_range(logged_in_client, data):
+    today = datetime.now(timezone.utc).date()
+    assert burndown(logged_in_client, data['project'], start='yesterday').status_code == 400
+    response = burndown(logged_in_client, data['project'], start=today,
+                        end=today - timedelta(days=1))
+    assert response.status_code == 400
+    response = burndown(logged_in_client, data['project'], start=today - timedelta(days=400))
+    assert response.status_code == 400
+    # An end after today is brought back to today.
+    result = burndown(logged_in_client, data['project'], end=today + timedelta(days=3)).json
+    assert result['end'] == today.isoformat()
+
+
+def test_burndown_of_an_invisible_project(app, logged_in_client, data):
+    with app.app_context():
+        hidden = Project(name='Hidden', tasks=[Task(title='Hidden')])
+        db.session.add(hidden)
+        db.session.commit()
+        hidden_id = hidden.id
+    assert burndown(logged_in_client, hidden_id).status_code == 404
+    assert burndown(logged_in_client, 999).status_code == 404
+
+
+def test_burndown_requires_a_session(test_client, init_database):
+    assert burndown(test_client, 1).status_code == 401
@@ -0,0 +1,155 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import db
+from app.models import Project, Task, User
+
+
+@pytest.fixture(scope='function')
+def data(app, logged_in_client):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        other = User(username='other', email='other@example.com')
+        project, elsewhere = Project(name='Dashboard'), Project(name='Elsewhere')
+        tasks = [
+            # Overdue, due this week, due later and overdue but completed.
+            Task(title='Overdue', status='TODO', priority=1, assignee=user,
+                 due_date=now - timedelta(days=1), estimated_time=60, actual_time=90),
+            Task(title='Soon', status='TODO', priority=2, assignee=user,
+                 due_date=now + timedelta(days=2), estimated_time=30),
+            Task(title='Later', status='IN PROGRESS', priority=1, assignee=other,
+                 due_date=now + timedelta(days=30)),
+            Task(title='Done', status='DONE', priority=1, assignee=other,
+                 due_date=now - timedelta(days=3), is_completed=True, estimated_time=45,
+                 actual_time=40),
+            Task(title='Unassigned', status='TODO'),
+        ]
+        project.tasks = tasks
+        db.session.add_all([project, Task(title='Elsewhere', assignee=user, project=elsewhere),
+                            other])
+        db.session.commit()
+        ids = {'project': project.id, 'elsewhere': elsewhere.id, 'user': user.id, 'other': other.id,
+               'tasks': [task.id for task in tasks]}
+    yield ids
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', count)
+
+
+def summary(client, project_id):
+    return client.get(f'/api/projects/{project_id}/summary')
+
+
+def test_summary(logged_in_client, data):
+    response = summary(logged_in_client, data['project'])
+    assert response.status_code == 200
+    result = response.json
+    totals = ('project_id', 'total', 'completed', 'open', 'overdue', 'due_this_week',
+              'estimated_time', 'actual_time')
+    assert {name: result[name] for name in totals} == {
+        'project_id': data['project'], 'total': 5, 'completed': 1, 'open': 4, 'overdue': 1,
+        'due_this_week': 1, 'estimated_time': 135, 'actual_time': 130
+    }
+    assert result['by_status'] == [{'status': 'TODO', 'count': 3}, {'status': 'DONE', 'count': 1},
+                                   {'status': 'IN PROGRESS', 'count': 1}]
+    assert result['by_priority'] == [{'priority': 1, 'count': 3}, {'priority': 2, 'count': 1},
+                                     {'priority': None, 'count': 1}]
+    assert result['by_assignee'] == [
+        {'assignee_id': data['user'], 'username': 'testuser', 'total': 2, 'completed': 0,
+         'overdue': 1, 'due_this_week': 1, 'estimated_time': 90, 'actual_time': 90},
+        {'assignee_id': data['other'], 'username': 'other', 'total': 2, 'completed': 1,
+         'overdue': 0, 'due_this_week': 0, 'estimated_time': 45, 'actual_time': 40},
+        {'assignee_id': None, 'username': None, 'total': 1, 'completed': 0, 'overdue': 0,
+         'due_this_week': 0, 'estimated_time': 0, 'actual_time': 0},
+    ]
+
+
+def test_summary_is_one_query_then_cached(logged_in_client, data, statements):
+    logged_in_client.get('/api/tasks/?limit=1')
+    statements.clear()
+    first = summary(logged_in_client, data['project'])
+    # The visibility check, then the grouped pass over the tasks.
+    assert len(statements) == 2
+    assert 'GROUP BY tasks.status, tasks.priority, tasks.assignee_id' in statements[1]
+
+    statements.clear()
+    second = summary(logged_in_client, data['project'])
+    assert len(statements) == 1
+    assert second.json == first.json
+
+
+def test_task_writes_evict_the_summary(app, logged_in_client, data):
+    generated_at = summary(logged_in_client, data['project']).json['generated_at']
+
+    response = logged_in_client.put(f"/api/tasks/update/{data['tasks'][0]}", data=json.dumps({
+        'status': 'DONE'
+    }), content_type='application/json')
+    assert response.status_code == 200
+    result = summary(logged_in_client, data['project']).json
+    assert result['generated_at'] != generated_at
+    assert result['by_status'][:2] == [
+        {'status': 'DONE', 'count': 2}, {'status': 'TODO', 'count': 2}
+    ]
+
+    # Moving a task evicts both projects.
+    summary(logged_in_client, data['elsewhere'])
+    with app.app_context():
+        db.session.get(Task, data['tasks'][1]).project = db.session.get(Project, data['elsewhere'])
+        db.session.commit()
+    assert summary(logged_in_client, data['project']).json['total'] == 4
+    assert summary(logged_in_client, data['elsewhere']).json['total'] == 2
+
+    logged_in_client.post('/api/tasks/bulk', data=json.dumps({'tasks': [
+        {'title': 'Bulk', 'project_id': data['project'], 'priority': 3}
+    ]}), content_type='application/json')
+    assert summary(logged_in_client, data['project']).json['total'] == 5
+
+    logged_in_client.patch('/api/tasks/bulk', data=json.dumps({'tasks': [
+        {'id': data['tasks'][2], 'status': 'DONE'}
+    ]}), content_type='application/json')
+    by_status = summary(logged_in_client, data['project']).json['by_status']
+    assert {'status': 'IN PROGRESS', 'count': 1} not in by_status
+
+    logged_in_client.delete('/api/tasks/bulk', data=json.dumps({'ids': data['tasks'][2:4]}),
+                            content_type='application/json')
+    assert summary(logged_in_client, data['project']).json['total'] == 3
+
+
+def test_rolled_back_writes_keep_the_summary(app, logged_in_client, data, statements):
+    summary(logged_in_client, data['project'])
+    with app.app_context():
+        db.session.get(Task, data['tasks'][0]).status = 'DONE'
+        db.session.flush()
+        db.session.rollback()
+    statements.clear()
+    by_status = summary(logged_in_client, data['project']).json['by_status']
+    assert by_status[0] == {'status': 'TODO', 'count': 3}
+    assert len(statements) == 1
+
+
+def test_summary_of_an_invisible_project(app, logged_in_client, data):
+    with app.app_context():
+        hidden = Project(name='Hidden', tasks=[Task(title='Hidden', assignee_id=data['other'])])
+        db.session.add(hidden)
+        db.session.commit()
+        hidden_id = hidden.id
+    assert summary(logged_in_client, hidden_id).status_code == 404
+    assert summary(logged_in_client, 999).status_code == 404
+
+
+def test_summary_requires_a_session(test_client, init_database):
+    assert summary(test_client, 1).status_code == 401
@@ -0,0 +1,139 @@
+"""
+Query plan checks for the statements the API runs.
+
+Every hot route is called against a small data set while the statements it executes are
+recorded, and each statement is then run through `EXPLAIN QUERY PLAN` with the parameters it
+was executed with. A plan step that reads a whole table (`SCAN <table>` with no index) fails
+the test, so a query that loses its index, or a new query that never had one, shows up here
+rather than in production. Ordered index walks (`SCAN ... USING INDEX`) that stop at a LIMIT
+are fine.
+
+SQLite has no table statistics here, so its plans follow the schema and do not depend on how
+few rows the test tables hold.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select, text
+from sqlalchemy.engine import Engine
+
+from app import db
+from app.models import Activities, Comment, Project, Subtask, Tag, Task, User
+
+
+@pytest.fixture(scope='function')
+def data(app, logged_in_client):
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        project = Project(name='Plans', description='Query plans')
+        tag = Tag(name='plan')
+        tasks = [Task(title=f'Plan {i}', description='Explain the plan', status='TODO',
+                      priority=i % 3, due_date=datetime(2026, 3, 1) + timedelta(days=i),
+                      assignee=user, project=project if i % 2 else None)
+                 for i in range(6)]
+        tasks[0].tags = [tag]
+        tasks[0].subtasks = [Subtask(name='Plan step')]
+        tasks[0].comments.append(Comment(content='Planned', created_at=datetime(2026, 3, 1)))
+        db.session.add_all(tasks)
+        db.session.add(Activities(user_id=user.id, action_type='update', target_type='task',
+                                  target_id=1,
+                                  details={'actor': 'testuser', 'task_title': 'Plan 0'}))
+        db.session.commit()
+        ids = {'task': tasks[0].id, 'project': project.id, 'tag': tag.id,
+               'comment': tasks[0].comments[0].id, 'user': user.id}
+    yield ids
+
+
+def requests(data):
+    """The hot routes, as (method, url, body) tuples."""
+    task, project = data['task'], data['project']
+    return [
+        ('get', '/api/user/info', None),
+        ('get', '/api/tasks/', None),
+        ('get', '/api/tasks/?sort=-due_date&limit=2', None),
+        ('get', '/api/tasks/?sort=priority&status=TODO&count=exact', None),
+        ('get', '/api/tasks/?include=tags,subtasks,comments,project,assignee', None),
+        ('get', f'/api/tasks/{task}', None),
+        ('get', f'/api/tasks/{task}?include=tags,subtasks,comments,project,assignee', None),
+        ('put', f'/api/tasks/update/{task}', {'status': 'DONE'}),
+        ('post', '/api/tasks/bulk', {'tasks': [{'title': 'Bulk plan'}]}),
+        ('patch', '/api/tasks/bulk', {'tasks': [{'id': task, 'title': 'Bulk plan 0'}]}),
+        ('get', '/api/projects', None),
+        ('get', f'/api/projects/{project}', None),
+        ('get', f'/api/projects/{project}/summary', None),
+        ('get', f'/api/projects/{project}/burndown', None),
+        ('get', '/api/comments/', None),
+        ('get', f"/api/comments/{data['comment']}", None),
+        ('get', '/api/tags/', None),
+        ('get', f"/api/tags/{data['tag']}", None),
+        ('get', '/api/activities/recent-activities', None),
+        ('get', f"/api/activities/recent-activities?user_id={data['user']}", None),
+        ('get', '/api/activities/recent-activities?action_type=update', None),
+        ('get', '/api/activities/recent-activities?target_type=task&target_id=1', None),
+        ('get', '/api/activities/recent-activities?actor=planuser', None),
+        ('get', '/api/search?q=plan', None),
+        ('delete', '/api/tasks/bulk', {'ids': [task]}),
+    ]
+
+
+@pytest.fixture
+def recorded():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0]
+        statements.append((statement, parameters))
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(Engine, 'before_cursor_execute', record)
+
+
+def full_scans(statement, parameters):
+    """Returns the tables a statement reads in full."""
+    plan = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}',
+                                                   parameters).all()
+    tables = db.metadata.tables
+    return [step[-1] for step in plan
+            if step[-1].startswith('SCAN ') and step[-1].split()[1] in tables
+            and ' USING ' not in step[-1]]
+
+
+def test_hot_routes_do_not_scan_tables(app, logged_in_client, data, recorded):
+    for method, url, body in requests(data):
+        kwargs = ({'data': json.dumps(body), 'content_type': 'application/json'}
+                  if body is not None else {})
+        response = getattr(logged_in_client, method)(url, **kwargs)
+        assert response.status_code < 300, (url, response.status_code, response.data)
+
+    statements = {
+        (statement, tuple(parameters) if isinstance(parameters, (list, tuple)) else parameters)
+        for statement, parameters in recorded
+        if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH'))
+    }
+    assert len(statements) > 40
+
+    with app.app_context():
+        scans = {statement: scan for statement, parameters in statements
+                 if (scan := full_scans(statement, parameters))}
+    assert not scans, json.dumps(scans, indent=2)
+
+
+@pytest.mark.parametrize('statement, index', [
+    # Loading the tasks of a tag, and the subtasks and child tasks of a task.
+    (select(Task.id).join(Task.tags).where(Tag.id == 1), 'ix_task_tags_tag_id'),
+    (select(Subtask.id).where(Subtask.task_id == 1), 'ix_subtasks_task_id'),
+    (select(Task.id).where(Task.parent_task_id == 1), 'ix_tasks_parent_task_id'),
+    # Overdue open tasks of a project: the partial index holds open tasks only.
+    (select(Task.id).where(Task.project_id == 1, Task.is_completed.is_(False),
+                           Task.due_date < datetime(2026, 3, 1)),
+     'ix_tasks_open_project_id_due_date'),
+])
+def test_lookup_indexes(app, init_database, statement, index):
+    with app.app_context():
+        compiled = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = ' '.join(row[-1]
+                        for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}')))
+    assert index in plan, plan
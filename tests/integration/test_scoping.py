@@ -0,0 +1,223 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, text
+
+from app import db
+from app.models import Comment, Project, Tag, Task, User
+from app.scoping import comment_scope, project_scope, tag_scope, task_scope
+from tests.conftest import register
+
+
+@pytest.fixture
+def user_name():
+    return 'alice'
+
+
+@pytest.fixture(scope='function')
+def data(app, logged_in_client):
+    """
+    Alice has a task of her own and one in 'shared', where Bob also has a task. Bob's task in
+    'private' and the unassigned task are not hers to see.
+    """
+    register(logged_in_client, 'bob')
+    with app.app_context():
+        alice = User.query.filter_by(email='alice@example.com').one()
+        bob = User.query.filter_by(email='bob@example.com').one()
+        shared, private = Project(name='shared'), Project(name='private')
+        db.session.add_all([shared, private])
+        db.session.flush()
+
+        tasks = {
+            'own': Task(title='own', assignee_id=alice.id, status='TODO'),
+            'shared_alice': Task(title='shared_alice', assignee_id=alice.id, project_id=shared.id,
+                                 status='DONE'),
+            'shared_bob': Task(title='shared_bob', assignee_id=bob.id, project_id=shared.id,
+                               status='TODO'),
+            'private_bob': Task(title='private_bob', assignee_id=bob.id, project_id=private.id,
+                                status='TODO'),
+            'unassigned': Task(title='unassigned', status='TODO'),
+        }
+        db.session.add_all(tasks.values())
+        db.session.flush()
+
+        visible_tag, hidden_tag = Tag(name='visible'), Tag(name='hidden')
+        tasks['shared_bob'].tags = [visible_tag]
+        tasks['private_bob'].tags = [hidden_tag]
+        comments = {name: Comment(content=name, task=task, created_at=datetime(2026, 3, 1))
+                    for name, task in tasks.items()}
+        db.session.add_all(comments.values())
+        db.session.commit()
+
+        ids = {
+            'alice': alice.id,
+            'tasks': {name: task.id for name, task in tasks.items()},
+            'comments': {name: comment.id for name, comment in comments.items()},
+            'projects': {'shared': shared.id, 'private': private.id},
+            'tags': {'visible': visible_tag.id, 'hidden': hidden_tag.id},
+        }
+    yield ids
+
+
+def test_lists_are_scoped_to_the_current_user(logged_in_client, data):
+    tasks = logged_in_client.get('/api/tasks/').json['tasks']
+    assert sorted(task['title'] for task in tasks) == ['own', 'shared_alice', 'shared_bob']
+
+    comments = logged_in_client.get('/api/comments/').json
+    assert sorted(comment['content'] for comment in comments) == [
+        'own', 'shared_alice', 'shared_bob'
+    ]
+
+    assert [tag['name'] for tag in logged_in_client.get('/api/tags/').json] == ['visible']
+    assert [project['name'] for project in logged_in_client.get('/api/projects').json] == ['shared']
+
+
+def test_task_list_filters_by_status(logged_in_client, data):
+    tasks = logged_in_client.get('/api/tasks/?status=TODO').json['tasks']
+    assert sorted(task['title'] for task in tasks) == ['own', 'shared_bob']
+
+
+def test_reads_outside_the_scope_are_not_found(logged_in_client, data):
+    assert logged_in_client.get(f"/api/projects/{data['projects']['shared']}").status_code == 200
+    assert logged_in_client.get(f"/api/projects/{data['projects']['private']}").status_code == 404
+
+    comments = data['comments']
+    assert logged_in_client.get(f"/api/comments/{comments['shared_bob']}").status_code == 200
+    assert logged_in_client.get(f"/api/comments/{comments['private_bob']}").status_code == 404
+    assert logged_in_client.get(f"/api/comments/{comments['unassigned']}").status_code == 404
+
+    assert logged_in_client.get(f"/api/tags/{data['tags']['visible']}").status_code == 200
+    assert logged_in_client.get(f"/api/tags/{data['tags']['hidden']}").status_code == 404
+
+
+def test_writes_outside_the_scope_are_not_found(app, logged_in_client, data):
+    hidden = data['tasks']['private_bob']
+    response = logged_in_client.put(f'/api/tasks/update/{hidden}', data=json.dumps({
+        'title': 'taken'
+    }), content_type='application/json', headers={'If-Match': '"0"'})
+    # Not found before the precondition is checked, and without the task's ETag.
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+    assert logged_in_client.delete(f'/api/tasks/delete/{hidden}').status_code == 404
+    with app.app_context():
+        task = db.session.get(Task, hidden)
+        assert task is not None and task.title == 'private_bob'
+
+    shared = data['tasks']['shared_bob']
+    response = logged_in_client.put(f'/api/tasks/update/{shared}', data=json.dumps({
+        'title': 'renamed'
+    }), content_type='application/json')
+    assert response.status_code == 200
+    with app.app_context():
+        bob = User.query.filter_by(email='bob@example.com').one()
+        task = Task(title='shared_new', assignee=bob, project_id=data['projects']['shared'])
+        db.session.add(task)
+        db.session.commit()
+        task_id = task.id
+    assert logged_in_client.delete(f'/api/tasks/delete/{task_id}').status_code == 204
+
+
+def create_empty_project(app, client):
+    created = client.post('/api/projects', data=json.dumps({
+        'name': 'empty', 'description': 'No tasks yet'
+    }), content_type='application/json')
+    assert created.status_code == 201
+    with app.app_context():
+        return Project.query.filter_by(name='empty').one().id
+
+
+def test_creators_see_their_own_projects(app, logged_in_client, data):
+    project_id = create_empty_project(app, logged_in_client)
+
+    projects = logged_in_client.get('/api/projects').json
+    assert sorted(project['name'] for project in projects) == ['empty', 'shared']
+    assert logged_in_client.get(f'/api/projects/{project_id}').status_code == 200
+
+
+def test_task_actions_outside_the_scope_are_not_found(app, test_client, logged_in_client, data):
+    actions = {
+        'tags': {'tag_ids': [data['tags']['visible']]},
+        'assign': {'project_id': data['projects']['shared']},
+        'comment': {'content': 'taken'},
+        'assign_user': {'user_id': data['alice']},
+    }
+    hidden, shared = data['tasks']['private_bob'], data['tasks']['shared_bob']
+    for action, body in actions.items():
+        response = logged_in_client.post(f'/api/tasks/{hidden}/{action}', data=json.dumps(body),
+                                         content_type='application/json')
+        assert response.status_code == 404, action
+
+    # Nor do tasks move into projects the user cannot see.
+    response = logged_in_client.post(f'/api/tasks/{shared}/assign', data=json.dumps({
+        'project_id': data['projects']['private']
+    }), content_type='application/json')
+    assert response.status_code == 404
+
+    for action, body in actions.items():
+        response = logged_in_client.post(f'/api/tasks/{shared}/{action}', data=json.dumps(body),
+                                         content_type='application/json')
+        assert response.status_code in (200, 201), action
+    with app.app_context():
+        task = db.session.get(Task, shared)
+        assert task.assignee_id == data['alice']
+        assert [tag.name for tag in task.tags] == ['visible']
+        assert db.session.get(Task, hidden).comments[0].content == 'private_bob'
+
+    logged_in_client.delete_cookie('session_id')
+    for action, body in actions.items():
+        response = test_client.post(f'/api/tasks/{shared}/{action}', data=json.dumps(body),
+                                    content_type='application/json')
+        assert response.status_code == 401, action
+
+
+def test_lists_require_a_session(test_client, init_database):
+    for url in ['/api/tasks/', '/api/comments/', '/api/tags/', '/api/projects']:
+        assert test_client.get(url).status_code == 401
+
+
+def test_created_task_is_assigned_to_its_creator(logged_in_client, data):
+    created = logged_in_client.post('/api/tasks/', data=json.dumps({'title': 'new'}),
+                                    content_type='application/json')
+    assert created.status_code == 201
+    titles = [task['title'] for task in logged_in_client.get('/api/tasks/').json['tasks']]
+    assert 'new' in titles
+
+
+def query_plan(query):
+    compiled = query.compile(db.engine, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))]
+
+
+@pytest.mark.parametrize('model, scope, index', [
+    (Task, task_scope, 'ix_tasks_assignee_id'),
+    (Comment, comment_scope, 'ix_comments_task_id'),
+    (Project, project_scope, 'ix_tasks_assignee_id'),
+    (Tag, tag_scope, 'ix_tasks_assignee_id'),
+])
+def test_scoped_queries_use_indexes(app, data, model, scope, index):
+    with app.app_context():
+        plan = query_plan(select(model).where(scope(data['alice'])))
+    assert any(index in step for step in plan), plan
+    # No full scan of tasks or comments: the cost follows the user's own rows.
+    assert not any(step.startswith(('SCAN tasks', 'SCAN comments')) for step in plan), plan
+
+
+def test_task_scope_searches_assignee_and_project_indexes(app, data):
+    with app.app_context():
+        plan = ' '.join(query_plan(select(Task).where(task_scope(data['alice']))))
+    assert 'ix_tasks_assignee_id' in plan
+    assert 'ix_tasks_project_id' in plan
+
+
+def test_project_scope_searches_creator_and_assignee_indexes(app, data):
+    with app.app_context():
+        plan = ' '.join(query_plan(select(Project).where(project_scope(data['alice']))))
+    assert 'ix_projects_created_by' in plan
+    assert 'ix_tasks_assignee_id' in plan
+
+
+def test_status_filter_can_use_status_index(app, data):
+    with app.app_context():
+        plan = ' '.join(query_plan(select(Task.id).where(Task.status == 'TODO')))
+    assert 'ix_tasks_status' in plan
@@ -0,0 +1,154 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete
+
+from app import db
+from app.models import Comment, Project, SearchDocument, Tag, Task, User
+
+
+@pytest.fixture(scope='function')
+def data(app, logged_in_client):
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        other = User(username='other', email='other@example.com')
+        project = Project(name='Website relaunch',
+                          description='Move the invoices page to the new design')
+        title_match = Task(title='Send invoices', description='Before Friday', assignee=user,
+                           project=project)
+        body_match = Task(title='Accounting', description='Check the invoices twice', assignee=user)
+        hidden = Task(title='Secret invoices', assignee=other)
+        title_match.tags = [Tag(name='invoices')]
+        title_match.comments.append(Comment(content='The invoices are late',
+                                            created_at=datetime(2026, 3, 1)))
+        hidden.comments.append(Comment(content='Hidden invoices', created_at=datetime(2026, 3, 1)))
+        db.session.add_all([other, title_match, body_match, hidden])
+        db.session.commit()
+        ids = {'title_match': title_match.id, 'body_match': body_match.id, 'hidden': hidden.id,
+               'project': project.id, 'tag': title_match.tags[0].id,
+               'comment': title_match.comments[0].id}
+    yield ids
+
+
+def search(client, **args):
+    return client.get('/api/search', query_string=args)
+
+
+def found(response):
+    return [(result['type'], result['id']) for result in response.json['results']]
+
+
+def test_search_ranks_and_highlights_visible_documents(logged_in_client, data):
+    response = search(logged_in_client, q='invoices')
+    assert response.status_code == 200
+    results = found(response)
+    assert sorted(results) == sorted([
+        ('task', data['title_match']), ('task', data['body_match']), ('project', data['project']),
+        ('tag', data['tag']), ('comment', data['comment'])
+    ])
+    # Matches in the title rank above matches in the body.
+    title_rank = results.index(('task', data['title_match']))
+    assert title_rank < results.index(('task', data['body_match']))
+
+    by_id = {(result['type'], result['id']): result for result in response.json['results']}
+    assert by_id[('task', data['title_match'])]['title'] == 'Send <mark>invoices</mark>'
+    assert by_id[('task', data['body_match'])]['snippet'] == 'Check the <mark>invoices</mark> twice'
+    assert by_id[('comment', data['comment'])]['title'] is None
+
+
+def test_every_word_must_match(logged_in_client, data):
+    assert found(search(logged_in_client, q='check invoice')) == [('task', data['body_match'])]
+    assert found(search(logged_in_client, q='"invoices (late*')) == [('comment', data['comment'])]
+    assert found(search(logged_in_client, q='invoices', types='project,tag')) in (
+        [('project', data['project']), ('tag', data['tag'])],
+        [('tag', data['tag']), ('project', data['project'])]
+    )
+
+
+def test_highlights_are_escaped(app, logged_in_client, data):
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        task = Task(title='<script>alert("invoices")</script>', assignee=user,
+                    description='Pay <b>invoices</b> & <img src=x onerror=alert(1)>')
+        db.session.add(task)
+        db.session.commit()
+        task_id = task.id
+
+    result = next(result for result in search(logged_in_client, q='invoices').json['results']
+                  if result['id'] == task_id)
+    assert result['title'] == (
+        '&lt;script&gt;alert(&quot;<mark>invoices</mark>&quot;)&lt;/script&gt;'
+    )
+    assert result['snippet'] == (
+        'Pay &lt;b&gt;<mark>invoices</mark>&lt;/b&gt; &amp; &lt;img src=x onerror=alert(1)&gt;'
+    )
+
+
+def test_writes_update_the_index(logged_in_client, data):
+    response = logged_in_client.put(f"/api/tasks/update/{data['title_match']}", data=json.dumps({
+        'title': 'Send receipts'
+    }), content_type='application/json')
+    assert response.status_code == 200
+    assert ('task', data['title_match']) not in found(search(logged_in_client, q='send invoices'))
+    assert found(search(logged_in_client, q='receipts')) == [('task', data['title_match'])]
+
+    created = logged_in_client.post('/api/tasks/bulk', data=json.dumps({'tasks': [
+        {'title': 'Archive receipts'}
+    ]}), content_type='application/json').json['results'][0]['id']
+    assert ('task', created) in found(search(logged_in_client, q='receipts'))
+
+    logged_in_client.patch('/api/tasks/bulk', data=json.dumps({'tasks': [
+        {'id': created, 'description': 'Shred them'}
+    ]}), content_type='application/json')
+    assert found(search(logged_in_client, q='shred')) == [('task', created)]
+
+    logged_in_client.delete('/api/tasks/bulk', data=json.dumps({'ids': [data['title_match']]}),
+                            content_type='application/json')
+    assert found(search(logged_in_client, q='late')) == []
+    assert found(search(logged_in_client, q='receipts')) == [('task', created)]
+
+
+def test_results_are_paginated(app, logged_in_client, data):
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        db.session.add_all([Task(title=f'Budget {i}', assignee=user) for i in range(5)])
+        db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        args = {'q': 'budget', 'limit': 2}
+        if cursor:
+            args['cursor'] = cursor
+        response = search(logged_in_client, **args)
+        assert len(response.json['results']) <= 2
+        seen += found(response)
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 5
+
+    first = search(logged_in_client, q='budget', limit=2)
+    response = search(logged_in_client, q='invoices', cursor=first.headers['X-Next-Cursor'])
+    assert response.status_code == 400
+
+
+def test_rebuild(app, logged_in_client, data):
+    with app.app_context():
+        db.session.execute(delete(SearchDocument))
+        db.session.commit()
+    assert found(search(logged_in_client, q='invoices')) == []
+
+    result = app.test_cli_runner().invoke(args=['search', 'rebuild', '--batch-size', '2'])
+    assert result.exit_code == 0
+    assert 'task: 3 documents indexed' in result.output
+    assert len(found(search(logged_in_client, q='invoices'))) == 5
+
+
+@pytest.mark.parametrize('args', [{'q': ''}, {'q': '!!'}, {'q': 'invoices', 'types': 'user'}, {}])
+def test_invalid_searches_are_rejected(logged_in_client, data, args):
+    assert search(logged_in_client, **args).status_code == 400
+
+
+def test_search_requires_a_session(test_client, init_database):
+    assert search(test_client, q='invoices').status_code == 401
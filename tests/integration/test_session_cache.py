@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.session import session_cache
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', count)
+
+
+def test_cached_session_authenticates_without_queries(logged_in_client, statements):
+    first = logged_in_client.get('/api/user/check-auth')
+    assert first.status_code == 200
+    assert statements
+
+    statements.clear()
+    second = logged_in_client.get('/api/user/check-auth')
+    assert second.status_code == 200
+    assert second.get_json()['email'] == 'test@example.com'
+    assert statements == []
+    assert session_cache.stats()['hits'] >= 1
+
+
+def test_logout_evicts_cached_session(logged_in_client):
+    assert logged_in_client.get('/api/user/check-auth').status_code == 200
+    assert len(session_cache) == 1
+
+    response = logged_in_client.post('/api/user/logout', data=json.dumps({}),
+                                     content_type='application/json')
+    assert response.status_code == 200
+    assert len(session_cache) == 0
+    assert logged_in_client.get('/api/user/check-auth').status_code == 401
+
+
+def test_user_update_evicts_cached_session(logged_in_client):
+    assert logged_in_client.get('/api/user/check-auth').status_code == 200
+
+    response = logged_in_client.post('/api/user/ui-preferences',
+                                     data=json.dumps({'viewMode': 'board'}),
+                                     content_type='application/json')
+    assert response.status_code == 200
+    assert len(session_cache) == 0
+
+    response = logged_in_client.get('/api/user/ui-preferences')
+    assert response.get_json()['viewMode'] == 'board'
+
+
+def test_uncached_session_resolves_in_one_statement(logged_in_client, statements, monkeypatch):
+    monkeypatch.setattr(session_cache._cache, 'ttl', 0)
+
+    response = logged_in_client.get('/api/user/check-auth')
+    assert response.status_code == 200
+    assert response.get_json()['email'] == 'test@example.com'
+    assert len(statements) == 1
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import db
+from app.maintenance import session_reaper
+from app.models import RefreshToken, Session, User
+from app.session import SessionManager
+
+
+@pytest.fixture
+def sessions(app, init_database):
+    now = datetime.now(timezone.utc)
+    with app.app_context():
+        users = [User(username=f'user{i}', email=f'user{i}@example.com') for i in range(2)]
+        db.session.add_all(users)
+        db.session.flush()
+
+        for i in range(5):
+            db.session.add(Session(user_id=users[0].id, session_id=f'expired-{i}',
+                                   expires_at=now - timedelta(hours=2)))
+        for i in range(3):
+            db.session.add(Session(user_id=users[1].id, session_id=f'active-{i}',
+                                   expires_at=now + timedelta(hours=1)))
+        db.session.add(RefreshToken(user_id=users[0].id, token='old', session_id='old',
+                                    expires_at=now - timedelta(days=1)))
+        db.session.add(RefreshToken(user_id=users[1].id, token='new', session_id='new',
+                                    expires_at=now + timedelta(days=1)))
+        db.session.commit()
+        yield [user.id for user in users]
+
+
+def test_reap_deletes_expired_rows_in_batches(app, sessions):
+    with app.app_context():
+        reclaimed = session_reaper.reap(batch_size=2)
+
+        assert reclaimed == {'sessions': 5, 'refresh_tokens': 1, 'revoked_sessions': 0}
+        assert Session.query.count() == 3
+        assert RefreshToken.query.count() == 1
+
+
+def test_reap_command_reports_reclaimed_rows(app, sessions):
+    result = app.test_cli_runner().invoke(args=['sessions', 'reap'])
+
+    assert result.exit_code == 0
+    assert 'sessions: 5 rows reclaimed' in result.output
+
+
+def test_revoke_all_sessions_of_a_user(app, sessions):
+    with app.app_context():
+        removed = SessionManager.invalidate_user_sessions(sessions[1])
+
+        assert removed == {'sessions': 3, 'refresh_tokens': 1}
+        assert Session.query.filter_by(user_id=sessions[1]).count() == 0
+        assert Session.query.count() == 5
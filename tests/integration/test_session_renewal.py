@@ -0,0 +1,48 @@
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.session import session_renewer
+
+
+@pytest.fixture
+def updates():
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('UPDATE SESSIONS'):
+            executed.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def write_behind():
+    session_renewer.mode = session_renewer.WRITE_BEHIND
+    yield session_renewer
+    session_renewer.mode = session_renewer.THRESHOLD
+
+
+def test_fresh_session_is_not_rewritten(logged_in_client, updates):
+    for _ in range(3):
+        assert logged_in_client.get('/api/user/check-auth').status_code == 200
+    assert updates == []
+
+
+def test_session_is_rewritten_below_threshold(logged_in_client, updates, monkeypatch):
+    monkeypatch.setattr(session_renewer, 'threshold', 1.01)
+    assert logged_in_client.get('/api/user/check-auth').status_code == 200
+    assert len(updates) == 1
+
+
+def test_write_behind_flushes_in_one_statement(app, logged_in_client, updates, write_behind):
+    for _ in range(3):
+        assert logged_in_client.get('/api/user/check-auth').status_code == 200
+    assert updates == []
+
+    with app.app_context():
+        assert write_behind.flush() == 1
+    assert len(updates) == 1
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import db
+from app.models import Project, Task, User
+
+
+@pytest.fixture(scope='function')
+def data(app, logged_in_client):
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        project = Project(name='Launch', description='A long description')
+        for i in range(4):
+            db.session.add(Task(title=f'Task {i}', description='x' * 1000, status='TODO',
+                                assignee=user, project=project, is_completed=i == 0,
+                                due_date=datetime(2026, 3, 1) + timedelta(days=i)))
+        db.session.commit()
+        ids = {'project': project.id, 'task': Task.query.order_by(Task.id).first().id}
+    yield ids
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', count)
+
+
+def test_task_list_selects_and_returns_only_the_requested_fields(
+        logged_in_client, data, statements):
+    logged_in_client.get('/api/tasks/?limit=1')
+    statements.clear()
+
+    response = logged_in_client.get('/api/tasks/?fields=title,status')
+    assert response.status_code == 200
+    assert [set(task) for task in response.json['tasks']] == [{'id', 'title', 'status'}] * 4
+    assert len(statements) == 1
+    assert 'tasks.title' in statements[0]
+    assert 'tasks.description' not in statements[0]
+
+
+def test_task_pages_follow_the_sort_key_it_does_not_return(logged_in_client, data, statements):
+    logged_in_client.get('/api/tasks/?limit=1')
+    statements.clear()
+
+    first = logged_in_client.get('/api/tasks/?fields=title&sort=-due_date&limit=2')
+    second = logged_in_client.get('/api/tasks/?fields=title&sort=-due_date&limit=2'
+                                  f"&cursor={first.headers['X-Next-Cursor']}")
+    titles = [task['title'] for task in first.json['tasks'] + second.json['tasks']]
+    assert titles == ['Task 3', 'Task 2', 'Task 1', 'Task 0']
+    assert 'due_date' not in first.json['tasks'][0]
+    # The due date used for the cursor is selected with the page, not lazily loaded.
+    assert len(statements) == 2
+
+
+def test_fields_combine_with_includes(logged_in_client, data):
+    response = logged_in_client.get(f"/api/tasks/{data['task']}?fields=title&include=project")
+    assert response.status_code == 200
+    assert response.json['task'] == {'id': data['task'], 'title': 'Task 0', 'project': {
+        'id': data['project'], 'name': 'Launch', 'status': 'NOT STARTED', 'deadline': None
+    }}
+
+
+def test_project_fields(logged_in_client, data, statements):
+    logged_in_client.get('/api/tasks/?limit=1')
+    statements.clear()
+
+    response = logged_in_client.get('/api/projects?fields=name,progress')
+    assert response.status_code == 200
+    assert response.json == [{'id': data['project'], 'name': 'Launch', 'progress': 25}]
+    # The projects with their task counters, and nothing from the tasks.
+    assert len(statements) == 1
+    assert 'projects.description' not in statements[0]
+    assert 'projects.total_task_count' in statements[0]
+
+    response = logged_in_client.get(f"/api/projects/{data['project']}?fields=status")
+    assert response.json == {'id': data['project'], 'status': 'NOT STARTED'}
+
+
+def test_user_fields(logged_in_client, data):
+    response = logged_in_client.get('/api/user/info?fields=first_name,last_name')
+    assert response.status_code == 200
+    assert set(response.json) == {'id', 'first_name', 'last_name'}
+
+    assert set(logged_in_client.get('/api/user/info').json) == {
+        'id', 'first_name', 'last_name', 'email', 'username'
+    }
+
+
+@pytest.mark.parametrize('url', [
+    '/api/tasks/?fields=title,secret',
+    '/api/tasks/{task}?fields=password_hash',
+    '/api/projects?fields=owner',
+    '/api/projects/{project}?fields=tasks',
+    '/api/user/info?fields=password_hash',
+])
+def test_unknown_fields_are_rejected(logged_in_client, data, url):
+    response = logged_in_client.get(url.format(**data))
+    assert response.status_code == 400
+    assert 'Unknown fields' in response.json['message']
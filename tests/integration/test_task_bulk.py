@@ -0,0 +1,158 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import db
+from app.activity_sink import activity_sink
+from app.models import Activities, Comment, Tag, Task, User
+
+
+@pytest.fixture
+def transactions():
+    executed = {'statements': [], 'commits': 0}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed['statements'].append(statement)
+
+    def count_commit(conn):
+        executed['commits'] += 1
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    event.listen(Engine, 'commit', count_commit)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', record)
+    event.remove(Engine, 'commit', count_commit)
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    monkeypatch.setattr(activity_sink, 'mode', activity_sink.OUTBOX)
+    yield activity_sink
+
+
+def writes(statements):
+    return [s.split()[2] for s in statements
+            if s.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+
+def send(client, method, body):
+    return getattr(client, method)('/api/tasks/bulk', data=json.dumps(body),
+                                   content_type='application/json')
+
+
+@pytest.fixture
+def tasks(app, logged_in_client):
+    """Three tasks of the logged in user and one of another user."""
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        other = User(username='other', email='other@example.com')
+        db.session.add(other)
+        mine = [Task(title=f'Mine {i}', assignee=user) for i in range(3)]
+        theirs = Task(title='Theirs', assignee=other)
+        db.session.add_all(mine + [theirs])
+        db.session.commit()
+        ids = {'mine': [task.id for task in mine], 'theirs': theirs.id}
+    yield ids
+
+
+def test_bulk_create_in_one_transaction(app, logged_in_client, transactions, outbox):
+    response = send(logged_in_client, 'post', {'tasks': [
+        {'title': 'First', 'priority': 2, 'due_date': '2026-03-01T09:00:00'},
+        {'description': 'No title'},
+        {'title': 'Second', 'status': 'TODO'},
+        {'title': 'Bad date', 'due_date': 'tomorrow'},
+        {'title': 'Third', 'owner': 'someone'},
+    ]})
+    assert response.status_code == 200
+    results = response.json['results']
+    assert [result['status'] for result in results] == [201, 400, 201, 400, 400]
+    assert results[1]['error'] == 'Title is required'
+    assert results[3]['error'] == 'Invalid value for due_date'
+    assert 'owner' in results[4]['error']
+
+    # One multi-row INSERT each for the tasks, their search documents and their activities,
+    # committed together.
+    assert writes(transactions['statements']) == ['tasks', 'search_documents', 'activities']
+    assert transactions['commits'] == 1
+
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        first = db.session.get(Task, results[0]['id'])
+        assert (first.title, first.priority, first.due_date) == (
+            'First', 2, datetime(2026, 3, 1, 9)
+        )
+        assert first.assignee_id == user.id
+        assert db.session.get(Task, results[2]['id']).title == 'Second'
+        activities = Activities.query.order_by(Activities.id).all()
+        assert [(a.action_type, a.target_id) for a in activities] == [
+            ('create', results[0]['id']), ('create', results[2]['id'])
+        ]
+        assert activities[1].details_json['task_title'] == 'Second'
+
+
+def test_bulk_update(app, logged_in_client, tasks, transactions):
+    first, second, third = tasks['mine']
+    response = send(logged_in_client, 'patch', {'tasks': [
+        {'id': first, 'status': 'DONE'},
+        {'id': second, 'title': 'Renamed', 'priority': 1},
+        {'id': tasks['theirs'], 'status': 'DONE'},
+        {'id': 999999, 'status': 'DONE'},
+        {'id': first, 'status': 'TODO'},
+        {'id': third, 'title': ''},
+        {'status': 'DONE'},
+    ]})
+    assert response.status_code == 200
+    assert [result['status'] for result in response.json['results']] == [
+        200, 200, 404, 404, 400, 400, 400
+    ]
+    assert len([s for s in writes(transactions['statements']) if s == 'tasks']) <= 2
+
+    with app.app_context():
+        assert db.session.get(Task, first).status == 'DONE'
+        renamed = db.session.get(Task, second)
+        assert (renamed.title, renamed.priority) == ('Renamed', 1)
+        assert db.session.get(Task, third).title == 'Mine 2'
+        assert db.session.get(Task, tasks['theirs']).status is None
+        activities = (Activities.query.filter_by(action_type='update')
+                      .order_by(Activities.target_id).all())
+        assert [a.target_id for a in activities] == [first, second]
+        assert activities[1].details_json['task_title'] == 'Renamed'
+
+
+def test_bulk_delete(app, logged_in_client, tasks):
+    first, second, _ = tasks['mine']
+    with app.app_context():
+        task = db.session.get(Task, first)
+        task.tags = [Tag(name='doomed')]
+        task.comments.append(Comment(content='Bye', created_at=datetime(2026, 3, 1)))
+        db.session.commit()
+
+    response = send(logged_in_client, 'delete',
+                    {'ids': [first, second, tasks['theirs'], first, 'x']})
+    assert response.status_code == 200
+    assert [result['status'] for result in response.json['results']] == [204, 204, 404, 400, 400]
+
+    with app.app_context():
+        assert db.session.get(Task, first) is None
+        assert db.session.get(Task, second) is None
+        assert db.session.get(Task, tasks['theirs']) is not None
+        assert Comment.query.count() == 0
+        assert Tag.query.one().tasks == []
+        assert Activities.query.filter_by(action_type='delete').count() == 2
+
+
+def test_bulk_requests_are_limited(logged_in_client, monkeypatch):
+    monkeypatch.setitem(logged_in_client.application.config, 'TASK_BULK_LIMIT', 2)
+    response = send(logged_in_client, 'post', {'tasks': [{'title': str(i)} for i in range(3)]})
+    assert response.status_code == 400
+    assert 'At most 2' in response.json['message']
+
+    assert send(logged_in_client, 'post', {'tasks': []}).status_code == 400
+    assert send(logged_in_client, 'delete', {'ids': 'all'}).status_code == 400
+
+
+def test_bulk_requires_a_session(test_client, init_database):
+    assert send(test_client, 'post', {'tasks': [{'title': 'Anonymous'}]}).status_code == 401
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import db
+from app.models import Comment, Project, Subtask, Tag, Task, User
+
+ALL = 'tags,subtasks,comments,project,assignee'
+
+
+@pytest.fixture(scope='function')
+def tasks(app, logged_in_client):
+    """500 tasks across 5 projects, each with two tags, a subtask and a comment."""
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        projects = [Project(name=f'Project {i}') for i in range(5)]
+        tags = [Tag(name=f'tag-{i}') for i in range(10)]
+        for i in range(500):
+            task = Task(title=f'Task {i}', assignee=user, project=projects[i % 5],
+                        tags=[tags[i % 10], tags[(i + 1) % 10]])
+            task.subtasks.append(Subtask(name=f'Subtask {i}'))
+            task.comments.append(Comment(content=f'Comment {i}', created_at=datetime(2026, 3, 1)))
+            db.session.add(task)
+        db.session.commit()
+        first = Task.query.order_by(Task.id).first().id
+    yield first
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', count)
+
+
+def test_page_of_500_with_all_includes_takes_fixed_number_of_queries(logged_in_client, tasks,
+                                                                     statements):
+    # Warm the session cache so only the task queries are counted.
+    logged_in_client.get('/api/tasks/?limit=1')
+
+    statements.clear()
+    response = logged_in_client.get(f'/api/tasks/?limit=500&include={ALL}')
+    assert response.status_code == 200
+    assert len(response.json['tasks']) == 500
+    # The page with project and assignee joined in, then one query each for tags, subtasks
+    # and comments.
+    assert len(statements) == 4, statements
+
+    statements.clear()
+    assert logged_in_client.get(f'/api/tasks/?limit=50&include={ALL}').status_code == 200
+    assert len(statements) == 4, statements
+
+
+def test_included_relations_are_embedded(logged_in_client, tasks):
+    task = logged_in_client.get(f'/api/tasks/?limit=1&include={ALL}').json['tasks'][0]
+    assert task['id'] == tasks
+    assert [tag['name'] for tag in task['tags']] == ['tag-0', 'tag-1']
+    assert [subtask['name'] for subtask in task['subtasks']] == ['Subtask 0']
+    assert [comment['content'] for comment in task['comments']] == ['Comment 0']
+    assert task['project']['name'] == 'Project 0'
+    assert task['assignee']['username'] == 'testuser'
+    assert 'password_hash' not in task['assignee']
+
+
+def test_relations_are_left_out_unless_included(logged_in_client, tasks):
+    task = logged_in_client.get('/api/tasks/?limit=1&include=project').json['tasks'][0]
+    assert task['project']['name'] == 'Project 0'
+    assert not {'tags', 'subtasks', 'comments', 'assignee'} & set(task)
+
+    task = logged_in_client.get('/api/tasks/?limit=1').json['tasks'][0]
+    assert not set(ALL.split(',')) & set(task)
+
+
+def test_task_detail_with_includes(logged_in_client, tasks):
+    response = logged_in_client.get(f'/api/tasks/{tasks}?include=tags,comments')
+    assert response.status_code == 200
+    assert [tag['name'] for tag in response.json['task']['tags']] == ['tag-0', 'tag-1']
+    assert 'project' not in response.json['task']
+
+    assert logged_in_client.get('/api/tasks/999999').status_code == 404
+
+
+def test_unknown_include_is_rejected(logged_in_client, tasks):
+    response = logged_in_client.get('/api/tasks/?include=tags,owner')
+    assert response.status_code == 400
+    assert 'owner' in response.json['message']
+    assert logged_in_client.get(f'/api/tasks/{tasks}?include=owner').status_code == 400
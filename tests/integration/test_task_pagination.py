@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+
+from app import db
+from app.models import Task, User
+from app.utils.cursor import encode_cursor
+from app.utils.pagination import keyset_after
+
+
+@pytest.fixture(scope='function')
+def tasks(app, logged_in_client):
+    start = datetime(2026, 3, 1)
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        for i in range(23):
+            db.session.add(Task(
+                title=f'Task {i}',
+                assignee_id=user.id,
+                # Every fourth task has no due date, and due dates and priorities repeat.
+                due_date=None if i % 4 == 0 else start + timedelta(days=i % 5),
+                priority=i % 3,
+                created_at=start + timedelta(hours=i)
+            ))
+        db.session.commit()
+        rows = {task.id: task for task in Task.query.all()}
+        snapshot = {
+            tid: {'due_date': t.due_date, 'priority': t.priority, 'created_at': t.created_at}
+            for tid, t in rows.items()
+        }
+    yield snapshot
+
+
+def fetch_ids(client, query):
+    ids, cursor = [], None
+    while True:
+        url = f'/api/tasks/?limit=5&{query}'
+        if cursor:
+            url += f'&cursor={cursor}'
+        response = client.get(url)
+        assert response.status_code == 200, response.json
+        ids += [task['id'] for task in response.json['tasks']]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return ids
+
+
+def expected_order(tasks, key, descending):
+    # SQLite sorts NULL before every value.
+    def sort_key(tid):
+        value = tasks[tid][key] if key != 'id' else tid
+        return (value is not None, value if value is not None else 0, tid)
+    return sorted(tasks, key=sort_key, reverse=descending)
+
+
+@pytest.mark.parametrize('key', ['id', 'due_date', 'priority', 'created_at'])
+@pytest.mark.parametrize('descending', [False, True])
+def test_pages_cover_every_task_once_in_order(logged_in_client, tasks, key, descending):
+    sort = f'-{key}' if descending else key
+    assert fetch_ids(logged_in_client, f'sort={sort}') == expected_order(tasks, key, descending)
+
+
+def test_total_count_header(logged_in_client, tasks):
+    response = logged_in_client.get('/api/tasks/?limit=5&count=exact')
+    assert response.headers['X-Total-Count'] == '23'
+    assert len(response.json['tasks']) == 5
+
+    # SQLite has no planner estimate, so an exact count is returned.
+    response = logged_in_client.get('/api/tasks/?limit=5&count=estimated')
+    assert response.headers['X-Total-Count'] == '23'
+
+    assert 'X-Total-Count' not in logged_in_client.get('/api/tasks/?limit=5').headers
+
+
+def test_rejects_unknown_sort_and_foreign_cursor(logged_in_client, tasks):
+    assert logged_in_client.get('/api/tasks/?sort=title').status_code == 400
+    assert logged_in_client.get('/api/tasks/?sort=due_date&cursor=garbage').status_code == 400
+
+    cursor = encode_cursor('priority', 1, 3)
+    assert logged_in_client.get(f'/api/tasks/?sort=due_date&cursor={cursor}').status_code == 400
+
+
+@pytest.mark.parametrize('key, value', [
+    ('due_date', datetime(2026, 3, 2)),
+    ('priority', 1),
+    ('created_at', datetime(2026, 3, 1, 5)),
+    ('updated_at', datetime(2026, 3, 1, 5)),
+])
+def test_page_query_uses_sort_index(app, tasks, key, value):
+    with app.app_context():
+        column = getattr(Task, key)
+        query = (select(Task).where(keyset_after(column, Task.id, value, 5, False, 'sqlite'))
+                 .order_by(column, Task.id).limit(6)
+                 .compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = ' '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {query}')))
+    assert f'ix_tasks_{key}_id' in plan
+    assert 'TEMP B-TREE' not in plan
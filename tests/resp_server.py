@@ -0,0 +1,144 @@
+"""
+A small in-process stand-in for a Redis server, speaking just enough RESP for the session store.
+"""
+import socketserver
+import threading
+import time
+
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, username=None, password=None):
+        super().__init__(('127.0.0.1', 0), RespHandler)
+        # With a password, connections must AUTH first, as the given user or the default one.
+        self.username = username
+        self.password = password
+        self.data = {}
+        self.expiry = {}
+        self.lock = threading.Lock()
+        self.commands = []
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        credentials = f"{self.username or ''}:{self.password}@" if self.password else ''
+        return f'redis://{credentials}{host}:{port}/0'
+
+    def authenticate(self, *args):
+        if self.password is None:
+            return Exception('ERR AUTH called without any password configured')
+        username, password = args if len(args) == 2 else (None, args[0])
+        if (username or None) != self.username or password != self.password:
+            return Exception('WRONGPASS invalid username-password pair')
+        return '+OK'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def _alive(self, key):
+        deadline = self.expiry.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.data
+
+    def run(self, name, *args):
+        self.commands.append(name)
+        with self.lock:
+            if name in ('PING', 'SELECT'):
+                return '+OK'
+            if name == 'SET':
+                key, value = args[0], args[1]
+                self.data[key] = value
+                self.expiry.pop(key, None)
+                if len(args) == 4 and args[2].upper() == 'EX':
+                    self.expiry[key] = time.monotonic() + int(args[3])
+                return '+OK'
+            if name == 'GET':
+                return self.data[args[0]] if self._alive(args[0]) else None
+            if name == 'DEL':
+                count = 0
+                for key in args:
+                    if self._alive(key):
+                        del self.data[key]
+                        self.expiry.pop(key, None)
+                        count += 1
+                return count
+            if name == 'EXPIRE':
+                if not self._alive(args[0]):
+                    return 0
+                self.expiry[args[0]] = time.monotonic() + int(args[1])
+                return 1
+            if name == 'PTTL':
+                if not self._alive(args[0]):
+                    return -2
+                deadline = self.expiry.get(args[0])
+                return -1 if deadline is None else int((deadline - time.monotonic()) * 1000)
+            if name == 'RENAME':
+                if not self._alive(args[0]):
+                    return Exception('ERR no such key')
+                self.data[args[1]] = self.data.pop(args[0])
+                self.expiry.pop(args[1], None)
+                if args[0] in self.expiry:
+                    self.expiry[args[1]] = self.expiry.pop(args[0])
+                return '+OK'
+            if name == 'SADD':
+                members = self.data.setdefault(args[0], set()) if self._alive(args[0]) else set()
+                self.data[args[0]] = members
+                before = len(members)
+                members.update(args[1:])
+                return len(members) - before
+            if name == 'SREM':
+                members = self.data.get(args[0], set()) if self._alive(args[0]) else set()
+                before = len(members)
+                members.difference_update(args[1:])
+                return before - len(members)
+            if name == 'SMEMBERS':
+                return sorted(self.data[args[0]]) if self._alive(args[0]) else []
+            return Exception(f'ERR unknown command {name}')
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2].decode('utf-8'))
+        return args
+
+    def _encode(self, value):
+        if value is None:
+            return b'$-1\r\n'
+        if isinstance(value, Exception):
+            return f'-{value}\r\n'.encode()
+        if isinstance(value, int):
+            return f':{value}\r\n'.encode()
+        if isinstance(value, list):
+            return f'*{len(value)}\r\n'.encode() + b''.join(self._encode(item) for item in value)
+        if value.startswith('+'):
+            return f'{value}\r\n'.encode()
+        data = value.encode('utf-8')
+        return f'${len(data)}\r\n'.encode() + data + b'\r\n'
+
+    def handle(self):
+        authenticated = self.server.password is None
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            name = command[0].upper()
+            if name == 'AUTH':
+                reply = self.server.authenticate(*command[1:])
+                authenticated = authenticated or reply == '+OK'
+            elif not authenticated:
+                reply = Exception('NOAUTH Authentication required.')
+            else:
+                reply = self.server.run(name, *command[1:])
+            self.wfile.write(self._encode(reply))
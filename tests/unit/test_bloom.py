@@ -0,0 +1,19 @@
+from app.utils.bloom import BloomFilter
+
+
+def test_added_items_are_always_found():
+    bloom = BloomFilter(capacity=100)
+    items = [f'session-{i}' for i in range(100)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+
+
+def test_false_positive_rate_stays_near_target():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f'revoked-{i}')
+
+    false_positives = sum(f'active-{i}' in bloom for i in range(10000))
+    assert false_positives < 300
@@ -0,0 +1,42 @@
+from unittest import mock
+
+from app.utils.cache import TTLCache
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(maxsize=10, ttl=5)
+    with mock.patch('app.utils.cache.time.monotonic', return_value=100):
+        cache.set('a', 1)
+    with mock.patch('app.utils.cache.time.monotonic', return_value=104):
+        assert cache.get('a') == 1
+    with mock.patch('app.utils.cache.time.monotonic', return_value=106):
+        assert cache.get('a') is None
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['evictions'] == 1
+
+
+def test_delete_where_counts_invalidations():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set('a', {'user': 1})
+    cache.set('b', {'user': 2})
+    cache.set('c', {'user': 1})
+
+    assert cache.delete_where(lambda value: value['user'] == 1) == 2
+    assert len(cache) == 1
+    assert cache.stats()['invalidations'] == 2
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import pytest
+
+from app.utils.cursor import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    created_at = datetime(2026, 1, 2, 3, 4, 5, 678)
+    cursor = encode_cursor(created_at, 42)
+    assert '=' not in cursor
+    assert decode_cursor(cursor, datetime, int) == (created_at, 42)
+
+
+def test_none_values_pass_through():
+    assert decode_cursor(encode_cursor(None, 7), datetime, int) == (None, 7)
+
+
+@pytest.mark.parametrize('cursor', [
+    '', 'not-base64!', encode_cursor(1), encode_cursor('yesterday', 1)
+])
+def test_invalid_cursors(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, datetime, int)
@@ -0,0 +1,38 @@
+import pytest
+from cryptography.fernet import Fernet, InvalidToken
+from flask import Flask
+
+from app.keyring import KeyRing
+
+
+def make_key_ring(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    key_ring = KeyRing()
+    key_ring.init_app(app)
+    return key_ring
+
+
+def test_round_trip_and_cache():
+    key_ring = make_key_ring(FERNET_KEY=Fernet.generate_key().decode())
+    token = key_ring.encrypt('session-id')
+
+    assert key_ring.decrypt(token) == 'session-id'
+    assert key_ring.decrypt(token) == 'session-id'
+    assert key_ring.stats()['hits'] == 1
+
+
+def test_rotated_ring_still_decrypts_old_cookies():
+    old_key = Fernet.generate_key().decode()
+    new_key = Fernet.generate_key().decode()
+    old_cookie = make_key_ring(FERNET_KEY=old_key).encrypt('old-session')
+
+    rotated = make_key_ring(FERNET_KEYS=f'{new_key},{old_key}')
+    assert rotated.decrypt(old_cookie) == 'old-session'
+
+    new_cookie = rotated.encrypt('new-session')
+    assert Fernet(new_key).decrypt(new_cookie.encode()) == b'new-session'
+
+    retired = make_key_ring(FERNET_KEYS=new_key)
+    with pytest.raises(InvalidToken):
+        retired.decrypt(old_cookie)
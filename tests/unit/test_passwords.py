@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from app.passwords import PasswordHasher, PasswordHasherBusy
+
+
+def make_hasher(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    hasher = PasswordHasher()
+    hasher.init_app(app)
+    return hasher
+
+
+def test_pool_hashes_and_verifies():
+    hasher = make_hasher(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+    try:
+        password_hash = hasher.hash('secret')
+        assert password_hash.startswith('pbkdf2:sha256:1000$')
+        assert hasher.verify(password_hash, 'secret')
+        assert not hasher.verify(password_hash, 'wrong')
+    finally:
+        hasher.shutdown()
+
+
+def test_full_queue_is_rejected():
+    hasher = make_hasher(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE_LIMIT=1,
+                         PASSWORD_HASH_METHOD='pbkdf2:sha256:2000000')
+    started = threading.Event()
+
+    def slow_hash():
+        started.set()
+        hasher.hash('secret')
+
+    worker = threading.Thread(target=slow_hash)
+    try:
+        worker.start()
+        started.wait()
+        while hasher._in_flight == 0:
+            pass
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash('other')
+    finally:
+        worker.join()
+        hasher.shutdown()
+
+
+def test_needs_rehash_compares_method_and_cost():
+    cheap = make_hasher(PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+    strong = make_hasher(PASSWORD_HASH_METHOD='pbkdf2:sha256:2000')
+    password_hash = cheap.hash('secret')
+
+    assert not cheap.needs_rehash(password_hash)
+    assert strong.needs_rehash(password_hash)
+    assert not make_hasher().needs_rehash(password_hash)